@@ -0,0 +1,16 @@
+-- Processed-message ledger for the Gmail watcher (Postgres backend of ingest/ledger.py).
+-- One row per (user_id, Gmail message id); status moves queued -> done | interrupted | failed.
+-- Idempotent: run by scripts/setup_db.py (PostgresLedger.setup()) or manually after 001.
+
+CREATE TABLE IF NOT EXISTS email_assistant.processed_messages (
+  user_id         TEXT NOT NULL,
+  message_id      TEXT NOT NULL,
+  status          TEXT NOT NULL CHECK (status IN ('queued', 'done', 'interrupted', 'failed')),
+  attempts        INTEGER NOT NULL DEFAULT 0,
+  error           TEXT,
+  updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_processed_messages_updated_at ON email_assistant.processed_messages(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_processed_messages_status ON email_assistant.processed_messages(user_id, status);
@@ -0,0 +1,26 @@
+-- Durable work queue for email processing (db/job_queue.py).
+-- The watcher (GMAIL_EXECUTION=queue) enqueues one job per Gmail message; workers
+-- (scripts/email_worker.py) claim jobs with FOR UPDATE SKIP LOCKED and a lease.
+-- status: queued -> running -> done | interrupted, or back to queued on failure, or dead
+-- (dead letter) after max attempts. Idempotent: run by scripts/setup_db.py.
+
+CREATE TABLE IF NOT EXISTS email_assistant.email_jobs (
+  job_id            BIGSERIAL PRIMARY KEY,
+  user_id           TEXT NOT NULL,
+  message_id        TEXT NOT NULL,
+  gmail_thread_id   TEXT,
+  email_input       JSONB NOT NULL,
+  status            TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'interrupted', 'dead')),
+  attempts          INTEGER NOT NULL DEFAULT 0,
+  last_error        TEXT,
+  lease_owner       TEXT,
+  lease_expires_at  TIMESTAMPTZ,
+  available_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  created_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+  UNIQUE (user_id, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_jobs_claim ON email_assistant.email_jobs(status, available_at, created_at);
+CREATE INDEX IF NOT EXISTS idx_email_jobs_lease ON email_assistant.email_jobs(status, lease_expires_at);
+CREATE INDEX IF NOT EXISTS idx_email_jobs_thread ON email_assistant.email_jobs(user_id, gmail_thread_id, status);
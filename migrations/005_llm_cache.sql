@@ -0,0 +1,14 @@
+-- LLM response cache (Postgres persistent tier of llm_cache.py, LLM_CACHE_BACKEND=postgres).
+-- One row per cache key (SHA-256 of call site, model, schema and normalized prompt); rows past
+-- expires_at are never served and are deleted periodically by the writers.
+-- Idempotent: run by scripts/setup_db.py (PostgresResponseCache.setup()) or manually after 001.
+
+CREATE TABLE IF NOT EXISTS email_assistant.llm_cache (
+  cache_key       TEXT PRIMARY KEY,
+  site            TEXT NOT NULL,
+  value           JSONB NOT NULL,
+  expires_at      TIMESTAMPTZ NOT NULL,
+  created_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON email_assistant.llm_cache(expires_at);
@@ -1,7 +1,7 @@
 """
 Debug triage: find why an email is classified as ignore instead of respond.
 
-Use cases: run locally to verify _is_explicit_request() and triage_router() with
+Use cases: run locally to verify the triage rules and triage_router() with
 the same payload you send to LangGraph Studio.
 
   uv run python scripts/debug_triage.py
@@ -10,7 +10,7 @@ the same payload you send to LangGraph Studio.
 Checks:
 1. email_input shape (keys, subject, body) — Studio might send different keys.
 2. After input_router: normalized email_input (in case Studio sends different shape).
-3. _is_explicit_request(subject, body) — does the override fire?
+3. Triage rules (triage_rules.py) — does a rule settle the email, and which one?
 4. triage_router(state) — final classification_decision.
 """
 
@@ -24,7 +24,8 @@ load_dotenv()
 
 from email_assistant.fixtures.mock_emails import MOCK_EMAIL_RESPOND
 from email_assistant.nodes.input_router import input_router
-from email_assistant.nodes.triage import _is_explicit_request, triage_router
+from email_assistant.nodes.triage import triage_router
+from email_assistant.triage_rules import get_triage_rules
 
 
 def get_payload() -> dict:
@@ -71,27 +72,20 @@ def main() -> None:
     print("   body (first 200 chars):", repr(body[:200]))
     print()
 
-    print("2. _is_explicit_request(subject, body)")
-    combined = f"{subject}\n{body}".lower()
-    patterns = (
-        "send me the", "send me a", "could you send", "can you send",
-        "please send", "please reply", "reply with", "by friday", "by monday",
-        "by end of", "q4 report", "the report",
-    )
-    matched = [p for p in patterns if p in combined]
-    if matched:
-        for p in matched:
-            print(f"   MATCH: {p!r}")
-        print(f"   Result: True -> override WILL fire")
+    print("2. Triage rules")
+    rules = get_triage_rules()
+    print(f"   {len(rules)} rules: {', '.join(r['id'] for r in rules.rules)}")
+    match = rules.evaluate_email(email_input)
+    if match:
+        print(f"   MATCH: rule {match.rule_id!r} ({match.reason}) -> {match.action}; LLM will not be called.")
     else:
-        print("   No pattern matched. Result: False -> LLM will be called.")
-    is_request = _is_explicit_request(str(subject), body)
+        print("   No rule matched. LLM will be called.")
     print()
 
     print("3. triage_router(state)")
     out = triage_router(state_after_router)
     decision = out.get("classification_decision", "<missing>")
-    print(f"   classification_decision: {decision!r}")
+    print(f"   classification_decision: {decision!r} (rule: {out.get('triage_rule')!r})")
     if decision != "respond":
         print("   >>> UNEXPECTED for 'send me the report' style email.")
         print("   >>> If Studio still shows 'ignore', ensure (1) run input uses key 'email_input', (2) langgraph dev was restarted after code changes.")
@@ -104,7 +98,7 @@ def main() -> None:
     ex = {"email_input": {"from": "x@y.com", "to": "me@example.com", "subject": "Send report", "body": "Can you send me the report by Friday?"}}
     print("   ", json.dumps(ex))
     if not os.getenv("OPENAI_API_KEY"):
-        print("\n   Note: OPENAI_API_KEY not set; LLM would fail if override did not fire.")
+        print("\n   Note: OPENAI_API_KEY not set; LLM would fail if no rule fired.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+"""
+Email job worker: claim jobs from the Postgres queue and run the agent on each one.
+
+Use cases: execution half of the split pipeline. scripts/watch_gmail.py with
+GMAIL_EXECUTION=queue ingests Gmail messages into email_assistant.email_jobs; run one or
+more of these workers (same host or many) to process them. Each job is leased for
+JOB_VISIBILITY_TIMEOUT seconds and the lease is renewed while the graph runs, so a crashed
+worker's jobs are picked up by another worker once the lease lapses. Failed jobs are retried
+with exponential backoff (JOB_RETRY_DELAY) and dead-lettered after JOB_MAX_ATTEMPTS attempts.
+Outcomes are recorded in the watcher's processed-message ledger (same GMAIL_LEDGER_* settings):
+done / interrupted when a job completes, failed when it is dead-lettered. Workers on other
+hosts need GMAIL_LEDGER_BACKEND=postgres so they share it. The graph runs with the Postgres
+store, so stored triage rules and thread context are the ones the watcher sees.
+Requires DATABASE_URL (migrations/004 via scripts/setup_db.py), Gmail OAuth and OPENAI_API_KEY.
+
+Example:
+  uv run python scripts/email_worker.py
+  JOB_CONCURRENCY=8 JOB_WORKER_ID=host-a uv run python scripts/email_worker.py
+  uv run python scripts/email_worker.py --requeue-dead   # replay dead-lettered jobs, then exit
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from email_assistant.db.checkpointer import postgres_checkpointer
+from email_assistant.db.job_queue import DONE, INTERRUPTED, PostgresJobQueue
+from email_assistant.db.store import postgres_store
+from email_assistant.email_assistant_hitl_memory_gmail import build_email_assistant_graph
+from email_assistant.ingest.ledger import open_ledger
+
+
+def _settings_from_env() -> dict:
+    """Read worker settings from env (see docs/CONFIGURATION.md)."""
+    return {
+        "user_id": os.getenv("USER_ID", "default-user"),
+        "worker_id": os.getenv("JOB_WORKER_ID", "") or f"{socket.gethostname()}-{os.getpid()}",
+        "concurrency": int(os.getenv("JOB_CONCURRENCY", "4")),
+        "visibility_timeout": float(os.getenv("JOB_VISIBILITY_TIMEOUT", "600")),
+        "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+        "retry_delay": float(os.getenv("JOB_RETRY_DELAY", "30")),
+        "poll_interval": float(os.getenv("JOB_POLL_INTERVAL", "5")),
+    }
+
+
+def _heartbeat(job_queue: PostgresJobQueue, settings: dict, in_flight: dict, lock: threading.Lock, stop: threading.Event) -> None:
+    """Renew the lease of every in-flight job every third of the visibility timeout."""
+    interval = max(1.0, settings["visibility_timeout"] / 3)
+    while not stop.wait(interval):
+        with lock:
+            jobs = list(in_flight.items())
+        for job_id, worker_id in jobs:
+            try:
+                if not job_queue.extend_lease(job_id, worker_id, settings["visibility_timeout"]):
+                    print(f"[job {job_id}] lease lost; another worker may run it again.")
+            except Exception as e:
+                print(f"[job {job_id}] lease renewal failed: {e}")
+
+
+def _run_job(graph, job_queue: PostgresJobQueue, settings: dict, worker_id: str, job: dict) -> None:
+    """Run the graph for one claimed job and record the outcome in the queue."""
+    message_id = job["message_id"]
+    email_input = job["email_input"]
+    # Same thread_id as the in-process watcher so HITL resume works the same way.
+    thread_id = f"gmail-{message_id}"
+    config = {"configurable": {"thread_id": thread_id, "user_id": settings["user_id"]}}
+    try:
+        result = graph.invoke({"email_input": email_input}, config=config)
+    except Exception as e:
+        status = job_queue.fail(
+            job["job_id"], worker_id, str(e), max_attempts=settings["max_attempts"], retry_delay=settings["retry_delay"]
+        )
+        print(f"[{thread_id}] attempt {job['attempts']} failed ({status or 'lease lost'}): {e}")
+        return
+    interrupted = bool(result.get("__interrupt__"))
+    job_queue.complete(job["job_id"], worker_id, INTERRUPTED if interrupted else DONE)
+    decision = result.get("classification_decision", "")
+    from_addr = (email_input.get("from") or "")[:40]
+    subj = (email_input.get("subject") or "")[:50]
+    print(f"[{thread_id}] {decision} | From: {from_addr} | Subject: {subj}")
+    if interrupted:
+        print("  -> Notify: graph paused; resume with Command(resume='respond') or Command(resume='ignore')")
+
+
+def _worker_loop(graph, job_queue: PostgresJobQueue, settings: dict, slot: int, in_flight: dict, lock: threading.Lock, stop: threading.Event) -> None:
+    """One worker thread: claim a job, run it, repeat; sleep JOB_POLL_INTERVAL when the queue is empty."""
+    worker_id = f"{settings['worker_id']}/{slot}"
+    while not stop.is_set():
+        try:
+            jobs = job_queue.claim(
+                worker_id, limit=1, visibility_timeout=settings["visibility_timeout"], max_attempts=settings["max_attempts"]
+            )
+        except Exception as e:
+            print(f"[{worker_id}] claim failed: {e}")
+            stop.wait(settings["poll_interval"])
+            continue
+        if not jobs:
+            stop.wait(settings["poll_interval"])
+            continue
+        job = jobs[0]
+        with lock:
+            in_flight[job["job_id"]] = worker_id
+        try:
+            _run_job(graph, job_queue, settings, worker_id, job)
+        except Exception as e:
+            print(f"[job {job['job_id']}] could not record result: {e}")
+        finally:
+            with lock:
+                in_flight.pop(job["job_id"], None)
+
+
+def main() -> None:
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set. The job worker needs the Postgres queue (run scripts/setup_db.py once).")
+        sys.exit(1)
+    settings = _settings_from_env()
+    ledger = open_ledger(settings["user_id"])
+    job_queue = PostgresJobQueue(database_url, user_id=settings["user_id"], ledger=ledger)
+
+    if "--requeue-dead" in sys.argv[1:]:
+        print(f"Requeued {job_queue.requeue_dead()} dead-lettered job(s).")
+        job_queue.close()
+        ledger.close()
+        return
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    in_flight: dict[int, str] = {}
+    try:
+        # Same store as the watcher: per-user triage rules, thread context and memory.
+        with postgres_checkpointer() as checkpointer, postgres_store() as store:
+            graph = build_email_assistant_graph(checkpointer=checkpointer, store=store)
+            threads = [
+                threading.Thread(
+                    target=_worker_loop,
+                    args=(graph, job_queue, settings, slot, in_flight, lock, stop),
+                    name=f"email-worker-{slot}",
+                    daemon=True,
+                )
+                for slot in range(max(1, settings["concurrency"]))
+            ]
+            threads.append(
+                threading.Thread(
+                    target=_heartbeat, args=(job_queue, settings, in_flight, lock, stop), name="email-worker-heartbeat", daemon=True
+                )
+            )
+            for t in threads:
+                t.start()
+            print(
+                f"Email worker {settings['worker_id']} running (concurrency={settings['concurrency']}, "
+                f"visibility_timeout={settings['visibility_timeout']:.0f}s, max_attempts={settings['max_attempts']}). "
+                "Press Ctrl+C to stop."
+            )
+            try:
+                while True:
+                    time.sleep(60)
+                    reaped = job_queue.reap_expired(settings["max_attempts"])
+                    if reaped:
+                        print(f"Dead-lettered {reaped} job(s) whose final attempt's lease expired.")
+                    print(f"Queue: {job_queue.stats()}")
+            except KeyboardInterrupt:
+                # Join inside the checkpointer context: in-flight runs still write checkpoints.
+                print("Stopping; waiting for in-flight jobs to finish...")
+                stop.set()
+                for t in threads:
+                    t.join()
+    finally:
+        stop.set()
+        job_queue.close()
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
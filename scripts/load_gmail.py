@@ -0,0 +1,158 @@
+"""
+Offline ingestion benchmark: synthetic inbox traffic against the in-process Gmail / Calendar fake.
+
+Use cases: measure how many emails per second the watcher's ingest path sustains (history
+sync, pre-triage metadata batch, full batch fetch, label writes) and how it behaves under API
+latency, injected errors and quota limits, without a Google account. GOOGLE_API_FAKE=1 is
+forced; the fake is configured with the GOOGLE_API_FAKE_* variables (docs/CONFIGURATION.md).
+
+LOAD_RATE: synthetic emails per second (default 20). LOAD_DURATION: seconds of traffic
+(default 30). LOAD_POLL_INTERVAL: seconds between history polls (default 1).
+LOAD_REPORT_FILE: also write the report as JSON there.
+--graph: run every fetched email through the graph as well (MemorySaver, GMAIL_CONCURRENCY
+at a time; needs OPENAI_API_KEY). Without it, fetched emails are only marked read.
+
+Example:
+  uv run python scripts/load_gmail.py
+  LOAD_RATE=100 GOOGLE_API_FAKE_LATENCY_MS=80 GOOGLE_API_FAKE_ERROR_RATE=0.02 uv run python scripts/load_gmail.py
+  GOOGLE_API_FAKE_GMAIL_QUOTA=250 LOAD_RATE=60 uv run python scripts/load_gmail.py
+"""
+
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from email_assistant.ingest.pool import KeyedWorkerPool
+from email_assistant.ingest.pretriage import IGNORE, pre_triage
+from email_assistant.llm_cache import llm_cache_stats
+from email_assistant.tools.gmail.api import api_stats
+from email_assistant.tools.gmail.auth import get_gmail_service
+from email_assistant.tools.gmail.fake_api import InboxTrafficGenerator, get_fake_backend
+from email_assistant.tools.gmail.fetch_emails import (
+    get_history_id,
+    get_messages_as_email_inputs,
+    get_messages_metadata,
+    list_history_message_ids,
+)
+from email_assistant.tools.gmail.labels import enqueue_mark_as_read, enqueue_triage_label, get_label_buffer
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ingest(service, backend, ids: list[str], stats: dict) -> list[tuple[str, dict]]:
+    """Pre-triage then full-fetch ids, as the watcher does; returns [(message_id, email_input)] to run."""
+    metadata, _ = get_messages_metadata(service, ids)
+    keep = []
+    for message_id, meta in zip(ids, metadata):
+        if meta is not None and pre_triage(meta)[0] == IGNORE:
+            enqueue_triage_label(message_id, IGNORE)
+            stats["pre_triage_ignored"] += 1
+            stats["lag"].append(time.time() - backend.delivered_at[message_id])
+            continue
+        keep.append(message_id)
+    if not keep:
+        return []
+    email_inputs, errors = get_messages_as_email_inputs(service, keep)
+    stats["fetch_errors"] += len(errors)
+    return [(mid, ei) for mid, ei in zip(keep, email_inputs) if ei]
+
+
+def _run_graph_factory(backend, stats: dict):
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from email_assistant.email_assistant_hitl_memory_gmail import build_email_assistant_graph
+
+    graph = build_email_assistant_graph(checkpointer=MemorySaver())
+
+    def run(message_id: str, email_input: dict) -> None:
+        config = {"configurable": {"thread_id": f"gmail-{message_id}", "user_id": "load-test"}}
+        try:
+            graph.invoke({"email_input": email_input}, config=config)
+        except Exception as e:
+            stats["graph_errors"] += 1
+            print(f"[gmail-{message_id}] invoke failed: {e}")
+            return
+        stats["lag"].append(time.time() - backend.delivered_at[message_id])
+
+    return run
+
+
+def main() -> None:
+    load_dotenv()
+    os.environ["GOOGLE_API_FAKE"] = "1"
+    os.environ["GOOGLE_API_FAKE_INBOX_RATE"] = "0"  # Traffic comes from the generator below.
+    rate = float(os.getenv("LOAD_RATE", "20"))
+    duration = float(os.getenv("LOAD_DURATION", "30"))
+    poll_interval = float(os.getenv("LOAD_POLL_INTERVAL", "1"))
+    use_graph = "--graph" in sys.argv[1:]
+
+    backend = get_fake_backend()
+    service = get_gmail_service()
+    stats = {"ingested": 0, "pre_triage_ignored": 0, "fetch_errors": 0, "graph_errors": 0, "poll_errors": 0, "lag": []}
+    pool = KeyedWorkerPool(max_workers=int(os.getenv("GMAIL_CONCURRENCY", "4"))) if use_graph else None
+    run_graph = _run_graph_factory(backend, stats) if use_graph else None
+
+    cursor = get_history_id(service)
+    generator = InboxTrafficGenerator(backend, rate, seed=int(os.getenv("GOOGLE_API_FAKE_SEED", "0")) or None)
+    print(f"Load: {rate:g} emails/s for {duration:g}s, polling every {poll_interval:g}s{' (with graph)' if use_graph else ''}.")
+    started = time.monotonic()
+    generator.start(duration)
+    try:
+        while True:
+            poll_started = time.monotonic()
+            draining = not generator.is_running()
+            try:
+                ids, cursor = list_history_message_ids(service, cursor)
+                for message_id, email_input in _ingest(service, backend, ids, stats):
+                    stats["ingested"] += 1
+                    if pool is not None:
+                        pool.submit(email_input.get("gmail_thread_id") or message_id, run_graph, message_id, email_input)
+                    else:
+                        enqueue_mark_as_read(message_id)
+                        stats["lag"].append(time.time() - backend.delivered_at[message_id])
+            except Exception as e:
+                stats["poll_errors"] += 1
+                print(f"Poll error: {e}")
+                ids = [None]
+            if draining and not ids:
+                break
+            time.sleep(max(0.0, poll_interval - (time.monotonic() - poll_started)))
+        if pool is not None:
+            pool.join()
+    finally:
+        generator.stop()
+        if pool is not None:
+            pool.shutdown(wait=True)
+        get_label_buffer().flush()
+    elapsed = time.monotonic() - started
+
+    lag = stats.pop("lag")
+    report = {
+        "delivered": generator.delivered,
+        **stats,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round((stats["ingested"] + stats["pre_triage_ignored"]) / elapsed, 2) if elapsed else 0.0,
+        "lag_p50_s": round(_percentile(lag, 0.5), 3),
+        "lag_p95_s": round(_percentile(lag, 0.95), 3),
+        "lag_max_s": round(max(lag, default=0.0), 3),
+        "api": api_stats(),
+        "llm_cache": llm_cache_stats(),
+        "fake_backend": backend.snapshot(),
+    }
+    print(json.dumps(report, indent=2))
+    report_file = os.getenv("LOAD_REPORT_FILE")
+    if report_file:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
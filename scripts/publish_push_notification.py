@@ -0,0 +1,58 @@
+"""
+Local stand-in for Gmail watch / Pub/Sub push: POST a push notification to the watcher's receiver.
+
+Use cases: test push mode of scripts/watch_gmail.py without a Cloud Pub/Sub topic. Sends
+the same envelope Pub/Sub would ({"message": {"data": base64({"emailAddress", "historyId"})}});
+the watcher then runs an incremental fetch straight away. No Gmail API call is made here.
+
+Example:
+  GMAIL_PUSH_PORT=8765 uv run python scripts/watch_gmail.py        # terminal 1
+  GMAIL_PUSH_PORT=8765 uv run python scripts/publish_push_notification.py  # terminal 2
+  uv run python scripts/publish_push_notification.py 123456        # explicit historyId
+"""
+
+import base64
+import json
+import os
+import sys
+import time
+import urllib.request
+
+from dotenv import load_dotenv
+
+
+def build_envelope(history_id: str, email_address: str) -> dict:
+    """Pub/Sub push envelope carrying a Gmail notification."""
+    data = json.dumps({"emailAddress": email_address, "historyId": history_id}).encode("utf-8")
+    return {
+        "message": {
+            "data": base64.b64encode(data).decode("ascii"),
+            "messageId": str(int(time.time() * 1000)),
+        },
+        "subscription": "projects/local/subscriptions/gmail-push-local",
+    }
+
+
+def main() -> None:
+    load_dotenv()
+    host = os.getenv("GMAIL_PUSH_HOST", "127.0.0.1")
+    port = int(os.getenv("GMAIL_PUSH_PORT", "8765") or 8765)
+    path = os.getenv("GMAIL_PUSH_PATH", "/gmail/push")
+    token = os.getenv("GMAIL_PUSH_TOKEN", "")
+    # Any increasing number works: the watcher syncs from its own cursor, the push only wakes it.
+    history_id = sys.argv[1] if len(sys.argv) > 1 else str(int(time.time()))
+    email_address = os.getenv("GMAIL_PUSH_EMAIL", "me@example.com")
+
+    url = f"http://{host}:{port}{path}" + (f"?token={token}" if token else "")
+    body = json.dumps(build_envelope(history_id, email_address)).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            print(f"Published historyId={history_id} to {url}: HTTP {resp.status}")
+    except Exception as e:
+        print(f"Publish to {url} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@
 Create LangGraph checkpoint tables and store table in Postgres (Phase 3).
 
 Use cases: run once after setting DATABASE_URL. Creates tables for PostgresSaver
-and PostgresStore. Application tables (users, chats, messages, agent_memory) must
-be created separately by running migrations/001_email_assistant_tables.sql.
+and PostgresStore, the watcher's processed-message ledger table (003)
+the email job queue table (004) and the LLM response cache table (005). Application
+tables (users, chats, messages, agent_memory) must be created separately by running
+migrations/001_email_assistant_tables.sql.
 """
 
 import os
@@ -12,7 +14,10 @@ import sys
 from dotenv import load_dotenv
 
 from email_assistant.db.checkpointer import postgres_checkpointer, run_checkpoint_created_at_migration
+from email_assistant.db.job_queue import PostgresJobQueue
 from email_assistant.db.store import setup_store
+from email_assistant.ingest.ledger import PostgresLedger
+from email_assistant.llm_cache import PostgresResponseCache
 
 
 def main() -> None:
@@ -30,6 +35,27 @@ def main() -> None:
     print("Setting up LangGraph store table...")
     setup_store()
     print("Store table created.")
+    print("Setting up processed-message ledger table (migrations/003_processed_messages.sql)...")
+    ledger = PostgresLedger(os.environ["DATABASE_URL"])
+    try:
+        ledger.setup()
+    finally:
+        ledger.close()
+    print("Ledger table created.")
+    print("Setting up email job queue table (migrations/004_email_jobs.sql)...")
+    job_queue = PostgresJobQueue(os.environ["DATABASE_URL"])
+    try:
+        job_queue.setup()
+    finally:
+        job_queue.close()
+    print("Job queue table created.")
+    print("Setting up LLM response cache table (migrations/005_llm_cache.sql)...")
+    llm_cache = PostgresResponseCache(os.environ["DATABASE_URL"])
+    try:
+        llm_cache.setup()
+    finally:
+        llm_cache.close()
+    print("LLM cache table created.")
     print("Done. Ensure migrations/001_email_assistant_tables.sql has been run for app tables.")
 
 
@@ -40,9 +40,14 @@ def main() -> None:
         print("No messages in INBOX. Send yourself a test email or use another account.")
         return
     mid = ids[0]
-    email_input = get_message_as_email_input(service, mid)
+    try:
+        email_input = get_message_as_email_input(service, mid)
+    except Exception as e:
+        print("Gmail get message failed:", e)
+        print("Check that your OAuth token includes gmail.readonly (re-run OAuth if needed).")
+        return
     if not email_input:
-        print("Could not fetch message body (API error or permissions). Check gmail.readonly scope.")
+        print("Message no longer exists (deleted or moved since it was listed). Run the test again.")
         return
     print("First message:", email_input.get("subject"), "| From:", (email_input.get("from") or "")[:50])
     print("Gmail read test OK. You can run the watcher: uv run python scripts/watch_gmail.py")
@@ -3,62 +3,546 @@ Gmail inbox watcher: poll Gmail for new emails and run the agent on each one aut
 
 Use cases: run this script (e.g. in background or as a service) so the agent sees
 any real email that arrives in Gmail. Fetches unread INBOX messages, invokes the graph
-with each as email_input, then marks the message id as processed so it is not run again.
+with each as email_input, and records each message id in the processed-message ledger
+(queued -> done / interrupted / failed) so it is not run again.
 Requires Gmail OAuth (.secrets/credentials.json and .secrets/token.json) and OPENAI_API_KEY.
 
+Sync modes (GMAIL_SYNC_MODE):
+  history (default): keep a persisted historyId cursor and only fetch messages added since
+    the last poll (users.history.list). Falls back to a full list when the cursor expires.
+  list: re-list the newest GMAIL_MAX_RESULTS inbox ids on every poll.
+
 Example:
   uv run python scripts/watch_gmail.py
   GMAIL_POLL_INTERVAL=120 GMAIL_UNREAD_ONLY=1 uv run python scripts/watch_gmail.py
+  GMAIL_SYNC_MODE=list uv run python scripts/watch_gmail.py
+  GMAIL_CONCURRENCY=8 uv run python scripts/watch_gmail.py
+
+Two-phase fetch (GMAIL_PRE_TRIAGE, default on): new ids are first fetched as headers and
+snippet only (format=metadata); mail an ignore triage rule settles from that (List-Unsubscribe,
+Precedence, Auto-Submitted, promotions/social/forums, the user's stored rules) is marked ignore
+without a body download or an LLM call, and only the rest is fetched in full and run through
+the graph. With DATABASE_URL the graph and pre-triage share the Postgres store, so both apply
+the user's stored triage rules.
+
+Batch triage (TRIAGE_BATCH, default on): the new emails of a poll (or drain chunk) are
+classified together, one structured-output LLM call per token-budgeted batch
+(nodes/triage.triage_batch), with the user's triage_preferences, triage rules and each email's
+thread context from the store; the graph gets the decision as state["_triage_decision"] and
+skips its own triage call. An email whose thread context is not settled yet (an earlier email
+of its thread is in the same batch or still running, or a reply whose thread is not cached) is
+triaged in the graph. Queue mode (GMAIL_EXECUTION=queue) leaves triage to the workers.
+
+Adaptive polling: the delay between polls starts at GMAIL_POLL_INTERVAL and then follows the
+measured arrival rate (EWMA, messages per minute): it is the time in which about
+GMAIL_POLL_TARGET_MESSAGES new emails arrive, clamped to [GMAIL_POLL_MIN_INTERVAL,
+GMAIL_POLL_MAX_INTERVAL]. Gmail 429 / 5xx / rate-limit errors back off
+exponentially with jitter (up to GMAIL_BACKOFF_MAX, honouring Retry-After). With
+GMAIL_WATCHER_STATE_FILE set, the scheduler state and per-method Gmail API stats (calls,
+retries, quota units, latency) are written there after every poll.
+
+Concurrency: GMAIL_CONCURRENCY emails (default 4) run through the graph at once. Emails in
+the same Gmail thread still run in arrival order; the poll loop blocks while the pool is full
+and otherwise keeps polling while earlier emails run.
+
+Restart safety: each poll's ids are marked queued in the ledger before the history cursor
+moves on. Ids still queued (watcher stopped mid-run) and failed ids with fewer than
+GMAIL_MAX_ATTEMPTS attempts are picked up again on the next poll.
+
+Push mode (GMAIL_PUSH_PORT): a local HTTP receiver accepts Gmail watch / Pub/Sub push
+payloads carrying a historyId and triggers an incremental fetch immediately; polling then
+only runs every GMAIL_PUSH_SAFETY_INTERVAL seconds as a safety net. With GMAIL_PUSH_TOPIC
+the watcher also registers (and renews) users.watch for that Pub/Sub topic.
+  GMAIL_PUSH_PORT=8765 uv run python scripts/watch_gmail.py
+  uv run python scripts/publish_push_notification.py   # local stand-in publisher
+
+Async mode (--async): one event loop runs graph.ainvoke with AsyncPostgresSaver (when
+DATABASE_URL is set); GMAIL_CONCURRENCY then bounds in-flight runs (tasks, not threads),
+so it can be set much higher (e.g. 200).
+  uv run python scripts/watch_gmail.py --async
+
+Drain mode (--drain): work through the whole inbox backlog (e.g. after an outage or on
+first onboarding) oldest first, then exit. Lists every matching id page by page, processes
+them in GMAIL_DRAIN_CHUNK_SIZE chunks, paces Gmail calls to GMAIL_DRAIN_QUOTA_UNITS quota
+units per second, and checkpoints progress to .gmail_drain_progress.json after every page
+and chunk so an interrupted drain resumes where it stopped. Ids already finished in the
+ledger are skipped; ids submitted but unfinished when a drain stops stay queued in the
+ledger, so the next watcher poll runs them. Afterwards start the watcher normally; it
+continues from the history cursor taken when the drain began. The drain is synchronous
+only: --drain together with --async is refused.
+  uv run python scripts/watch_gmail.py --drain
+  GMAIL_DRAIN_QUERY="after:2026/01/01" GMAIL_UNREAD_ONLY=0 uv run python scripts/watch_gmail.py --drain
+
+Queue mode (GMAIL_EXECUTION=queue): the watcher only ingests. Each fetched email becomes a
+job in the Postgres queue (email_assistant.email_jobs) and stays queued in the ledger until
+scripts/email_worker.py (one or many workers) completes it. Requires DATABASE_URL; run workers
+on other hosts only with GMAIL_LEDGER_BACKEND=postgres, so they share the watcher's ledger.
+Works with the polling loop, --async and --drain.
+  GMAIL_EXECUTION=queue uv run python scripts/watch_gmail.py
+  GMAIL_EXECUTION=queue uv run python scripts/watch_gmail.py --async
+  uv run python scripts/email_worker.py
 """
 
+import asyncio
 import json
 import os
+import sys
+import threading
 import time
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 from langgraph.checkpoint.memory import MemorySaver
 
 from email_assistant.email_assistant_hitl_memory_gmail import build_email_assistant_graph
-from email_assistant.db.checkpointer import postgres_checkpointer
+from email_assistant.db.checkpointer import async_postgres_checkpointer, postgres_checkpointer
+from email_assistant.db.job_queue import PostgresJobQueue
+from email_assistant.db.store import postgres_store
+from email_assistant.ingest.drain import GET_UNITS, LIST_UNITS, DrainProgress, QuotaPacer
+from email_assistant.ingest.ledger import (
+    DONE,
+    FAILED,
+    FINISHED_STATUSES,
+    INTERRUPTED,
+    QUEUED,
+    import_legacy_processed_ids,
+    open_ledger,
+)
+from email_assistant.ingest.pool import KeyedWorkerPool
+from email_assistant.ingest.pretriage import IGNORE, pre_triage
+from email_assistant.ingest.push import PushReceiver
+from email_assistant.ingest.scheduler import PollScheduler
+from email_assistant.llm_cache import llm_cache_stats
+from email_assistant.memory import get_memory
+from email_assistant.nodes.triage import atriage_batch, triage_batch
+from email_assistant.thread_context import get_thread_context_cache
+from email_assistant.tools.gmail.api import api_stats
 from email_assistant.tools.gmail.auth import get_gmail_service
-from email_assistant.tools.gmail.fetch_emails import get_message_as_email_input, list_inbox_message_ids
+from email_assistant.tools.gmail.labels import enqueue_triage_label
+from email_assistant.tools.gmail.fetch_emails import (
+    HistoryCursorExpired,
+    get_history_id,
+    get_messages_as_email_inputs,
+    get_messages_metadata,
+    list_history_message_ids,
+    list_inbox_message_ids,
+    list_inbox_message_page,
+    watch_mailbox,
+)
+from email_assistant.triage_rules import TriageRules, get_triage_rules
 
 
 def _processed_ids_path() -> Path:
+    """Legacy processed-ids JSON file; imported into the ledger once on first start."""
     path = os.getenv("GMAIL_PROCESSED_IDS_FILE", "")
     if path:
         return Path(path)
     return Path(__file__).resolve().parents[1] / ".gmail_processed_ids.json"
 
 
-def load_processed_ids() -> set[str]:
-    p = _processed_ids_path()
+def _history_cursor_path() -> Path:
+    path = os.getenv("GMAIL_HISTORY_CURSOR_FILE", "")
+    if path:
+        return Path(path)
+    return Path(__file__).resolve().parents[1] / ".gmail_history_cursor.json"
+
+
+def _drain_progress_path() -> Path:
+    path = os.getenv("GMAIL_DRAIN_PROGRESS_FILE", "")
+    if path:
+        return Path(path)
+    return Path(__file__).resolve().parents[1] / ".gmail_drain_progress.json"
+
+
+def load_history_cursor() -> Optional[str]:
+    """Return the persisted Gmail historyId cursor, or None if there is none yet."""
+    p = _history_cursor_path()
     if not p.exists():
-        return set()
+        return None
     try:
         with open(p, "r") as f:
             data = json.load(f)
-        return set(data.get("ids", []))
+        return str(data["history_id"]) if data.get("history_id") else None
     except Exception:
-        return set()
+        return None
 
 
-def save_processed_ids(ids: set[str], max_stored: int = 5000) -> None:
-    """Persist processed ids so we do not re-process the same email."""
-    p = _processed_ids_path()
+def save_history_cursor(history_id: str) -> None:
+    """Persist the historyId cursor so a restarted watcher resumes where it stopped."""
+    p = _history_cursor_path()
     p.parent.mkdir(parents=True, exist_ok=True)
-    ids_list = list(ids)[-max_stored:]
     with open(p, "w") as f:
-        json.dump({"ids": ids_list}, f, indent=0)
+        json.dump({"history_id": str(history_id)}, f)
+
+
+def _settings_from_env() -> dict:
+    """Read watcher settings from env (see docs/CONFIGURATION.md)."""
+    poll_interval = int(os.getenv("GMAIL_POLL_INTERVAL", "60"))
+    return {
+        "poll_interval": poll_interval,
+        "poll_min_interval": float(os.getenv("GMAIL_POLL_MIN_INTERVAL", str(min(10, poll_interval)))),
+        "poll_max_interval": float(os.getenv("GMAIL_POLL_MAX_INTERVAL", str(poll_interval * 5))),
+        "poll_target_messages": float(os.getenv("GMAIL_POLL_TARGET_MESSAGES", "1")),
+        "backoff_max": float(os.getenv("GMAIL_BACKOFF_MAX", "900")),
+        "state_file": os.getenv("GMAIL_WATCHER_STATE_FILE", ""),
+        "unread_only": os.getenv("GMAIL_UNREAD_ONLY", "1").strip().lower() in ("1", "true", "yes"),
+        "max_results": int(os.getenv("GMAIL_MAX_RESULTS", "20")),
+        "user_id": os.getenv("USER_ID", "default-user"),
+        "sync_mode": os.getenv("GMAIL_SYNC_MODE", "history").strip().lower(),
+        "concurrency": int(os.getenv("GMAIL_CONCURRENCY", "4")),
+        "max_attempts": int(os.getenv("GMAIL_MAX_ATTEMPTS", "3")),
+        "ledger_max_entries": int(os.getenv("GMAIL_LEDGER_MAX_ENTRIES", "50000")),
+        "push_port": int(os.getenv("GMAIL_PUSH_PORT", "0") or 0),
+        "push_host": os.getenv("GMAIL_PUSH_HOST", "127.0.0.1"),
+        "push_path": os.getenv("GMAIL_PUSH_PATH", "/gmail/push"),
+        "push_token": os.getenv("GMAIL_PUSH_TOKEN", ""),
+        "push_topic": os.getenv("GMAIL_PUSH_TOPIC", ""),
+        "push_safety_interval": int(os.getenv("GMAIL_PUSH_SAFETY_INTERVAL", "900")),
+        "execution": os.getenv("GMAIL_EXECUTION", "local").strip().lower(),
+        "pre_triage": os.getenv("GMAIL_PRE_TRIAGE", "1").strip().lower() in ("1", "true", "yes"),
+        "triage_batch": os.getenv("TRIAGE_BATCH", "1").strip().lower() in ("1", "true", "yes"),
+        "drain_query": os.getenv("GMAIL_DRAIN_QUERY", "").strip(),
+        "drain_chunk_size": int(os.getenv("GMAIL_DRAIN_CHUNK_SIZE", "100")),
+        "drain_quota_units": float(os.getenv("GMAIL_DRAIN_QUOTA_UNITS", "100")),
+    }
+
+
+def _start_push_receiver(settings: dict) -> Optional[PushReceiver]:
+    """Start the push receiver when GMAIL_PUSH_PORT is set; None otherwise."""
+    if not settings["push_port"]:
+        return None
+    receiver = PushReceiver(
+        host=settings["push_host"], port=settings["push_port"], path=settings["push_path"], token=settings["push_token"]
+    ).start()
+    host, port = receiver.address
+    print(f"Push receiver listening on http://{host}:{port}{settings['push_path']} (safety poll every {settings['push_safety_interval']}s).")
+    return receiver
+
+
+def _renew_gmail_watch(service, settings: dict, expires_at: float) -> float:
+    """
+    Call users.watch for GMAIL_PUSH_TOPIC when there is no watch or it expires within a day.
+
+    Returns the watch expiration (epoch seconds); unchanged when no renewal was needed.
+    """
+    if not settings["push_topic"] or time.time() < expires_at - 86400:
+        return expires_at
+    response = watch_mailbox(service, settings["push_topic"])
+    print(f"Gmail watch registered on {settings['push_topic']} (historyId={response.get('historyId')}).")
+    return int(response.get("expiration", 0)) / 1000.0
+
+
+def _make_scheduler(settings: dict) -> PollScheduler:
+    return PollScheduler(
+        base_interval=settings["poll_interval"],
+        min_interval=settings["poll_min_interval"],
+        max_interval=settings["poll_max_interval"],
+        max_backoff=settings["backoff_max"],
+        target_per_poll=settings["poll_target_messages"],
+    )
+
+
+def _record_poll_error(scheduler: PollScheduler, error: Exception, label: str = "Poll error (Gmail list or auth)") -> float:
+    """Record a failed poll with the scheduler and print it with the retry delay."""
+    delay = scheduler.record_error(error)
+    kind = f"HTTP {scheduler.last_status}, backing off" if scheduler.backing_off else "retrying"
+    print(f"{label}: {error} ({kind} in {delay:.0f}s)")
+    return delay
+
+
+def _push_wait_timeout(receiver: Optional[PushReceiver], settings: dict, scheduler: PollScheduler) -> Optional[float]:
+    """
+    Seconds to wait on the push receiver, or None to sleep scheduler.next_delay instead.
+
+    Push mode waits for a notification with the safety-net timeout; after a failed poll it
+    retries at the scheduler delay, and while backing off it ignores pushes entirely.
+    """
+    if settings["state_file"]:
+        try:
+            scheduler.write_state(settings["state_file"], extra={"api": api_stats(), "llm_cache": llm_cache_stats()})
+        except OSError as e:
+            print(f"Could not write watcher state to {settings['state_file']}: {e}")
+    if receiver is None or scheduler.backing_off:
+        return None
+    return settings["push_safety_interval"] if scheduler.consecutive_errors == 0 else scheduler.next_delay
+
+
+def _wait_for_next_poll(receiver: Optional[PushReceiver], settings: dict, scheduler: PollScheduler) -> None:
+    """Sleep the scheduler's delay, or with push enabled wait for a notification (safety-net timeout)."""
+    timeout = _push_wait_timeout(receiver, settings, scheduler)
+    if timeout is None:
+        time.sleep(scheduler.next_delay)
+        return
+    history_id = receiver.wait(timeout=timeout)
+    if history_id:
+        print(f"Push notification (historyId={history_id}); fetching new mail.")
+
+
+def _open_watcher_ledger(user_id: str):
+    """Open the ledger and import the legacy processed-ids file the first time."""
+    ledger = open_ledger(user_id=user_id)
+    imported = import_legacy_processed_ids(ledger, _processed_ids_path())
+    if imported:
+        print(f"Imported {imported} processed ids from {_processed_ids_path()} into the ledger.")
+    return ledger
+
+
+def _full_resync(service, max_results: int, unread_only: bool) -> tuple[list[str], str]:
+    """List the newest inbox ids and return them with a fresh cursor (taken first so nothing is missed)."""
+    history_id = get_history_id(service)
+    ids = list_inbox_message_ids(service, max_results=max_results, unread_only=unread_only)
+    return ids, history_id
+
+
+def _poll_message_ids(
+    service, cursor: Optional[str], sync_mode: str, max_results: int, unread_only: bool
+) -> tuple[list[str], Optional[str]]:
+    """
+    Return (candidate message ids, new cursor) for one poll.
+
+    history mode: incremental users.history.list from cursor; full resync when there is no
+    cursor yet or Gmail reports it expired. list mode: plain list, cursor unused.
+    """
+    if sync_mode != "history":
+        return list_inbox_message_ids(service, max_results=max_results, unread_only=unread_only), cursor
+    if not cursor:
+        return _full_resync(service, max_results, unread_only)
+    try:
+        return list_history_message_ids(service, cursor, unread_only=unread_only)
+    except HistoryCursorExpired as e:
+        print(f"{e}. Running full resync.")
+        return _full_resync(service, max_results, unread_only)
+
+
+def _claim_ids(ledger, new_ids: list[str], max_attempts: int, running: frozenset = frozenset()) -> list[str]:
+    """
+    Return the ids to run this poll and mark them queued in the ledger.
+
+    Pending ids (left queued by a stopped watcher, or failed fewer than max_attempts times)
+    come first, then new ids the ledger has never seen. Ids still running in this watcher
+    (queued until they finish) are skipped.
+    """
+    known = ledger.statuses(new_ids)
+    pending = ledger.pending(max_attempts) + [mid for mid in new_ids if mid not in known]
+    todo = [mid for mid in dict.fromkeys(pending) if mid not in running]
+    ledger.mark(todo, QUEUED)
+    return todo
+
+
+def _pre_triage_rules(settings: dict, store=None) -> Optional[TriageRules]:
+    """
+    Rules for the header-only pre-triage, or None when GMAIL_PRE_TRIAGE or TRIAGE_RULES is off.
+
+    Same set the graph's triage uses: the user's stored rules (when store is set), TRIAGE_RULES_FILE,
+    then the defaults. Read once per poll (one store read; compiled sets are cached).
+    """
+    if not settings["pre_triage"]:
+        return None
+    rules = get_triage_rules(store, settings["user_id"])
+    return rules if len(rules) else None
+
+
+def _pre_triage_ids(service, ids: list[str], ledger, rules: TriageRules) -> list[str]:
+    """
+    Phase one of the fetch: headers and snippet only. Returns the ids that need a full fetch.
+
+    Ids settled as ignore are marked done in the ledger. Ids whose metadata get failed are
+    kept, so the full fetch retries them and records any error.
+    """
+    metadata, _ = get_messages_metadata(service, ids)
+    keep = []
+    for message_id, meta in zip(ids, metadata):
+        if meta is None:
+            keep.append(message_id)
+            continue
+        decision, reason = pre_triage(meta, rules=rules)
+        if decision != IGNORE:
+            keep.append(message_id)
+            continue
+        ledger.mark(message_id, DONE)
+        enqueue_triage_label(message_id, IGNORE)
+        from_addr = (meta["headers"].get("From") or "")[:40]
+        subj = (meta["headers"].get("Subject") or "")[:50]
+        print(f"[gmail-{message_id}] ignore (pre-triage: {reason}) | From: {from_addr} | Subject: {subj}")
+    return keep
+
+
+def _fetch_new_emails(service, ids: list[str], ledger, rules: Optional[TriageRules] = None) -> list[tuple[str, dict]]:
+    """
+    Batch-fetch the claimed ids; return [(message_id, email_input)] in poll order.
+
+    With rules (_pre_triage_rules), bulk mail is settled from headers first (_pre_triage_ids).
+    Failed fetches are marked failed in the ledger and retried on a later poll.
+    """
+    if ids and rules is not None:
+        ids = _pre_triage_ids(service, ids, ledger, rules)
+    if not ids:
+        return []
+    email_inputs, errors = get_messages_as_email_inputs(service, ids)
+    out = []
+    for message_id, email_input in zip(ids, email_inputs):
+        if not email_input:
+            error = errors.get(message_id, "missing body")
+            print(f"[{message_id}] Gmail get failed: {error}")
+            ledger.mark(message_id, FAILED, error=error)
+            continue
+        out.append((message_id, email_input))
+    return out
+
+
+def _batch_request(
+    fetched: list[tuple[str, dict]], settings: dict, store=None, busy_threads: frozenset = frozenset()
+) -> Optional[tuple[list[str], list[dict], dict]]:
+    """
+    TRIAGE_BATCH: (message ids, email inputs, triage_batch keyword arguments), or None when there is nothing to batch.
+
+    The arguments are what the graph's triage node would use: triage_preferences and triage rules
+    from store, and each email's thread context (ThreadContextCache.peek). Emails whose thread key
+    is in busy_threads or already in the batch, or whose context needs a Gmail fetch, are left out.
+    """
+    if not settings["triage_batch"]:
+        return None
+    user_id = settings["user_id"]
+    cache = get_thread_context_cache(store)
+    taken = set(busy_threads)
+    ids, email_inputs, contexts = [], [], []
+    for message_id, email_input in fetched:
+        key = email_input.get("gmail_thread_id") or message_id
+        context = None if key in taken else cache.peek(user_id, email_input)
+        taken.add(key)
+        if context is None:
+            continue
+        ids.append(message_id)
+        email_inputs.append(email_input)
+        contexts.append(context)
+    if len(email_inputs) < 2:
+        return None
+    triage_instructions = (get_memory(store, user_id, "triage_preferences") or "") if store is not None else ""
+    kwargs = {
+        "triage_instructions": triage_instructions,
+        "thread_contexts": contexts,
+        "rules": get_triage_rules(store, user_id),
+    }
+    return ids, email_inputs, kwargs
+
+
+def _batch_decisions(ids: list[str], updates: list[dict]) -> dict[str, str]:
+    """LLM decisions by message id, for state["_triage_decision"] (rule decisions are re-evaluated in the graph)."""
+    return {
+        message_id: update["classification_decision"]
+        for message_id, update in zip(ids, updates)
+        if not update.get("triage_rule")
+    }
+
+
+def _batch_triage(
+    fetched: list[tuple[str, dict]], settings: dict, store=None, busy_threads: frozenset = frozenset()
+) -> dict[str, str]:
+    """TRIAGE_BATCH: classify the fetched emails in a few batched LLM calls before the graph runs them."""
+    try:
+        request = _batch_request(fetched, settings, store, busy_threads)
+        if request is None:
+            return {}
+        ids, email_inputs, kwargs = request
+        return _batch_decisions(ids, triage_batch(email_inputs, **kwargs))
+    except Exception as e:
+        print(f"Batch triage failed; each email is triaged in the graph: {e}")
+        return {}
+
+
+async def _abatch_triage(
+    fetched: list[tuple[str, dict]], settings: dict, store=None, busy_threads: frozenset = frozenset()
+) -> dict[str, str]:
+    """Async _batch_triage: store reads in a worker thread, batch calls with atriage_batch."""
+    try:
+        request = await asyncio.to_thread(_batch_request, fetched, settings, store, busy_threads)
+        if request is None:
+            return {}
+        ids, email_inputs, kwargs = request
+        return _batch_decisions(ids, await atriage_batch(email_inputs, **kwargs))
+    except Exception as e:
+        print(f"Batch triage failed; each email is triaged in the graph: {e}")
+        return {}
+
+
+def _graph_input(email_input: dict, triage_decision: Optional[str] = None) -> dict:
+    """Graph input for one email; a batch triage decision rides along as the watcher-only state key _triage_decision."""
+    if triage_decision:
+        return {"email_input": email_input, "_triage_decision": triage_decision}
+    return {"email_input": email_input}
+
+
+def _record_result(ledger, thread_id: str, message_id: str, email_input: dict, result: dict) -> None:
+    """Mark the run done or interrupted and print one line per processed email."""
+    ledger.mark(message_id, INTERRUPTED if result.get("__interrupt__") else DONE)
+    decision = result.get("classification_decision", "")
+    from_addr = (email_input.get("from") or "")[:40]
+    subj = (email_input.get("subject") or "")[:50]
+    print(f"[{thread_id}] {decision} | From: {from_addr} | Subject: {subj}")
+    if result.get("__interrupt__"):
+        print("  -> Notify: graph paused; resume with Command(resume='respond') or Command(resume='ignore')")
+
+
+def _process_email(
+    graph, ledger, user_id: str, message_id: str, email_input: dict, triage_decision: Optional[str] = None
+) -> None:
+    """Worker: run the graph for one email and record the outcome in the ledger."""
+    thread_id = f"gmail-{message_id}"
+    config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
+    try:
+        result = graph.invoke(_graph_input(email_input, triage_decision), config=config)
+    except Exception as e:
+        print(f"[{thread_id}] invoke failed: {e}")
+        ledger.mark(message_id, FAILED, error=str(e))
+        return
+    _record_result(ledger, thread_id, message_id, email_input, result)
+
+
+def _enqueued_ids(job_queue: PostgresJobQueue, ledger, max_attempts: int) -> frozenset:
+    """
+    Queue mode: pending ledger ids the job queue already holds.
+
+    They stay queued in the ledger until a worker completes them (PostgresJobQueue.complete),
+    so they are skipped by _claim_ids instead of being fetched and enqueued again every poll.
+    """
+    pending = ledger.pending(max_attempts)
+    return frozenset(job_queue.known_message_ids(pending)) if pending else frozenset()
+
+
+def _enqueue_emails(job_queue: PostgresJobQueue, fetched: list[tuple[str, dict]]) -> None:
+    """Queue mode: hand fetched emails to the job queue; they stay queued in the ledger until a worker finishes them."""
+    if not fetched:
+        return
+    added = job_queue.enqueue(
+        {"message_id": message_id, "email_input": email_input} for message_id, email_input in fetched
+    )
+    print(f"Enqueued {added} new job(s) ({len(fetched) - added} already queued).")
+
+
+def _banner(settings: dict, mode: str = "") -> str:
+    trigger = "push" if settings["push_port"] else (
+        f"poll_interval={settings['poll_interval']}s "
+        f"[{settings['poll_min_interval']:.0f}-{settings['poll_max_interval']:.0f}s]"
+    )
+    return (
+        f"Watching Gmail INBOX{mode} (sync_mode={settings['sync_mode']}, concurrency={settings['concurrency']}, "
+        f"unread_only={settings['unread_only']}, {trigger}). Press Ctrl+C to stop."
+    )
 
 
 def main() -> None:
+    if "--async" in sys.argv[1:] and "--drain" in sys.argv[1:]:
+        print("--drain cannot be combined with --async; run the drain first, then start the watcher with --async.")
+        sys.exit(1)
+    if "--async" in sys.argv[1:]:
+        asyncio.run(main_async())
+        return
     load_dotenv()
-    poll_interval = int(os.getenv("GMAIL_POLL_INTERVAL", "60"))
-    unread_only = os.getenv("GMAIL_UNREAD_ONLY", "1").strip().lower() in ("1", "true", "yes")
-    max_results = int(os.getenv("GMAIL_MAX_RESULTS", "20"))
-    user_id = os.getenv("USER_ID", "default-user")
+    settings = _settings_from_env()
+    drain = "--drain" in sys.argv[1:]
+    run = _drain_backlog if drain else _run_loop
+    mode = " (backlog drain)" if drain else ""
 
     try:
         service = get_gmail_service()
@@ -66,56 +550,346 @@ def main() -> None:
         print("Gmail auth failed. Ensure .secrets/credentials.json and .secrets/token.json exist.", e)
         return
 
-    processed = load_processed_ids()
+    ledger = _open_watcher_ledger(settings["user_id"])
+    receiver = None if drain else _start_push_receiver(settings)
+    database_url = os.getenv("DATABASE_URL")
+    if settings["execution"] == "queue":
+        if not database_url:
+            print("GMAIL_EXECUTION=queue requires DATABASE_URL (run scripts/setup_db.py once).")
+            return
+        job_queue = PostgresJobQueue(database_url, user_id=settings["user_id"])
+        try:
+            print(_banner(settings, mode + " -> job queue"))
+            with postgres_store() as store:
+                run(service, None, ledger, settings, receiver, job_queue=job_queue, store=store)
+        finally:
+            if receiver is not None:
+                receiver.stop()
+            job_queue.close()
+            ledger.close()
+        return
+    try:
+        # When DATABASE_URL is set, use Supabase Postgres so checkpoint data is stored in Supabase (run setup_db.py once).
+        # The store holds per-user triage rules, thread context and memory; pre-triage reads the same rules.
+        if database_url:
+            with postgres_checkpointer() as checkpointer, postgres_store() as store:
+                graph = build_email_assistant_graph(checkpointer=checkpointer, store=store)
+                print(_banner(settings, mode))
+                run(service, graph, ledger, settings, receiver, store=store)
+        else:
+            graph = build_email_assistant_graph(checkpointer=MemorySaver())
+            print(_banner(settings, mode))
+            run(service, graph, ledger, settings, receiver)
+    finally:
+        if receiver is not None:
+            receiver.stop()
+        ledger.close()
+
+
+def _run_loop(
+    service,
+    graph,
+    ledger,
+    settings: dict,
+    receiver: Optional[PushReceiver] = None,
+    job_queue: Optional[PostgresJobQueue] = None,
+    store=None,
+) -> None:
+    """Poll loop; runs the graph on a worker pool, or with job_queue only enqueues (graph unused)."""
+    first_poll = True
+    watch_expires_at = 0.0
+    sync_mode = settings["sync_mode"]
+    user_id = settings["user_id"]
+    cursor = load_history_cursor() if sync_mode == "history" else None
+    pool = KeyedWorkerPool(max_workers=settings["concurrency"])
+    lock = threading.Lock()
+    # Ids submitted and not finished (-> Gmail thread key): queued in the ledger, but not to be claimed again.
+    in_flight: dict[str, str] = {}
+
+    def process(message_id: str, email_input: dict, triage_decision: Optional[str]) -> None:
+        try:
+            _process_email(graph, ledger, user_id, message_id, email_input, triage_decision)
+        finally:
+            with lock:
+                in_flight.pop(message_id, None)
+
+    scheduler = _make_scheduler(settings)
+
+    try:
+        while True:
+            try:
+                watch_expires_at = _renew_gmail_watch(service, settings, watch_expires_at)
+                new_ids, new_cursor = _poll_message_ids(
+                    service, cursor, sync_mode, settings["max_results"], settings["unread_only"]
+                )
+                if first_poll and not new_ids and not cursor:
+                    print("No messages from Gmail INBOX. Try GMAIL_UNREAD_ONLY=0 to fetch recent (not only unread), or check OAuth scopes include gmail.readonly.")
+                first_poll = False
+                with lock:
+                    running = frozenset(in_flight)
+                if job_queue is not None:
+                    running |= _enqueued_ids(job_queue, ledger, settings["max_attempts"])
+                ids = _claim_ids(ledger, new_ids, settings["max_attempts"], running)
+                # Claimed ids are queued in the ledger, so the cursor can move on before they run:
+                # a restarted watcher re-runs every id that has not finished.
+                if new_cursor and new_cursor != cursor:
+                    cursor = new_cursor
+                    save_history_cursor(cursor)
+                # Fetch on this thread: the shared Gmail service (httplib2) is not thread-safe.
+                fetched = _fetch_new_emails(service, ids, ledger, _pre_triage_rules(settings, store))
+                if job_queue is not None:
+                    _enqueue_emails(job_queue, fetched)
+                    fetched = []
+                with lock:
+                    busy_threads = frozenset(in_flight.values())
+                decisions = _batch_triage(fetched, settings, store, busy_threads) if fetched else {}
+                for message_id, email_input in fetched:
+                    key = email_input.get("gmail_thread_id") or message_id
+                    with lock:
+                        in_flight[message_id] = key
+                    pool.submit(key, process, message_id, email_input, decisions.get(message_id))
+                ledger.prune(settings["ledger_max_entries"])
+                scheduler.record_success(len(new_ids))
+            except Exception as e:
+                _record_poll_error(scheduler, e)
+            _wait_for_next_poll(receiver, settings, scheduler)
+    finally:
+        pool.shutdown(wait=True)
+
+
+def _drain_backlog(
+    service,
+    graph,
+    ledger,
+    settings: dict,
+    receiver: Optional[PushReceiver] = None,
+    job_queue: Optional[PostgresJobQueue] = None,
+    store=None,
+) -> None:
+    """
+    --drain: process the whole matching inbox oldest first, checkpointing progress, then return.
+
+    Same processing as _run_loop (worker pool, or job_queue when set); receiver is unused.
+    Chunks are submitted without waiting for the previous one to finish (the pool's bounded
+    submit is the backpressure); the pool is joined once, at the end. Gmail errors are
+    retried from the last checkpoint after the scheduler's delay (backoff on 429 / 5xx).
+    """
+    query_key = f"{settings['drain_query']}|unread_only={settings['unread_only']}"
+    progress = DrainProgress.load(_drain_progress_path(), query_key)
+    pacer = QuotaPacer(settings["drain_quota_units"])
+    scheduler = _make_scheduler(settings)
+    chunk_size = max(1, settings["drain_chunk_size"])
+    if progress.ids:
+        print(f"Drain: resuming from {_drain_progress_path()} ({progress.processed}/{len(progress.ids)} submitted).")
+
+    while not progress.listed:
+        try:
+            if progress.history_id is None:
+                # Taken before listing, so mail arriving during the drain is seen by the normal watcher afterwards.
+                progress.history_id = get_history_id(service)
+            pacer.spend(LIST_UNITS)
+            ids, next_page_token = list_inbox_message_page(
+                service,
+                unread_only=settings["unread_only"],
+                query=settings["drain_query"] or None,
+                page_token=progress.page_token,
+            )
+        except Exception as e:
+            time.sleep(_record_poll_error(scheduler, e, "Drain list error"))
+            continue
+        scheduler.record_success(len(ids))
+        progress.add_page(ids, next_page_token)
+        progress.save()
+        print(f"Drain: listed {len(progress.ids)} message ids{'' if progress.listed else ' so far'}.")
+
+    pool = KeyedWorkerPool(max_workers=settings["concurrency"])
+    # Chunks are not joined, so a thread with a submitted email may still be running: its replies skip batch triage.
+    submitted_threads: set[str] = set()
+    started, processed_before = time.monotonic(), progress.processed
+    try:
+        while progress.remaining:
+            chunk = progress.next_chunk(chunk_size)
+            try:
+                known = ledger.statuses(chunk)
+                todo = [mid for mid in chunk if known.get(mid) not in FINISHED_STATUSES]
+                if job_queue is not None:
+                    enqueued = job_queue.known_message_ids(todo)
+                    todo = [mid for mid in todo if mid not in enqueued]
+                # Queued in the ledger before the progress file moves past them: a stopped drain
+                # leaves unfinished ids queued for the watcher's next poll.
+                ledger.mark(todo, QUEUED)
+                # Upper bound: with pre-triage every id costs a metadata get and possibly a full get.
+                pacer.spend(GET_UNITS * len(todo) * (2 if settings["pre_triage"] else 1))
+                fetched = _fetch_new_emails(service, todo, ledger, _pre_triage_rules(settings, store))
+            except Exception as e:
+                time.sleep(_record_poll_error(scheduler, e, "Drain fetch error"))
+                continue
+            scheduler.record_success(len(todo))
+            if job_queue is not None:
+                _enqueue_emails(job_queue, fetched)
+            else:
+                decisions = _batch_triage(fetched, settings, store, frozenset(submitted_threads))
+                for message_id, email_input in fetched:
+                    key = email_input.get("gmail_thread_id") or message_id
+                    submitted_threads.add(key)
+                    pool.submit(
+                        key, _process_email, graph, ledger, settings["user_id"], message_id, email_input,
+                        decisions.get(message_id),
+                    )
+            progress.advance(len(chunk))
+            progress.save()
+            rate = (progress.processed - processed_before) / max(1e-6, time.monotonic() - started)
+            print(f"Drain: {progress.processed}/{len(progress.ids)} submitted ({rate:.1f} msg/s).")
+    finally:
+        pool.shutdown(wait=True)
+
+    if settings["sync_mode"] == "history" and progress.history_id and load_history_cursor() is None:
+        save_history_cursor(progress.history_id)
+    progress.clear()
+    print(f"Backlog drained ({len(progress.ids)} messages). Start the watcher without --drain to keep watching.")
+
+
+async def main_async() -> None:
+    """Async entry point: same settings as main(), graph run with ainvoke on one event loop."""
+    load_dotenv()
+    settings = _settings_from_env()
+
+    try:
+        service = await asyncio.to_thread(get_gmail_service)
+    except Exception as e:
+        print("Gmail auth failed. Ensure .secrets/credentials.json and .secrets/token.json exist.", e)
+        return
+
+    ledger = await asyncio.to_thread(_open_watcher_ledger, settings["user_id"])
+    receiver = _start_push_receiver(settings)
     database_url = os.getenv("DATABASE_URL")
-    # When DATABASE_URL is set, use Supabase Postgres so checkpoint data is stored in Supabase (run setup_db.py once).
-    if database_url:
-        with postgres_checkpointer() as checkpointer:
-            graph = build_email_assistant_graph(checkpointer=checkpointer)
-            print(f"Watching Gmail INBOX (unread_only={unread_only}, poll_interval={poll_interval}s). Press Ctrl+C to stop.")
-            _run_loop(service, graph, processed, poll_interval, unread_only, max_results, user_id)
-    else:
-        graph = build_email_assistant_graph(checkpointer=MemorySaver())
-        print(f"Watching Gmail INBOX (unread_only={unread_only}, poll_interval={poll_interval}s). Press Ctrl+C to stop.")
-        _run_loop(service, graph, processed, poll_interval, unread_only, max_results, user_id)
-
-
-def _run_loop(service, graph, processed: set[str], poll_interval: int, unread_only: bool, max_results: int, user_id: str) -> None:
+    if settings["execution"] == "queue":
+        if not database_url:
+            print("GMAIL_EXECUTION=queue requires DATABASE_URL (run scripts/setup_db.py once).")
+            if receiver is not None:
+                receiver.stop()
+            ledger.close()
+            return
+        job_queue = await asyncio.to_thread(PostgresJobQueue, database_url, settings["user_id"])
+        try:
+            print(_banner(settings, " async -> job queue"))
+            with postgres_store() as store:
+                await _run_loop_async(service, None, ledger, settings, receiver, job_queue=job_queue, store=store)
+        finally:
+            if receiver is not None:
+                receiver.stop()
+            job_queue.close()
+            ledger.close()
+        return
+    try:
+        if database_url:
+            # Sync PostgresStore: graph nodes read it through asyncio.to_thread.
+            async with async_postgres_checkpointer() as checkpointer:
+                with postgres_store() as store:
+                    graph = build_email_assistant_graph(checkpointer=checkpointer, store=store)
+                    print(_banner(settings, " async"))
+                    await _run_loop_async(service, graph, ledger, settings, receiver, store=store)
+        else:
+            graph = build_email_assistant_graph(checkpointer=MemorySaver())
+            print(_banner(settings, " async"))
+            await _run_loop_async(service, graph, ledger, settings, receiver)
+    finally:
+        if receiver is not None:
+            receiver.stop()
+        ledger.close()
+
+
+async def _run_loop_async(
+    service,
+    graph,
+    ledger,
+    settings: dict,
+    receiver: Optional[PushReceiver] = None,
+    job_queue: Optional[PostgresJobQueue] = None,
+    store=None,
+) -> None:
+    """
+    Async _run_loop: Gmail list/get and ledger writes run in worker threads, one Gmail call at
+    a time (shared service is not thread-safe); each email becomes a task running graph.ainvoke.
+    A semaphore bounds in-flight tasks and a per-Gmail-thread lock keeps emails in the same thread in order.
+    With job_queue (GMAIL_EXECUTION=queue) fetched emails are only enqueued (graph unused).
+    """
     first_poll = True
+    watch_expires_at = 0.0
+    sync_mode = settings["sync_mode"]
+    user_id = settings["user_id"]
+    cursor = load_history_cursor() if sync_mode == "history" else None
+    scheduler = _make_scheduler(settings)
+    slots = asyncio.Semaphore(max(1, settings["concurrency"]))
+    # Gmail thread key -> [lock, number of tasks holding or waiting on it]; dropped when unused.
+    thread_locks: dict[str, list] = {}
+    tasks: set[asyncio.Task] = set()
+    in_flight: dict[str, str] = {}
+
+    async def process(key: str, message_id: str, email_input: dict, triage_decision: Optional[str]) -> None:
+        thread_id = f"gmail-{message_id}"
+        config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
+        entry = thread_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                result = await graph.ainvoke(_graph_input(email_input, triage_decision), config=config)
+            await asyncio.to_thread(_record_result, ledger, thread_id, message_id, email_input, result)
+        except Exception as e:
+            print(f"[{thread_id}] invoke failed: {e}")
+            await asyncio.to_thread(ledger.mark, message_id, FAILED, str(e))
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del thread_locks[key]
+            in_flight.pop(message_id, None)
+            slots.release()
+
     while True:
         try:
-            ids = list_inbox_message_ids(service, max_results=max_results, unread_only=unread_only)
-            if first_poll and not ids:
+            watch_expires_at = await asyncio.to_thread(_renew_gmail_watch, service, settings, watch_expires_at)
+            new_ids, new_cursor = await asyncio.to_thread(
+                _poll_message_ids, service, cursor, sync_mode, settings["max_results"], settings["unread_only"]
+            )
+            if first_poll and not new_ids and not cursor:
                 print("No messages from Gmail INBOX. Try GMAIL_UNREAD_ONLY=0 to fetch recent (not only unread), or check OAuth scopes include gmail.readonly.")
             first_poll = False
-            for message_id in ids:
-                if message_id in processed:
-                    continue
-                try:
-                    email_input = get_message_as_email_input(service, message_id)
-                except Exception as e:
-                    print(f"[{message_id}] Gmail get failed: {e}")
-                    continue
-                if not email_input:
-                    print(f"[{message_id}] Could not fetch message (API error or missing body). Skipping.")
-                    continue
-                thread_id = f"gmail-{message_id}"
-                config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
-                try:
-                    result = graph.invoke({"email_input": email_input}, config=config)
-                    processed.add(message_id)
-                    save_processed_ids(processed)
-                    decision = result.get("classification_decision", "")
-                    from_addr = (email_input.get("from") or "")[:40]
-                    subj = (email_input.get("subject") or "")[:50]
-                    print(f"[{thread_id}] {decision} | From: {from_addr} | Subject: {subj}")
-                    if result.get("__interrupt__"):
-                        print("  -> Notify: graph paused; resume with Command(resume='respond') or Command(resume='ignore')")
-                except Exception as e:
-                    print(f"[{thread_id}] invoke failed: {e}")
+            running = frozenset(in_flight)
+            if job_queue is not None:
+                running |= await asyncio.to_thread(_enqueued_ids, job_queue, ledger, settings["max_attempts"])
+            ids = await asyncio.to_thread(_claim_ids, ledger, new_ids, settings["max_attempts"], running)
+            # Claimed ids are queued in the ledger: a restart re-runs them, so the cursor moves on now.
+            if new_cursor and new_cursor != cursor:
+                cursor = new_cursor
+                save_history_cursor(cursor)
+            rules = await asyncio.to_thread(_pre_triage_rules, settings, store)
+            fetched = await asyncio.to_thread(_fetch_new_emails, service, ids, ledger, rules)
+            if job_queue is not None:
+                await asyncio.to_thread(_enqueue_emails, job_queue, fetched)
+                fetched = []
+            decisions = await _abatch_triage(fetched, settings, store, frozenset(in_flight.values())) if fetched else {}
+            for message_id, email_input in fetched:
+                await slots.acquire()  # backpressure
+                key = email_input.get("gmail_thread_id") or message_id
+                in_flight[message_id] = key
+                task = asyncio.create_task(process(key, message_id, email_input, decisions.get(message_id)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.to_thread(ledger.prune, settings["ledger_max_entries"])
+            scheduler.record_success(len(new_ids))
         except Exception as e:
-            print(f"Poll error (Gmail list or auth): {e}")
-        time.sleep(poll_interval)
+            _record_poll_error(scheduler, e)
+        timeout = await asyncio.to_thread(_push_wait_timeout, receiver, settings, scheduler)
+        if timeout is None:
+            await asyncio.sleep(scheduler.next_delay)
+        else:
+            try:
+                history_id = await asyncio.to_thread(receiver.wait, timeout)
+            except asyncio.CancelledError:
+                receiver.stop()  # Wakes the worker thread still blocked in receiver.wait().
+                raise
+            if history_id:
+                print(f"Push notification (historyId={history_id}); fetching new mail.")
 
 
 if __name__ == "__main__":
@@ -1,15 +1,18 @@
 """
 DB layer: store (memory) and checkpointer (PostgresSaver) configuration.
 
-Use cases: postgres_checkpointer(), postgres_store(), setup_store(), persist_messages()
-for compile(store=..., checkpointer=...) and saving chat history.
+Use cases: postgres_checkpointer(), async_postgres_checkpointer(), postgres_store(), setup_store(), persist_messages()
+for compile(store=..., checkpointer=...) and saving chat history; PostgresJobQueue for the durable email job queue.
 """
 
-from email_assistant.db.checkpointer import postgres_checkpointer
+from email_assistant.db.checkpointer import async_postgres_checkpointer, postgres_checkpointer
+from email_assistant.db.job_queue import PostgresJobQueue
 from email_assistant.db.persist_messages import persist_messages, thread_id_to_chat_id
 from email_assistant.db.store import postgres_store, setup_store
 
 __all__ = [
+    "PostgresJobQueue",
+    "async_postgres_checkpointer",
     "persist_messages",
     "postgres_checkpointer",
     "postgres_store",
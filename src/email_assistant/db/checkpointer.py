@@ -5,16 +5,18 @@ Use cases: create checkpointer from DATABASE_URL; call setup() for checkpoint ta
 pass into graph compile(checkpointer=...). Use postgres_checkpointer() as a context
 manager when DATABASE_URL is set; otherwise use MemorySaver in the caller.
 Checkpoint tables are created in the email_assistant schema via search_path.
+async_postgres_checkpointer() is the AsyncPostgresSaver equivalent for graph.ainvoke callers.
 """
 
 import os
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import AsyncIterator, Iterator, Optional
 
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.postgres import PostgresSaver
-from psycopg import Connection
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg import AsyncConnection, Connection
 from psycopg.rows import dict_row
 
 
@@ -39,6 +41,28 @@ def postgres_checkpointer() -> Iterator[PostgresSaver]:
         conn.close()
 
 
+@asynccontextmanager
+async def async_postgres_checkpointer() -> AsyncIterator[AsyncPostgresSaver]:
+    """
+    Yield an AsyncPostgresSaver for DATABASE_URL with search_path=email_assistant.
+
+    Use cases: async watcher (graph.ainvoke). Like postgres_checkpointer(), does not run
+    setup(); run scripts/setup_db.py once. For LangGraph Studio use studio_checkpointer.
+    """
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL is required for postgres checkpointer")
+    conn = await AsyncConnection.connect(
+        url, autocommit=True, prepare_threshold=None, row_factory=dict_row
+    )
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute("SET search_path TO email_assistant")
+        yield AsyncPostgresSaver(conn)
+    finally:
+        await conn.close()
+
+
 def run_checkpoint_created_at_migration(migration_path: Optional[Path] = None) -> None:
     """
     Run migrations/002_checkpoint_created_at.sql to add created_at to checkpoint tables.
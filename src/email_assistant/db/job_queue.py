@@ -0,0 +1,279 @@
+"""
+Durable email job queue in email_assistant.email_jobs (migrations/004_email_jobs.sql).
+
+Use cases: split ingestion from execution. The Gmail watcher (GMAIL_EXECUTION=queue)
+enqueues one job per message; any number of workers (scripts/email_worker.py, on one or
+many hosts) claim jobs with FOR UPDATE SKIP LOCKED and a lease (visibility timeout). A
+worker that crashes simply lets its lease expire and the job is claimed again; jobs that
+keep failing are retried with backoff and dead-lettered after max_attempts. A job is not
+claimed while its Gmail thread has an earlier unfinished job (queued, even if backing off,
+or running) or another job of that thread holds a live lease, so a thread's emails run in
+arrival order (best effort: two workers claiming at the same instant may still overlap).
+
+With a ledger (ingest/ledger.py), the watcher leaves enqueued ids queued there and the
+queue records the outcome: done / interrupted in complete(), failed when a job is
+dead-lettered.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from email_assistant.ingest.ledger import (
+    DONE as LEDGER_DONE,
+    FAILED as LEDGER_FAILED,
+    INTERRUPTED as LEDGER_INTERRUPTED,
+    QUEUED as LEDGER_QUEUED,
+)
+
+from psycopg import Connection
+from psycopg.rows import dict_row
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+INTERRUPTED = "interrupted"
+DEAD = "dead"
+JOB_STATUSES = (QUEUED, RUNNING, DONE, INTERRUPTED, DEAD)
+
+
+def _project_root() -> Path:
+    # job_queue.py is at .../src/email_assistant/db/job_queue.py -> parents[3] = project root
+    return Path(__file__).resolve().parents[3]
+
+
+class PostgresJobQueue:
+    """Lease-based job queue for one user_id; safe to share across worker threads."""
+
+    def __init__(self, conn_string: str, user_id: str = "default-user", ledger=None):
+        self.user_id = str(user_id)
+        # Processed-message ledger shared with the watcher; finished jobs are recorded there.
+        self.ledger = ledger
+        self._lock = threading.Lock()
+        self._conn = Connection.connect(
+            conn_string, autocommit=True, prepare_threshold=None, row_factory=dict_row
+        )
+
+    def setup(self, migration_path: Optional[Path] = None) -> None:
+        """Create the jobs table (runs migrations/004_email_jobs.sql; idempotent)."""
+        if migration_path is None:
+            migration_path = _project_root() / "migrations" / "004_email_jobs.sql"
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(migration_path.read_text())
+
+    def enqueue(self, jobs: Iterable[dict[str, Any]]) -> int:
+        """
+        Insert jobs ({"message_id", "email_input", optional "gmail_thread_id"}) in one transaction.
+
+        A message already in the queue (any status) is skipped, so re-ingesting is harmless.
+        Returns the number of new jobs.
+        """
+        rows = [
+            (
+                self.user_id,
+                str(job["message_id"]),
+                job.get("gmail_thread_id") or (job.get("email_input") or {}).get("gmail_thread_id"),
+                json.dumps(job.get("email_input") or {}),
+            )
+            for job in jobs
+        ]
+        if not rows:
+            return 0
+        inserted = 0
+        with self._lock, self._conn.transaction(), self._conn.cursor() as cur:
+            for row in rows:
+                cur.execute(
+                    """
+                    INSERT INTO email_assistant.email_jobs (user_id, message_id, gmail_thread_id, email_input)
+                    VALUES (%s, %s, %s, %s::jsonb)
+                    ON CONFLICT (user_id, message_id) DO NOTHING
+                    """,
+                    row,
+                )
+                inserted += cur.rowcount
+        return inserted
+
+    def known_message_ids(self, message_ids: Iterable[str]) -> set[str]:
+        """Return the given message ids that already have a job (any status)."""
+        ids = [str(mid) for mid in message_ids]
+        if not ids:
+            return set()
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT message_id FROM email_assistant.email_jobs WHERE user_id = %s AND message_id = ANY(%s)",
+                (self.user_id, ids),
+            )
+            return {row["message_id"] for row in cur.fetchall()}
+
+    def _mark_ledger(self, message_ids: Iterable[str], status: str, error: Optional[str] = None) -> None:
+        ids = list(message_ids)
+        if self.ledger is not None and ids:
+            self.ledger.mark(ids, status, error=error)
+
+    def claim(
+        self, worker_id: str, limit: int = 1, visibility_timeout: float = 600, max_attempts: int = 5
+    ) -> list[dict]:
+        """
+        Lease up to limit runnable jobs to worker_id for visibility_timeout seconds.
+
+        Runnable: queued and due, or running with an expired lease (crashed worker) and fewer
+        than max_attempts attempts (reap_expired dead-letters the rest). A job whose Gmail
+        thread has an earlier queued or running job (whatever its available_at), or another
+        job with a live lease, waits for it. Rows locked by a concurrent claim are skipped,
+        not waited on. Increments attempts.
+        """
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_assistant.email_jobs AS j SET
+                  status = %s,
+                  lease_owner = %s,
+                  lease_expires_at = now() + make_interval(secs => %s),
+                  attempts = j.attempts + 1,
+                  updated_at = now()
+                WHERE j.job_id IN (
+                  SELECT c.job_id FROM email_assistant.email_jobs AS c
+                  WHERE c.user_id = %s
+                    AND ((c.status = %s AND c.available_at <= now())
+                         OR (c.status = %s AND c.lease_expires_at < now() AND c.attempts < %s))
+                    AND (c.gmail_thread_id IS NULL OR NOT EXISTS (
+                      SELECT 1 FROM email_assistant.email_jobs AS r
+                      WHERE r.user_id = c.user_id AND r.gmail_thread_id = c.gmail_thread_id
+                        AND r.job_id != c.job_id
+                        AND ((r.status = %s AND r.lease_expires_at >= now())
+                             OR (r.job_id < c.job_id AND r.status IN (%s, %s)))
+                    ))
+                  ORDER BY c.created_at, c.job_id
+                  LIMIT %s
+                  FOR UPDATE SKIP LOCKED
+                )
+                RETURNING j.job_id, j.message_id, j.gmail_thread_id, j.email_input, j.attempts
+                """,
+                (
+                    RUNNING, worker_id, float(visibility_timeout), self.user_id,
+                    QUEUED, RUNNING, int(max_attempts), RUNNING, QUEUED, RUNNING, int(limit),
+                ),
+            )
+            return sorted(cur.fetchall(), key=lambda row: row["job_id"])
+
+    def extend_lease(self, job_id: int, worker_id: str, visibility_timeout: float = 600) -> bool:
+        """Heartbeat: push the lease out again. False if worker_id no longer holds the job."""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_assistant.email_jobs
+                SET lease_expires_at = now() + make_interval(secs => %s), updated_at = now()
+                WHERE job_id = %s AND status = %s AND lease_owner = %s
+                """,
+                (float(visibility_timeout), job_id, RUNNING, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, status: str = DONE) -> bool:
+        """
+        Finish a job as done or interrupted (HITL pending) and record it in the ledger.
+
+        False if the lease was lost (the ledger is then left to the worker that holds it).
+        """
+        if status not in (DONE, INTERRUPTED):
+            raise ValueError(f"Unknown completion status: {status}")
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_assistant.email_jobs
+                SET status = %s, lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = now()
+                WHERE job_id = %s AND status = %s AND lease_owner = %s
+                RETURNING message_id
+                """,
+                (status, job_id, RUNNING, worker_id),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return False
+        self._mark_ledger([row["message_id"]], LEDGER_DONE if status == DONE else LEDGER_INTERRUPTED)
+        return True
+
+    def fail(
+        self,
+        job_id: int,
+        worker_id: str,
+        error: str,
+        max_attempts: int = 5,
+        retry_delay: float = 30,
+    ) -> Optional[str]:
+        """
+        Record a failed attempt: requeue with exponential backoff, or dead-letter at max_attempts.
+
+        Returns the new status (queued or dead), or None if the lease was lost.
+        """
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_assistant.email_jobs SET
+                  status = CASE WHEN attempts >= %s THEN %s ELSE %s END,
+                  available_at = now() + make_interval(secs => %s * power(2, GREATEST(attempts - 1, 0))),
+                  lease_owner = NULL,
+                  lease_expires_at = NULL,
+                  last_error = %s,
+                  updated_at = now()
+                WHERE job_id = %s AND status = %s AND lease_owner = %s
+                RETURNING status, message_id
+                """,
+                (int(max_attempts), DEAD, QUEUED, float(retry_delay), str(error)[:2000], job_id, RUNNING, worker_id),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        if row["status"] == DEAD:
+            self._mark_ledger([row["message_id"]], LEDGER_FAILED, error=str(error))
+        return row["status"]
+
+    def reap_expired(self, max_attempts: int = 5) -> int:
+        """Dead-letter running jobs whose lease expired after their last allowed attempt."""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_assistant.email_jobs
+                SET status = %s, lease_owner = NULL, lease_expires_at = NULL,
+                    last_error = COALESCE(last_error, 'lease expired'), updated_at = now()
+                WHERE user_id = %s AND status = %s AND lease_expires_at < now() AND attempts >= %s
+                RETURNING message_id
+                """,
+                (DEAD, self.user_id, RUNNING, int(max_attempts)),
+            )
+            message_ids = [row["message_id"] for row in cur.fetchall()]
+        self._mark_ledger(message_ids, LEDGER_FAILED, error="lease expired")
+        return len(message_ids)
+
+    def requeue_dead(self, job_ids: Optional[Iterable[int]] = None) -> int:
+        """Move dead-lettered jobs (all, or the given ids) back to queued with attempts reset (queued in the ledger too)."""
+        params: list[Any] = [QUEUED, self.user_id, DEAD]
+        where = ""
+        if job_ids is not None:
+            where = " AND job_id = ANY(%s)"
+            params.append(list(job_ids))
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                "UPDATE email_assistant.email_jobs SET status = %s, attempts = 0, available_at = now(), updated_at = now() "
+                "WHERE user_id = %s AND status = %s" + where + " RETURNING message_id",
+                params,
+            )
+            message_ids = [row["message_id"] for row in cur.fetchall()]
+        self._mark_ledger(message_ids, LEDGER_QUEUED)
+        return len(message_ids)
+
+    def stats(self) -> dict[str, int]:
+        """Return {status: job count} for this user."""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT status, COUNT(*) AS n FROM email_assistant.email_jobs WHERE user_id = %s GROUP BY status",
+                (self.user_id,),
+            )
+            counts = {status: 0 for status in JOB_STATUSES}
+            counts.update({row["status"]: row["n"] for row in cur.fetchall()})
+            return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
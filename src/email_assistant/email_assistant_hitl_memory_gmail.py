@@ -3,37 +3,78 @@ Entry: build and compile the top-level graph with two subagents (Email Assistant
 
 Use cases: one agent (START → input_router → email_assistant subgraph or prepare_messages → response_agent subgraph → mark_as_read).
 Phase 6: optional store for memory (triage/response/cal preferences); HITL for notify and for send_email/schedule_meeting.
+Blocking nodes (triage, chat, persist_messages, mark_as_read) carry sync and async implementations, so the same
+compiled graph runs with invoke (CLI, thread-pool watcher) and ainvoke (async watcher, Studio).
 """
 
+import asyncio
 import os
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.config import get_config
 from langgraph.graph import END, START, StateGraph
 
 from email_assistant.memory import get_memory
 from email_assistant.schemas import State, StateInput
 from email_assistant.nodes.input_router import input_router
-from email_assistant.nodes.triage import triage_router
+from email_assistant.nodes.triage import atriage_router, triage_router
 from email_assistant.nodes.triage_interrupt import triage_interrupt_handler
 from email_assistant.nodes.prepare_messages import prepare_messages
-from email_assistant.nodes.mark_as_read import mark_as_read_node
+from email_assistant.nodes.mark_as_read import amark_as_read_node, mark_as_read_node
 from email_assistant.simple_agent import build_response_subgraph
+from email_assistant.thread_context import get_thread_context_cache
+from email_assistant.triage_rules import get_triage_rules
+
+
+def _config_user_id() -> str:
+    config = get_config()
+    return (config.get("configurable") or {}).get("user_id", os.getenv("USER_ID", "default-user"))
+
+
+def _record_thread_context(store, user_id: str, state: State) -> str:
+    """Rendered earlier messages of the email's Gmail thread ("" when none); records this email for later ones."""
+    email_input = state.get("email_input")
+    if not email_input:
+        return ""
+    try:
+        return get_thread_context_cache(store).record(user_id, email_input)
+    except Exception as e:
+        print(f"Thread context unavailable: {e}")
+        return ""
 
 
 def _make_triage_node(store=None):
-    """When store is set, load triage_preferences and call triage_router with triage_instructions."""
+    """Load thread context and triage rules (and, when store is set, triage_preferences), then call triage_router."""
 
     def triage_node(state: State) -> dict:
+        user_id = _config_user_id()
         triage_instructions = ""
         if store is not None:
-            config = get_config()
-            user_id = (config.get("configurable") or {}).get("user_id", os.getenv("USER_ID", "default-user"))
             triage_instructions = get_memory(store, user_id, "triage_preferences") or ""
-        return triage_router(state, triage_instructions=triage_instructions)
+        thread_context = _record_thread_context(store, user_id, state)
+        rules = get_triage_rules(store, user_id)
+        update = triage_router(state, triage_instructions=triage_instructions, thread_context=thread_context, rules=rules)
+        return {**update, "thread_context": thread_context}
 
     return triage_node
 
 
+def _make_atriage_node(store=None):
+    """Async triage node: triage_preferences, thread context and triage rules read in a worker thread, then atriage_router."""
+
+    async def atriage_node(state: State) -> dict:
+        user_id = _config_user_id()
+        triage_instructions = ""
+        if store is not None:
+            triage_instructions = await asyncio.to_thread(get_memory, store, user_id, "triage_preferences") or ""
+        thread_context = await asyncio.to_thread(_record_thread_context, store, user_id, state)
+        rules = await asyncio.to_thread(get_triage_rules, store, user_id)
+        update = await atriage_router(state, triage_instructions=triage_instructions, thread_context=thread_context, rules=rules)
+        return {**update, "thread_context": thread_context}
+
+    return atriage_node
+
+
 def _after_triage_route(state: State) -> str:
     """Inside Email Assistant subgraph: ignore/respond → END, notify → triage_interrupt_handler."""
     decision = (state.get("classification_decision") or "").strip().lower()
@@ -49,7 +90,7 @@ def build_email_assistant_subgraph(store=None):
     When store is set, triage node loads triage_preferences from memory.
     """
     builder = StateGraph(State)
-    builder.add_node("triage_router", _make_triage_node(store))
+    builder.add_node("triage_router", RunnableLambda(_make_triage_node(store), afunc=_make_atriage_node(store), name="triage_router"))
     builder.add_node("triage_interrupt_handler", triage_interrupt_handler)
     builder.add_edge(START, "triage_router")
     builder.add_conditional_edges("triage_router", _after_triage_route, {
@@ -94,7 +135,7 @@ def build_email_assistant_graph(checkpointer=None, store=None):
     builder.add_node("email_assistant", email_subgraph)
     builder.add_node("prepare_messages", prepare_messages)
     builder.add_node("response_agent", response_subgraph)
-    builder.add_node("mark_as_read", mark_as_read_node)
+    builder.add_node("mark_as_read", RunnableLambda(mark_as_read_node, afunc=amark_as_read_node, name="mark_as_read"))
 
     builder.add_edge(START, "input_router")
     builder.add_conditional_edges("input_router", _after_input_router_route, {
@@ -0,0 +1,24 @@
+"""
+Ingestion helpers for the Gmail watcher: worker pool, processed-message ledger, push receiver,
+header-only pre-triage, adaptive poll scheduler.
+
+Use cases: scripts/watch_gmail.py feeds new emails into the graph through these
+helpers so slow LLM runs do not block the inbox and restarts do not lose or repeat emails.
+"""
+
+from email_assistant.ingest.ledger import PostgresLedger, SqliteLedger, open_ledger
+from email_assistant.ingest.pool import KeyedWorkerPool
+from email_assistant.ingest.pretriage import pre_triage
+from email_assistant.ingest.push import PushReceiver, parse_push_payload
+from email_assistant.ingest.scheduler import PollScheduler
+
+__all__ = [
+    "KeyedWorkerPool",
+    "PollScheduler",
+    "PostgresLedger",
+    "PushReceiver",
+    "SqliteLedger",
+    "open_ledger",
+    "parse_push_payload",
+    "pre_triage",
+]
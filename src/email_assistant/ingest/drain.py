@@ -0,0 +1,148 @@
+"""
+Backlog drain helpers: resumable progress file and Gmail quota pacing.
+
+Use cases: `scripts/watch_gmail.py --drain` works through the whole inbox backlog (after an
+outage or on first onboarding) oldest first. Phase one lists every matching id page by page;
+phase two processes them from the oldest end in chunks. DrainProgress records the listing
+page token and how many ids have been processed after every page / chunk, so a stopped drain
+resumes where it left off; listed ids are appended to a side file once, so a checkpoint costs
+the same however large the backlog is. QuotaPacer spaces Gmail calls to stay under the
+per-user quota.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from email_assistant.tools.gmail.api import QUOTA_UNITS
+
+# Gmail quota units per call (developers.google.com/gmail/api/reference/quota).
+LIST_UNITS = QUOTA_UNITS["gmail.users.messages.list"]
+GET_UNITS = QUOTA_UNITS["gmail.users.messages.get"]
+
+
+class QuotaPacer:
+    """Spread quota spending evenly: spend(units) sleeps so the average stays at units_per_second."""
+
+    def __init__(self, units_per_second: float):
+        self.units_per_second = float(units_per_second)
+        self._next = time.monotonic()
+
+    def spend(self, units: float) -> float:
+        """Reserve units of quota, sleeping until the reservation starts. Returns seconds slept."""
+        if self.units_per_second <= 0 or units <= 0:
+            return 0.0
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + units / self.units_per_second
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class DrainProgress:
+    """
+    Persistent drain state: ids listed so far (newest first, as Gmail returns them), the
+    next page token, whether listing finished, and how many ids were processed from the oldest end.
+
+    The JSON checkpoint holds only the page token and counters; the ids live in an append-only
+    side file (<path>.ids, one per line). An id appended after the last checkpoint is ignored on
+    load (its page is listed again from the saved token).
+    """
+
+    def __init__(self, path: str | Path, query: str = ""):
+        self.path = Path(path)
+        self.ids_path = self.path.with_name(self.path.name + ".ids")
+        self.query = query
+        self.ids: list[str] = []
+        self.page_token: Optional[str] = None
+        self.listed = False
+        self.processed = 0
+        self.history_id: Optional[str] = None
+        # Ids already in ids_path (None: file unknown or stale, rewrite it on the next save).
+        self._ids_written: Optional[int] = None
+
+    @classmethod
+    def load(cls, path: str | Path, query: str = "") -> "DrainProgress":
+        """Load progress from path; start fresh if the file is missing, unreadable or for another query."""
+        progress = cls(path, query)
+        p = Path(path)
+        if not p.exists():
+            return progress
+        try:
+            with open(p, "r") as f:
+                data = json.load(f)
+        except Exception:
+            return progress
+        if data.get("query", "") != query:
+            return progress
+        listed_count = int(data.get("listed_count", 0))
+        try:
+            with open(progress.ids_path, "r") as f:
+                ids = [line.strip() for line in f if line.strip()]
+        except OSError:
+            ids = []
+        if len(ids) < listed_count:
+            return progress
+        progress.ids = ids[:listed_count]
+        progress._ids_written = listed_count if len(ids) == listed_count else None
+        progress.page_token = data.get("page_token") or None
+        progress.listed = bool(data.get("listed"))
+        progress.processed = int(data.get("processed", 0))
+        progress.history_id = data.get("history_id") or None
+        return progress
+
+    def save(self) -> None:
+        """
+        Append newly listed ids to the side file, then write the checkpoint atomically
+        (temp file + rename) so a crash never leaves a half-written checkpoint.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self._ids_written != len(self.ids):
+            # Append the new page; a fresh drain or a stale side file is written from scratch.
+            start = self._ids_written if self._ids_written is not None else 0
+            with open(self.ids_path, "a" if start else "w") as f:
+                f.writelines(f"{mid}\n" for mid in self.ids[start:])
+                f.flush()
+                os.fsync(f.fileno())
+            self._ids_written = len(self.ids)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "query": self.query,
+                    "listed_count": len(self.ids),
+                    "page_token": self.page_token,
+                    "listed": self.listed,
+                    "processed": self.processed,
+                    "history_id": self.history_id,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+    def add_page(self, ids: list[str], next_page_token: Optional[str]) -> None:
+        """Append one listed page; listing is finished when there is no next page."""
+        self.ids.extend(ids)
+        self.page_token = next_page_token
+        self.listed = not next_page_token
+
+    def next_chunk(self, size: int) -> list[str]:
+        """The next size ids to process, oldest first (empty when done)."""
+        end = len(self.ids) - self.processed
+        return list(reversed(self.ids[max(0, end - size):end]))
+
+    def advance(self, count: int) -> None:
+        self.processed = min(len(self.ids), self.processed + count)
+
+    @property
+    def remaining(self) -> int:
+        return len(self.ids) - self.processed
+
+    def clear(self) -> None:
+        """Remove the progress files once the drain completed."""
+        self.path.unlink(missing_ok=True)
+        self.ids_path.unlink(missing_ok=True)
@@ -0,0 +1,258 @@
+"""
+Processed-message ledger: per Gmail message id, the watcher's processing status.
+
+Use cases: replaces .gmail_processed_ids.json. The watcher marks ids queued before
+fetching, then done / interrupted / failed after the graph run, so a restarted watcher
+re-runs queued and failed ids and skips the rest. Each status change is a single-row
+upsert (cost does not grow with the number of ids stored); pruning drops the oldest
+finished rows by processing time.
+
+Backends: SqliteLedger (local file, default) and PostgresLedger (email_assistant.processed_messages,
+migrations/003_processed_messages.sql). open_ledger() picks one from env.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from psycopg import Connection
+from psycopg.rows import dict_row
+
+QUEUED = "queued"
+DONE = "done"
+INTERRUPTED = "interrupted"
+FAILED = "failed"
+STATUSES = (QUEUED, DONE, INTERRUPTED, FAILED)
+# Finished statuses: the watcher never runs these ids again.
+FINISHED_STATUSES = (DONE, INTERRUPTED)
+
+
+def _project_root() -> Path:
+    # ledger.py is at .../src/email_assistant/ingest/ledger.py -> parents[3] = project root
+    return Path(__file__).resolve().parents[3]
+
+
+class SqliteLedger:
+    """Ledger in a local SQLite file (WAL mode); safe to share across watcher threads."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS processed_messages (
+              message_id  TEXT PRIMARY KEY,
+              status      TEXT NOT NULL,
+              attempts    INTEGER NOT NULL DEFAULT 0,
+              error       TEXT,
+              updated_at  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_messages_updated_at ON processed_messages(updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_messages_status ON processed_messages(status)")
+
+    def statuses(self, message_ids: Iterable[str]) -> dict[str, str]:
+        """Return {message_id: status} for the ids present in the ledger (one query per 500 ids)."""
+        ids = list(dict.fromkeys(message_ids))
+        out: dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT message_id, status FROM processed_messages WHERE message_id IN ({marks})", chunk
+                ).fetchall()
+                out.update({mid: status for mid, status in rows})
+        return out
+
+    def mark(self, message_ids: str | Iterable[str], status: str, error: Optional[str] = None) -> None:
+        """Upsert status for one or many ids in a single transaction; failed increments attempts."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown ledger status: {status}")
+        ids = [message_ids] if isinstance(message_ids, str) else list(message_ids)
+        if not ids:
+            return
+        now = time.time()
+        bump = 1 if status == FAILED else 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                """
+                INSERT INTO processed_messages (message_id, status, attempts, error, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET
+                  status = excluded.status,
+                  attempts = processed_messages.attempts + ?,
+                  error = excluded.error,
+                  updated_at = excluded.updated_at
+                """,
+                [(mid, status, bump, error, now, bump) for mid in ids],
+            )
+            self._conn.execute("COMMIT")
+
+    def pending(self, max_attempts: int = 3) -> list[str]:
+        """Ids left queued (e.g. by a crash) or failed fewer than max_attempts times, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id FROM processed_messages WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY updated_at",
+                (QUEUED, FAILED, max_attempts),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def prune(self, max_entries: int) -> int:
+        """Delete the oldest finished rows beyond max_entries (by processing time). Returns rows deleted."""
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                DELETE FROM processed_messages
+                WHERE status != ? AND updated_at < (
+                  SELECT updated_at FROM processed_messages ORDER BY updated_at DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (QUEUED, max(0, int(max_entries) - 1)),
+            )
+            return cur.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed_messages").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PostgresLedger:
+    """Ledger in email_assistant.processed_messages, keyed by (user_id, message_id)."""
+
+    def __init__(self, conn_string: str, user_id: str = "default-user"):
+        self.user_id = str(user_id)
+        self._lock = threading.Lock()
+        self._conn = Connection.connect(
+            conn_string, autocommit=True, prepare_threshold=None, row_factory=dict_row
+        )
+
+    def setup(self, migration_path: Optional[Path] = None) -> None:
+        """Create the ledger table (runs migrations/003_processed_messages.sql; idempotent)."""
+        if migration_path is None:
+            migration_path = _project_root() / "migrations" / "003_processed_messages.sql"
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(migration_path.read_text())
+
+    def statuses(self, message_ids: Iterable[str]) -> dict[str, str]:
+        """Return {message_id: status} for the ids present in the ledger (one query)."""
+        ids = list(dict.fromkeys(message_ids))
+        if not ids:
+            return {}
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT message_id, status FROM email_assistant.processed_messages WHERE user_id = %s AND message_id = ANY(%s)",
+                (self.user_id, ids),
+            )
+            return {row["message_id"]: row["status"] for row in cur.fetchall()}
+
+    def mark(self, message_ids: str | Iterable[str], status: str, error: Optional[str] = None) -> None:
+        """Upsert status for one or many ids in a single transaction; failed increments attempts."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown ledger status: {status}")
+        ids = [message_ids] if isinstance(message_ids, str) else list(message_ids)
+        if not ids:
+            return
+        bump = 1 if status == FAILED else 0
+        with self._lock, self._conn.transaction(), self._conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO email_assistant.processed_messages (user_id, message_id, status, attempts, error, updated_at)
+                VALUES (%s, %s, %s, %s, %s, now())
+                ON CONFLICT (user_id, message_id) DO UPDATE SET
+                  status = EXCLUDED.status,
+                  attempts = email_assistant.processed_messages.attempts + %s,
+                  error = EXCLUDED.error,
+                  updated_at = now()
+                """,
+                [(self.user_id, mid, status, bump, error, bump) for mid in ids],
+            )
+
+    def pending(self, max_attempts: int = 3) -> list[str]:
+        """Ids left queued (e.g. by a crash) or failed fewer than max_attempts times, oldest first."""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT message_id FROM email_assistant.processed_messages
+                WHERE user_id = %s AND (status = %s OR (status = %s AND attempts < %s))
+                ORDER BY updated_at
+                """,
+                (self.user_id, QUEUED, FAILED, max_attempts),
+            )
+            return [row["message_id"] for row in cur.fetchall()]
+
+    def prune(self, max_entries: int) -> int:
+        """Delete the oldest finished rows beyond max_entries (by processing time). Returns rows deleted."""
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM email_assistant.processed_messages
+                WHERE user_id = %s AND status != %s AND updated_at < (
+                  SELECT updated_at FROM email_assistant.processed_messages
+                  WHERE user_id = %s ORDER BY updated_at DESC LIMIT 1 OFFSET %s
+                )
+                """,
+                (self.user_id, QUEUED, self.user_id, max(0, int(max_entries) - 1)),
+            )
+            return cur.rowcount
+
+    def count(self) -> int:
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*) AS n FROM email_assistant.processed_messages WHERE user_id = %s", (self.user_id,)
+            )
+            return cur.fetchone()["n"]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def import_legacy_processed_ids(ledger, path: str | Path) -> int:
+    """
+    One-time import of a legacy {"ids": [...]} processed-ids JSON file as done.
+
+    Use cases: first start after upgrading from .gmail_processed_ids.json; no-op when the
+    ledger already has rows or the file is missing. Returns the number of ids imported.
+    """
+    p = Path(path)
+    if not p.exists() or ledger.count() > 0:
+        return 0
+    try:
+        with open(p, "r") as f:
+            ids = [str(i) for i in json.load(f).get("ids", [])]
+    except Exception:
+        return 0
+    ledger.mark(ids, DONE)
+    return len(ids)
+
+
+def open_ledger(user_id: str = "default-user"):
+    """
+    Open the ledger selected by GMAIL_LEDGER_BACKEND.
+
+    sqlite (default): file at GMAIL_LEDGER_PATH (default .gmail_ledger.sqlite3 in project root).
+    postgres: email_assistant.processed_messages via DATABASE_URL (run scripts/setup_db.py once).
+    """
+    backend = os.getenv("GMAIL_LEDGER_BACKEND", "sqlite").strip().lower()
+    if backend == "postgres":
+        url = os.getenv("DATABASE_URL")
+        if not url:
+            raise ValueError("DATABASE_URL is required for GMAIL_LEDGER_BACKEND=postgres")
+        return PostgresLedger(url, user_id=user_id)
+    path = os.getenv("GMAIL_LEDGER_PATH", "") or str(_project_root() / ".gmail_ledger.sqlite3")
+    return SqliteLedger(path)
@@ -0,0 +1,83 @@
+"""
+KeyedWorkerPool: bounded thread pool that keeps tasks with the same key in order.
+
+Use cases: the Gmail watcher runs graph.invoke for several emails at once; emails in
+the same Gmail thread (same key) still run one after another, in submit order.
+submit() blocks when max_workers tasks are already in flight, so the poll loop
+cannot fetch faster than the graph can process.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class KeyedWorkerPool:
+    """
+    Thread pool with a bound on in-flight tasks and per-key ordering.
+
+    A task counts as in flight from submit() until it finishes, including while it
+    waits behind an earlier task with the same key. Exceptions raised by a task are
+    passed to on_error (default: print) and do not stop later tasks for that key.
+    """
+
+    def __init__(self, max_workers: int = 4, on_error: Callable[[str, Exception], None] | None = None):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="email-worker")
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # key -> tasks waiting behind the running task for that key. Presence of a key means one is running.
+        self._pending: dict[str, deque] = {}
+        self._in_flight = 0
+        self._on_error = on_error or (lambda key, e: print(f"[{key}] worker error: {e}"))
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tasks submitted and not yet finished."""
+        with self._lock:
+            return self._in_flight
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any) -> None:
+        """Schedule fn(*args); blocks while the pool is full (backpressure)."""
+        self._slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+            queue = self._pending.get(key)
+            if queue is not None:
+                queue.append((fn, args))
+                return
+            self._pending[key] = deque()
+        self._executor.submit(self._run_key, key, fn, args)
+
+    def _run_key(self, key: str, fn: Callable[..., Any], args: tuple) -> None:
+        """Run fn, then any tasks queued behind it for the same key, on this worker thread."""
+        while True:
+            try:
+                fn(*args)
+            except Exception as e:
+                self._on_error(key, e)
+            finally:
+                self._slots.release()
+            with self._lock:
+                self._in_flight -= 1
+                queue = self._pending[key]
+                if queue:
+                    fn, args = queue.popleft()
+                else:
+                    del self._pending[key]
+                    if self._in_flight == 0:
+                        self._idle.notify_all()
+                    return
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Block until every submitted task has finished. Returns False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; when wait is True, finish in-flight tasks first."""
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
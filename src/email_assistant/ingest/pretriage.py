@@ -0,0 +1,72 @@
+"""
+Header-only pre-triage: decide from headers and snippet whether a message needs a full fetch.
+
+Use cases: first phase of the watcher's two-phase fetch (GMAIL_PRE_TRIAGE). The triage rules
+(triage_rules.py: the user's stored rules, TRIAGE_RULES_FILE and the defaults such as
+List-Unsubscribe, Precedence: bulk, Auto-Submitted and the Gmail promotions / social / forums
+categories) are evaluated on the metadata; a rule with action ignore settles the message without
+downloading the body or calling the triage LLM. Only the snippet of the body is known here, so
+the body takes part only when the snippet is short enough to be all of it; otherwise an ignore
+is settled only if no earlier rule with another action (e.g. the explicit-request phrases) looks
+at the text. Everything else goes on to format=full and the graph, where the same rules run on
+the full body. Conservative on purpose: the triage prompt prefers notify over ignore when in
+doubt, so only clear noise is dropped here.
+"""
+
+import html
+import os
+from typing import Optional
+
+from email_assistant.triage_rules import TriageRules, get_triage_rules
+
+IGNORE = "ignore"
+FETCH = "fetch"
+# Gmail cuts snippets at about 200 characters; a shorter one is taken to be the whole body.
+COMPLETE_SNIPPET_CHARS = 120
+
+
+def _allowed_senders() -> tuple[str, ...]:
+    """Lowercased sender substrings from GMAIL_PRE_TRIAGE_ALLOW (always fetched in full)."""
+    raw = os.getenv("GMAIL_PRE_TRIAGE_ALLOW", "")
+    return tuple(s.strip().lower() for s in raw.split(",") if s.strip())
+
+
+def pre_triage(
+    metadata: dict,
+    allow: Optional[tuple[str, ...]] = None,
+    rules: Optional[TriageRules] = None,
+) -> tuple[str, str]:
+    """
+    Classify one format=metadata message (see fetch_emails.get_messages_metadata).
+
+    Returns (decision, reason): decision is IGNORE (settle without a full fetch) or FETCH.
+    allow: sender substrings that are always fetched (default: GMAIL_PRE_TRIAGE_ALLOW).
+    rules: compiled triage rules; pass get_triage_rules(store, user_id) so the user's stored
+    rules apply (default: get_triage_rules() without a store, i.e. TRIAGE_RULES_FILE + defaults).
+    """
+    headers = metadata.get("headers") or {}
+    sender = headers.get("From") or ""
+
+    if allow is None:
+        allow = _allowed_senders()
+    if any(a in sender.lower() for a in allow):
+        return FETCH, "sender allowlisted"
+    if rules is None:
+        rules = get_triage_rules()
+    snippet = html.unescape(metadata.get("snippet") or "")
+    complete = len(snippet) < COMPLETE_SNIPPET_CHARS
+    match = rules.evaluate(
+        sender=sender,
+        subject=headers.get("Subject") or "",
+        body=snippet if complete else "",
+        headers=headers,
+        label_ids=metadata.get("label_ids"),
+    )
+    if match is None:
+        return FETCH, "no rule matched"
+    reason = f"rule {match.rule_id}: {match.reason}"
+    if match.action != IGNORE:
+        return FETCH, reason
+    if not complete and rules.text_can_override(match):
+        return FETCH, f"{reason}, but an earlier rule needs the full body"
+    return IGNORE, reason
@@ -0,0 +1,144 @@
+"""
+PushReceiver: local HTTP endpoint for Gmail watch / Pub/Sub push notifications.
+
+Use cases: the Gmail watcher waits on the receiver instead of sleeping a fixed interval,
+so a push payload carrying a historyId triggers an incremental fetch straight away;
+polling stays on as a slow safety net. Accepts the Pub/Sub push envelope
+({"message": {"data": base64({"emailAddress", "historyId"})}}) or a bare
+{"historyId": ...} body (local stand-in publisher: scripts/publish_push_notification.py).
+"""
+
+import base64
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def parse_push_payload(body: bytes) -> Optional[dict]:
+    """
+    Decode a push body into {"historyId": str, "emailAddress": str}; None if it has no historyId.
+
+    Use cases: PushReceiver request handling; also usable from a hosted webhook.
+    """
+    try:
+        data = json.loads(body.decode("utf-8") or "{}")
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    message = data.get("message")
+    if isinstance(message, dict) and message.get("data"):
+        try:
+            data = json.loads(base64.b64decode(message["data"]).decode("utf-8"))
+        except Exception:
+            return None
+        if not isinstance(data, dict):
+            return None
+    history_id = data.get("historyId")
+    if history_id in (None, ""):
+        return None
+    return {"historyId": str(history_id), "emailAddress": str(data.get("emailAddress") or "")}
+
+
+class PushReceiver:
+    """
+    Threaded HTTP server that records the newest pushed historyId and wakes waiters.
+
+    Notifications that arrive while the watcher is busy coalesce into one wake-up.
+    When token is set, requests must carry ?token=<token> (Pub/Sub push endpoint auth).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, path: str = "/gmail/push", token: str = ""):
+        self.path = path
+        self.token = token
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._latest_history_id: Optional[str] = None
+        self.received = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                url = urlparse(self.path)
+                if url.path != receiver.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                token = (parse_qs(url.query).get("token") or [""])[0]
+                if receiver.token and not hmac.compare_digest(token, receiver.token):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = parse_push_payload(self.rfile.read(length))
+                if payload is None:
+                    # 2xx anyway: Pub/Sub would otherwise redeliver a payload we can never parse.
+                    self.send_response(204)
+                    self.end_headers()
+                    return
+                receiver.notify(payload["historyId"])
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args) -> None:
+                pass  # Keep watcher output readable
+
+        return Handler
+
+    def notify(self, history_id: str) -> None:
+        """Record history_id (keeping the newest) and wake the watcher."""
+        with self._lock:
+            self.received += 1
+            try:
+                newer = self._latest_history_id is None or int(history_id) > int(self._latest_history_id)
+            except ValueError:
+                newer = True
+            if newer:
+                self._latest_history_id = history_id
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Block until a notification arrives, timeout elapses or the receiver is stopped.
+
+        Returns the newest pushed historyId (and resets it), or None on timeout or once stopped.
+        """
+        if self._stopped or not self._event.wait(timeout) or self._stopped:
+            return None
+        with self._lock:
+            self._event.clear()
+            history_id, self._latest_history_id = self._latest_history_id, None
+        return history_id
+
+    def start(self) -> "PushReceiver":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="gmail-push", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def stop(self) -> None:
+        """Stop the server and release any wait() in progress (idempotent)."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self._event.set()
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,138 @@
+"""
+PollScheduler: adaptive delay between Gmail watcher polls, with quota-aware backoff.
+
+Use cases: scripts/watch_gmail.py asks the scheduler how long to wait after each poll
+instead of sleeping a fixed GMAIL_POLL_INTERVAL. The interval follows the mail arrival rate
+(messages per minute, an EWMA over polls): it is the time in which about target_per_poll
+messages arrive, clamped to [min_interval, max_interval]. The rate starts at the value that
+makes base_interval the answer, so busy inboxes pull the interval down and idle polls let it
+grow gradually as the estimate decays. Rate-limit
+and server errors (429, 5xx, 403 rateLimitExceeded; see tools/gmail/api.classify_error) back off
+exponentially with jitter, honouring Retry-After; other errors retry at the current interval. state() returns a JSON-able
+snapshot for monitoring (the watcher writes it to GMAIL_WATCHER_STATE_FILE).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from email_assistant.tools.gmail.api import classify_error
+
+
+class PollScheduler:
+    """Thread-safe adaptive poll interval with exponential backoff and jitter on throttling."""
+
+    def __init__(
+        self,
+        base_interval: float = 60,
+        min_interval: float = 10,
+        max_interval: float = 600,
+        max_backoff: float = 900,
+        target_per_poll: float = 1,
+        rng: Optional[random.Random] = None,
+    ):
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.max_backoff = max(1.0, float(max_backoff))
+        self.base_interval = min(max(float(base_interval), self.min_interval), self.max_interval)
+        self.target_per_poll = max(0.01, float(target_per_poll))
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.interval = self.base_interval
+        self.consecutive_errors = 0
+        self.throttled = False
+        self.next_delay = self.interval
+        # Messages per minute, EWMA over polls; seeded so the first interval is base_interval.
+        self.arrival_rate = self.target_per_poll * 60.0 / max(self.base_interval, 1e-3)
+        self.polls = 0
+        self.errors = 0
+        self.messages = 0
+        self.last_status: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._last_poll_at: Optional[float] = None
+        self._next_poll_at: Optional[float] = None
+
+    def record_success(self, new_messages: int) -> float:
+        """Record a poll that found new_messages; returns the delay until the next poll."""
+        now = time.time()
+        with self._lock:
+            if self._last_poll_at is not None:
+                elapsed = max(1e-3, now - self._last_poll_at)
+                self.arrival_rate = 0.3 * (new_messages * 60.0 / elapsed) + 0.7 * self.arrival_rate
+            self._last_poll_at = now
+            self.polls += 1
+            self.messages += new_messages
+            self.consecutive_errors = 0
+            self.throttled = False
+            self.last_status = None
+            self.interval = self._interval_for_rate(self.arrival_rate)
+            self.next_delay = self.interval
+            self._next_poll_at = now + self.next_delay
+            return self.next_delay
+
+    def _interval_for_rate(self, rate: float) -> float:
+        """Seconds in which about target_per_poll messages arrive at rate, clamped to [min, max]."""
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_per_poll * 60.0 / rate))
+
+    def record_error(self, exc: BaseException) -> float:
+        """Record a failed poll; returns the delay until the next poll (backoff when throttled)."""
+        throttled, status, retry_after = classify_error(exc)
+        now = time.time()
+        with self._lock:
+            self.polls += 1
+            self.errors += 1
+            self.consecutive_errors += 1
+            self.throttled = throttled
+            self.last_status = status
+            self.last_error = str(exc)[:500]
+            if throttled:
+                # Equal jitter: uniform in [ceiling/2, ceiling] with ceiling = base * 2^n (capped); never below Retry-After.
+                ceiling = min(self.max_backoff, max(self.min_interval, 1.0) * 2 ** self.consecutive_errors)
+                delay = self._rng.uniform(ceiling / 2, ceiling)
+                if retry_after:
+                    delay = max(delay, min(retry_after, self.max_backoff))
+            else:
+                delay = self.interval
+            self.next_delay = delay
+            self._next_poll_at = now + delay
+            return delay
+
+    @property
+    def backing_off(self) -> bool:
+        with self._lock:
+            return self.throttled
+
+    def state(self) -> dict:
+        """Snapshot for monitoring: interval, backoff, error and arrival counters."""
+        with self._lock:
+            return {
+                "interval": round(self.interval, 3),
+                "next_delay": round(self.next_delay, 3),
+                "next_poll_at": self._next_poll_at,
+                "backing_off": self.throttled,
+                "consecutive_errors": self.consecutive_errors,
+                "last_status": self.last_status,
+                "last_error": self.last_error,
+                "arrival_rate_per_min": round(self.arrival_rate, 3),
+                "target_per_poll": self.target_per_poll,
+                "polls": self.polls,
+                "errors": self.errors,
+                "messages": self.messages,
+                "min_interval": self.min_interval,
+                "max_interval": self.max_interval,
+            }
+
+    def write_state(self, path: str | Path, extra: Optional[dict] = None) -> None:
+        """Write state() (plus extra keys, e.g. API stats) as JSON to path (temp file + rename)."""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({**self.state(), **(extra or {}), "updated_at": time.time()}, f)
+        os.replace(tmp, p)
@@ -0,0 +1,398 @@
+"""
+LLM response cache: answer an identical prompt from a cache instead of calling the model again.
+
+Use cases: the same newsletter triaged for several users, re-runs of one Gmail thread and
+retries after a crash send byte-identical prompts to triage_router (and, when enabled, the
+response agent's chat node). Entries are keyed by a SHA-256 of the call site, model, tool /
+output schema and the normalized message list (whitespace collapsed, tool-call ids dropped, so
+a re-run with fresh ids still hits). A call site can key on a reduced prompt (key_messages)
+instead: triage leaves out today's date and the To: line, which change per day and per recipient
+but not the classification. Two tiers: a per-process LRU, then a persistent tier shared
+by processes (SqliteResponseCache, default, or PostgresResponseCache in
+email_assistant.llm_cache, migrations/005_llm_cache.sql). Each call site has its own TTL
+(LLM_CACHE_TTL_<SITE>); triage is cached by default, chat only when its TTL is set, since a
+cached chat turn can repeat a tool call. Hits / misses per site are available from
+llm_cache_stats() for monitoring.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from psycopg import Connection
+from psycopg.rows import dict_row
+
+# Default TTL in seconds per call site; 0 = not cached. Override with LLM_CACHE_TTL_<SITE>.
+DEFAULT_TTLS = {"triage": 7 * 24 * 3600, "triage_batch": 7 * 24 * 3600, "chat": 0}
+MAX_ENTRIES = 1000
+
+
+def _project_root() -> Path:
+    # llm_cache.py is at .../src/email_assistant/llm_cache.py -> parents[2] = project root
+    return Path(__file__).resolve().parents[2]
+
+
+def _normalize_text(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def _normalize_message(message: Any) -> dict:
+    """Stable, JSON-able form of one message: role, content, tool calls (name + args), no ids."""
+    if isinstance(message, BaseMessage):
+        out = {"type": message.type, "content": _normalize_text(message.content)}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            out["tool_calls"] = [{"name": c.get("name"), "args": c.get("args")} for c in tool_calls]
+        if message.type == "tool":
+            out["name"] = getattr(message, "name", None)
+        return out
+    if isinstance(message, dict):
+        return {"type": message.get("role") or message.get("type"), "content": _normalize_text(message.get("content"))}
+    return {"type": "text", "content": _normalize_text(str(message))}
+
+
+def schema_fingerprint(schema: Any) -> str:
+    """JSON text of a tool list / output schema (TypedDict, pydantic model, tool, or OpenAI tool dicts)."""
+    if schema is None:
+        return ""
+    if not isinstance(schema, (list, tuple)):
+        schema = [schema]
+    out = []
+    for item in schema:
+        if not isinstance(item, dict):
+            from langchain_core.utils.function_calling import convert_to_openai_tool
+
+            item = convert_to_openai_tool(item)
+        out.append(item)
+    return json.dumps(out, sort_keys=True, default=str)
+
+
+def cache_key(site: str, messages: list, model: str, schema: Any = None) -> str:
+    """SHA-256 over call site, model, schema fingerprint and the normalized messages."""
+    payload = {
+        "site": site,
+        "model": model,
+        "schema": schema if isinstance(schema, str) else schema_fingerprint(schema),
+        "messages": [_normalize_message(m) for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _encode(value: Any) -> str:
+    if isinstance(value, BaseMessage):
+        return json.dumps({"kind": "message", "value": messages_to_dict([value])[0]})
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    return json.dumps({"kind": "json", "value": value}, default=str)
+
+
+def _decode(raw: str) -> Any:
+    data = json.loads(raw)
+    if data.get("kind") == "message":
+        return messages_from_dict([data["value"]])[0]
+    return data.get("value")
+
+
+class SqliteResponseCache:
+    """Persistent tier in a local SQLite file (WAL mode); safe to share across threads and processes."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              cache_key   TEXT PRIMARY KEY,
+              site        TEXT NOT NULL,
+              value       TEXT NOT NULL,
+              expires_at  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache(expires_at)")
+
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        """(encoded value, expires_at) or None when missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE cache_key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key: str, site: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO llm_cache (cache_key, site, value, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET site = excluded.site, value = excluded.value, expires_at = excluded.expires_at
+                """,
+                (key, site, value, expires_at),
+            )
+            self._writes += 1
+            # Expired rows are dropped every few hundred writes, so the file does not grow without bound.
+            if self._writes % 500 == 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PostgresResponseCache:
+    """Persistent tier in email_assistant.llm_cache (shared by all users: the key covers the whole prompt)."""
+
+    def __init__(self, conn_string: str):
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = Connection.connect(
+            conn_string, autocommit=True, prepare_threshold=None, row_factory=dict_row
+        )
+
+    def setup(self, migration_path: Optional[Path] = None) -> None:
+        """Create the cache table (runs migrations/005_llm_cache.sql; idempotent)."""
+        if migration_path is None:
+            migration_path = _project_root() / "migrations" / "005_llm_cache.sql"
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(migration_path.read_text())
+
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT value::text AS value, extract(epoch FROM expires_at) AS expires_at
+                FROM email_assistant.llm_cache WHERE cache_key = %s AND expires_at > now()
+                """,
+                (key,),
+            )
+            row = cur.fetchone()
+        return (row["value"], float(row["expires_at"])) if row else None
+
+    def put(self, key: str, site: str, value: str, expires_at: float) -> None:
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO email_assistant.llm_cache (cache_key, site, value, expires_at)
+                VALUES (%s, %s, %s::jsonb, to_timestamp(%s))
+                ON CONFLICT (cache_key) DO UPDATE SET
+                  site = EXCLUDED.site, value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                """,
+                (key, site, value, expires_at),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                cur.execute("DELETE FROM email_assistant.llm_cache WHERE expires_at <= now()")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class _SiteStats:
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    errors: int = 0
+
+
+class LLMResponseCache:
+    """Per-process LRU in front of an optional persistent tier; values are encoded results with an expiry."""
+
+    def __init__(self, persistent: Any = None, max_entries: int = MAX_ENTRIES):
+        self.persistent = persistent
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._stats: dict[str, _SiteStats] = {}
+
+    def _site(self, site: str) -> _SiteStats:
+        return self._stats.setdefault(site, _SiteStats())
+
+    def _remember(self, key: str, raw: str, expires_at: float) -> None:
+        with self._lock:
+            self._local[key] = (raw, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get_local(self, site: str, key: str) -> Optional[Any]:
+        """Value from the in-process tier (counts a memory hit), or None."""
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._local[key]
+                entry = None
+            if entry is None:
+                return None
+            self._local.move_to_end(key)
+            self._site(site).memory_hits += 1
+        return _decode(entry[0])
+
+    def get_persistent(self, site: str, key: str) -> Optional[Any]:
+        """Value from the persistent tier (promoted into the LRU), or None; counts the hit or the miss."""
+        entry = None
+        if self.persistent is not None:
+            try:
+                entry = self.persistent.get(key)
+            except Exception as e:
+                print(f"LLM cache read failed: {e}")
+                with self._lock:
+                    self._site(site).errors += 1
+        with self._lock:
+            if entry is None:
+                self._site(site).misses += 1
+                return None
+            self._site(site).persistent_hits += 1
+        self._remember(key, entry[0], entry[1])
+        return _decode(entry[0])
+
+    def get(self, site: str, key: str) -> Optional[Any]:
+        value = self.get_local(site, key)
+        return value if value is not None else self.get_persistent(site, key)
+
+    def put(self, site: str, key: str, value: Any, ttl: float) -> None:
+        """Store value in both tiers for ttl seconds (persistent write failures are logged, not raised)."""
+        raw, expires_at = _encode(value), time.time() + ttl
+        self._remember(key, raw, expires_at)
+        with self._lock:
+            self._site(site).writes += 1
+        if self.persistent is not None:
+            try:
+                self.persistent.put(key, site, raw, expires_at)
+            except Exception as e:
+                print(f"LLM cache write failed: {e}")
+                with self._lock:
+                    self._site(site).errors += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for site, s in sorted(self._stats.items()):
+                lookups = s.memory_hits + s.persistent_hits + s.misses
+                out[site] = {
+                    "memory_hits": s.memory_hits,
+                    "persistent_hits": s.persistent_hits,
+                    "misses": s.misses,
+                    "writes": s.writes,
+                    "errors": s.errors,
+                    "hit_rate": round((s.memory_hits + s.persistent_hits) / lookups, 3) if lookups else 0.0,
+                }
+            return out
+
+
+def llm_cache_enabled() -> bool:
+    """LLM_CACHE (default on): reuse cached responses for identical prompts."""
+    return os.getenv("LLM_CACHE", "1").strip().lower() in ("1", "true", "yes")
+
+
+def site_ttl(site: str) -> float:
+    """TTL in seconds for a call site: LLM_CACHE_TTL_<SITE>, else DEFAULT_TTLS (0 = not cached)."""
+    raw = os.getenv(f"LLM_CACHE_TTL_{site.upper()}", "").strip()
+    try:
+        return float(raw) if raw else float(DEFAULT_TTLS.get(site, 0))
+    except ValueError:
+        return float(DEFAULT_TTLS.get(site, 0))
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[LLMResponseCache] = None
+
+
+def _open_persistent():
+    """
+    Persistent tier selected by LLM_CACHE_BACKEND.
+
+    sqlite (default): file at LLM_CACHE_PATH (default .llm_cache.sqlite3 in project root).
+    postgres: email_assistant.llm_cache via DATABASE_URL (run scripts/setup_db.py once).
+    memory: no persistent tier.
+    """
+    backend = os.getenv("LLM_CACHE_BACKEND", "sqlite").strip().lower()
+    if backend == "memory":
+        return None
+    if backend == "postgres":
+        url = os.getenv("DATABASE_URL")
+        if not url:
+            raise ValueError("DATABASE_URL is required for LLM_CACHE_BACKEND=postgres")
+        return PostgresResponseCache(url)
+    return SqliteResponseCache(os.getenv("LLM_CACHE_PATH", "") or str(_project_root() / ".llm_cache.sqlite3"))
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide cache (opened on first use). LLM_CACHE_MAX_ENTRIES: in-process LRU size (default 1000)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                persistent = _open_persistent()
+            except Exception as e:
+                print(f"LLM cache persistent tier unavailable, using memory only: {e}")
+                persistent = None
+            _cache = LLMResponseCache(persistent, max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", str(MAX_ENTRIES))))
+        return _cache
+
+
+def llm_cache_stats() -> dict:
+    """Per-site snapshot: memory / persistent hits, misses, writes, errors, hit rate ({} before first use)."""
+    with _cache_lock:
+        cache = _cache
+    return cache.stats() if cache is not None else {}
+
+
+def cached_invoke(
+    site: str, runnable: Any, messages: list, *, model: str, schema: Any = None, key_messages: Optional[list] = None
+) -> Any:
+    """
+    runnable.invoke(messages), answered from the cache when an identical call was made within the site TTL.
+
+    site: call site name ("triage", "chat"); selects the TTL and the stats bucket.
+    model / schema: part of the key (model name; output schema or bound tools).
+    key_messages: messages the key is computed from instead of messages (the prompt without details
+    that do not change the answer); default messages.
+    """
+    ttl = site_ttl(site)
+    if not llm_cache_enabled() or ttl <= 0:
+        return runnable.invoke(messages)
+    cache = get_llm_cache()
+    key = cache_key(site, messages if key_messages is None else key_messages, model, schema)
+    value = cache.get(site, key)
+    if value is not None:
+        return value
+    result = runnable.invoke(messages)
+    cache.put(site, key, result, ttl)
+    return result
+
+
+async def acached_invoke(
+    site: str, runnable: Any, messages: list, *, model: str, schema: Any = None, key_messages: Optional[list] = None
+) -> Any:
+    """Async cached_invoke: runnable.ainvoke; the persistent tier is read and written in a worker thread."""
+    ttl = site_ttl(site)
+    if not llm_cache_enabled() or ttl <= 0:
+        return await runnable.ainvoke(messages)
+    cache = await asyncio.to_thread(get_llm_cache)
+    key = cache_key(site, messages if key_messages is None else key_messages, model, schema)
+    value = cache.get_local(site, key)
+    if value is None:
+        value = await asyncio.to_thread(cache.get_persistent, site, key)
+    if value is not None:
+        return value
+    result = await runnable.ainvoke(messages)
+    await asyncio.to_thread(cache.put, site, key, result, ttl)
+    return result
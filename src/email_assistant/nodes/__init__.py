@@ -1,21 +1,24 @@
 """
 Graph nodes: input_router, triage_router, triage_interrupt_handler, tool_approval_gate, prepare_messages, mark_as_read.
 
-Use cases: export node functions for the top-level graph and subgraphs.
+Use cases: export node functions for the top-level graph and subgraphs. atriage_router and
+amark_as_read_node are the async variants used when the graph runs with ainvoke.
 """
 
 from email_assistant.nodes.input_router import input_router
-from email_assistant.nodes.triage import triage_router
+from email_assistant.nodes.triage import atriage_router, triage_router
 from email_assistant.nodes.triage_interrupt import triage_interrupt_handler
 from email_assistant.nodes.tool_approval import tool_approval_gate
 from email_assistant.nodes.prepare_messages import prepare_messages
-from email_assistant.nodes.mark_as_read import mark_as_read_node
+from email_assistant.nodes.mark_as_read import amark_as_read_node, mark_as_read_node
 
 __all__ = [
     "input_router",
     "triage_router",
+    "atriage_router",
     "triage_interrupt_handler",
     "tool_approval_gate",
     "prepare_messages",
     "mark_as_read_node",
+    "amark_as_read_node",
 ]
@@ -8,10 +8,18 @@ sends to triage_router when email_input is present, else to response_agent (ques
 from langchain_core.messages import HumanMessage
 
 from email_assistant.schemas import State
+from email_assistant.triage_rules import RULE_HEADERS
+from email_assistant.utils import attachment_parts, extract_text_body
+
+
+# Gmail fields kept through normalization: reply headers (send_email_tool replies without re-fetching
+# the original), attachment metadata (read_attachment_tool) and bulk signals (triage rules).
+GMAIL_FIELDS = ("gmail_thread_id", "message_id_header", "references", "attachments", "headers", "label_ids")
 
 
 def _normalize_email_input(email_input: dict | None) -> dict | None:
     """Ensure email_input has from, to, subject, body; support Gmail-style payload or flat dict.
+    Keeps the Gmail reply fields (thread id, Message-ID, References) and attachment metadata when present.
     Sets _source to 'gmail' when the payload has a Gmail message id or Gmail API structure so the agent knows it is an incoming message from the user's Gmail inbox."""
     if not email_input or not isinstance(email_input, dict):
         return None
@@ -33,6 +41,9 @@ def _normalize_email_input(email_input: dict | None) -> dict | None:
             "body": email_input.get("body", email_input.get("snippet", "")),
             "id": email_input.get("id"),
         }
+        for key in GMAIL_FIELDS:
+            if key in email_input:
+                out[key] = email_input[key]
         if from_gmail:
             out["_source"] = "gmail"
         return out
@@ -46,9 +57,22 @@ def _normalize_email_input(email_input: dict | None) -> dict | None:
         "from": h("from"),
         "to": h("to"),
         "subject": h("subject"),
-        "body": email_input.get("snippet") or payload.get("body", {}).get("data") or "",
+        "body": extract_text_body(payload) or email_input.get("snippet") or "",
         "id": email_input.get("id"),
     }
+    if email_input.get("threadId"):
+        out["gmail_thread_id"] = email_input["threadId"]
+    if headers:
+        out["message_id_header"] = h("message-id")
+        out["references"] = h("references")
+        rule_headers = {name: h(name) for name in RULE_HEADERS if h(name)}
+        if rule_headers:
+            out["headers"] = rule_headers
+    if email_input.get("labelIds"):
+        out["label_ids"] = list(email_input["labelIds"])
+    attachments = attachment_parts(payload)
+    if attachments:
+        out["attachments"] = attachments
     if from_gmail:
         out["_source"] = "gmail"
     return out
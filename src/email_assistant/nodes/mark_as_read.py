@@ -2,7 +2,9 @@
 mark_as_read_node: mark email as read when email_id present; no-op when no email_id.
 
 Use cases: after response_agent finishes, mark the source email read in Gmail
-for email mode; question-only mode has no email_id so this node no-ops.
+for email mode; question-only mode has no email_id so this node no-ops. The change is
+queued by tools/gmail/mark_as_read in the Gmail label buffer and sent with batchModify,
+so the node does not wait on the Gmail API. amark_as_read_node is the async variant.
 """
 
 from email_assistant.schemas import State
@@ -11,7 +13,7 @@ from email_assistant.tools.gmail.mark_as_read import mark_as_read as gmail_mark_
 
 def mark_as_read_node(state: State) -> dict:
     """
-    Call Gmail mark_as_read(email_id) when state has email_id; otherwise no-op.
+    Queue Gmail mark-as-read (remove UNREAD) for state email_id; otherwise no-op.
 
     Use cases: run after response_agent on the respond path so the triaged email is marked read.
     """
@@ -20,6 +22,16 @@ def mark_as_read_node(state: State) -> dict:
         return {}
     try:
         gmail_mark_as_read(str(email_id))
-    except Exception:
-        pass  # Don't fail the graph if Gmail API fails
+    except Exception as e:
+        # Queueing makes no Gmail call; a failure here is a local bug, logged but not worth failing the run.
+        print(f"[mark_as_read] could not queue {email_id}: {e}")
     return {}
+
+
+async def amark_as_read_node(state: State) -> dict:
+    """
+    Async mark_as_read_node: enqueueing never blocks, so it runs on the event loop directly.
+
+    Use cases: graph.ainvoke (async watcher, Studio); same no-op rules as mark_as_read_node.
+    """
+    return mark_as_read_node(state)
@@ -31,4 +31,11 @@ def prepare_messages(state: State) -> dict:
         f"{prefix}You are replying to an email. Use send_email_tool with email_id='{email_id}' to send your reply. "
         f"From: {from_addr}\nSubject: {subject}\n\nBody:\n{body}"
     )
+    thread_context = state.get("thread_context") or ""
+    if thread_context:
+        inject += f"\n\nEarlier in this thread (oldest first):\n{thread_context}"
+    attachments = email_input.get("attachments") or []
+    if attachments:
+        names = ", ".join(a.get("filename") or "(unnamed)" for a in attachments)
+        inject += f"\n\nAttachments: {names} (use read_attachment_tool to read them if needed)."
     return {"messages": [HumanMessage(content=inject)] + messages}
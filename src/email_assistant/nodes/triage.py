@@ -2,74 +2,379 @@
 triage_router: classify email as ignore / notify / respond using RouterSchema.
 
 Use cases: single LLM call with structured output; uses triage prompts and memory.
+Triage rules (triage_rules.py) are evaluated first; a firing rule settles the email without the LLM.
+LLM answers are cached by prompt without its date and To: line (llm_cache.py, site "triage"), so identical emails are classified once.
+triage_batch / atriage_batch classify many emails with one structured-output call per token-budgeted
+batch (BatchRouterSchema); emails whose result is missing or invalid fall back to the single-email call.
 """
 
+import asyncio
 import os
 from typing import Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
-from email_assistant.prompts import get_triage_system_prompt, get_triage_user_prompt
-from email_assistant.schemas import RouterSchema, State
+from email_assistant.llm_cache import acached_invoke, cached_invoke
+from email_assistant.prompts import get_triage_batch_user_prompt, get_triage_system_prompt, get_triage_user_prompt
+from email_assistant.schemas import BatchRouterSchema, RouterSchema, State
+from email_assistant.tools.gmail.labels import enqueue_triage_label
+from email_assistant.triage_rules import TriageRules, get_triage_rules
 
 
-def triage_router(state: State, *, triage_instructions: Optional[str] = None) -> dict:
+DECISIONS = ("ignore", "notify", "respond")
+# Batch triage: body characters per email, token budget per call, emails per call.
+BATCH_BODY_CHARS = 2000
+BATCH_TOKEN_BUDGET = 12000
+BATCH_MAX_EMAILS = 25
+
+
+def _rule_update(email_input: dict, rules: Optional[TriageRules], log: bool = True) -> Optional[dict]:
+    """State update when a triage rule settles the email (no LLM call), else None."""
+    if rules is None:
+        rules = get_triage_rules()
+    match = rules.evaluate_email(email_input)
+    if match is None:
+        return None
+    if log:
+        print(f"[triage] rule {match.rule_id} ({match.reason}) -> {match.action}")
+    return {"classification_decision": match.action, "triage_rule": match.rule_id}
+
+
+def _preset_update(state: State) -> Optional[dict]:
+    """State update for a decision the watcher's batch triage already made (state["_triage_decision"]), else None."""
+    decision = str(state.get("_triage_decision") or "").strip().lower()
+    if decision not in DECISIONS:
+        return None
+    return {"classification_decision": decision, "triage_rule": None}
+
+
+def _triage_messages(
+    email_input: dict, triage_instructions: Optional[str], thread_context: str = "", for_cache_key: bool = False
+) -> list:
     """
-    Run triage LLM with structured output (RouterSchema). Return classification_decision and optionally reasoning.
+    Build the triage LLM messages (system prompt with triage_instructions, email, thread context).
 
-    Use cases: after input_router when email_input is present; output drives conditional edges (ignore/notify/respond).
-    triage_instructions: optional preference text from memory (Phase 6); injected by caller when store is used.
+    for_cache_key: leave out today's date and the To: line, so the LLM cache key of an email is the
+    same on another day or for another recipient (e.g. one newsletter sent to several users).
     """
-    email_input = state.get("email_input")
-    if not email_input:
-        return {"classification_decision": "ignore"}
     from_addr = email_input.get("from", "")
-    to_addr = email_input.get("to", "")
+    to_addr = "" if for_cache_key else email_input.get("to", "")
     subject = email_input.get("subject", "")
     body = str(email_input.get("body", ""))[:8000]
     from_gmail_inbox = email_input.get("_source") == "gmail"
 
-    # Override: if subject or body clearly asks for a reply/document/action, force respond (avoids LLM misclassification).
-    if _is_explicit_request(str(subject), body):
-        return {"classification_decision": "respond"}
+    system = get_triage_system_prompt(
+        background="", triage_instructions=triage_instructions or "", today="" if for_cache_key else None
+    )
+    user = get_triage_user_prompt(
+        from_addr, to_addr, subject, body, from_gmail_inbox=from_gmail_inbox, thread_context=thread_context
+    )
+    return [SystemMessage(content=system), HumanMessage(content=user)]
 
-    system = get_triage_system_prompt(background="", triage_instructions=triage_instructions or "")
-    user = get_triage_user_prompt(from_addr, to_addr, subject, body, from_gmail_inbox=from_gmail_inbox)
+
+def _triage_model() -> str:
+    return os.getenv("OPENAI_MODEL", "gpt-4o")
+
+
+def _structured_triage_llm():
+    """ChatOpenAI bound to RouterSchema structured output."""
     llm = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o"),
+        model=_triage_model(),
         api_key=os.getenv("OPENAI_API_KEY"),
     )
-    structured = llm.with_structured_output(RouterSchema)
-    result = structured.invoke([SystemMessage(content=system), HumanMessage(content=user)])
+    return llm.with_structured_output(RouterSchema)
+
+
+def _classification_update(result: dict) -> dict:
+    """Map RouterSchema output to the state update (unknown labels fall back to ignore)."""
     classification = (result.get("classification") or "ignore").strip().lower()
-    if classification not in ("ignore", "notify", "respond"):
+    if classification not in DECISIONS:
         classification = "ignore"
     return {
         "classification_decision": classification,
+        "triage_rule": None,
+    }
+
+
+def _llm_update(email_input: dict, triage_instructions: Optional[str], thread_context: str = "") -> dict:
+    """Single-email LLM triage (cached by prompt) -> state update."""
+    messages = _triage_messages(email_input, triage_instructions, thread_context)
+    key_messages = _triage_messages(email_input, triage_instructions, thread_context, for_cache_key=True)
+    result = cached_invoke(
+        "triage", _structured_triage_llm(), messages, model=_triage_model(), schema=RouterSchema, key_messages=key_messages
+    )
+    return _classification_update(result)
+
+
+async def _allm_update(email_input: dict, triage_instructions: Optional[str], thread_context: str = "") -> dict:
+    messages = _triage_messages(email_input, triage_instructions, thread_context)
+    key_messages = _triage_messages(email_input, triage_instructions, thread_context, for_cache_key=True)
+    result = await acached_invoke(
+        "triage", _structured_triage_llm(), messages, model=_triage_model(), schema=RouterSchema, key_messages=key_messages
+    )
+    return _classification_update(result)
+
+
+def _label_decision(email_input: dict, update: dict) -> dict:
+    """Queue the assistant/<decision> Gmail label for emails from the Gmail inbox; returns update unchanged."""
+    if email_input.get("_source") == "gmail" and email_input.get("id"):
+        try:
+            enqueue_triage_label(str(email_input["id"]), update.get("classification_decision", ""))
+        except Exception:
+            pass  # Labels are best effort; never fail triage on them
+    return update
+
+
+def triage_router(
+    state: State,
+    *,
+    triage_instructions: Optional[str] = None,
+    thread_context: str = "",
+    rules: Optional[TriageRules] = None,
+) -> dict:
+    """
+    Run triage LLM with structured output (RouterSchema). Return classification_decision and optionally reasoning.
+
+    Use cases: after input_router when email_input is present; output drives conditional edges (ignore/notify/respond).
+    triage_instructions: optional preference text from memory (Phase 6); injected by caller when store is used.
+    thread_context: earlier messages of the Gmail thread; injected by the graph's triage node.
+    rules: compiled triage rules (triage_rules.py; default: file + default rules). When one fires,
+    its action is the decision and the LLM is not called; triage_rule names the rule (None after the LLM).
+    A valid email_input["_triage_decision"] (set from triage_batch by the watcher) is used instead of the LLM.
+    """
+    email_input = state.get("email_input")
+    if not email_input:
+        return {"classification_decision": "ignore"}
+    update = _rule_update(email_input, rules) or _preset_update(state)
+    if update is None:
+        update = _llm_update(email_input, triage_instructions, thread_context)
+    return _label_decision(email_input, update)
+
+
+async def atriage_router(
+    state: State,
+    *,
+    triage_instructions: Optional[str] = None,
+    thread_context: str = "",
+    rules: Optional[TriageRules] = None,
+) -> dict:
+    """
+    Async triage_router: same prompts and output, LLM called with ainvoke.
+
+    Use cases: graph.ainvoke / astream (async watcher, LangGraph Studio) so many triage calls share one event loop.
+    """
+    email_input = state.get("email_input")
+    if not email_input:
+        return {"classification_decision": "ignore"}
+    update = _rule_update(email_input, rules) or _preset_update(state)
+    if update is None:
+        update = await _allm_update(email_input, triage_instructions, thread_context)
+    return _label_decision(email_input, update)
+
+
+def _batch_entry(email_input: dict, body_chars: int, thread_context: str = "") -> dict:
+    return {
+        "from": email_input.get("from", ""),
+        "to": email_input.get("to", ""),
+        "subject": email_input.get("subject", ""),
+        "body": str(email_input.get("body", ""))[:body_chars],
+        "from_gmail_inbox": email_input.get("_source") == "gmail",
+        "thread_context": thread_context or "",
     }
 
 
-def _is_explicit_request(subject: str, body: str) -> bool:
+def _estimate_tokens(entry: dict) -> int:
+    """Rough prompt tokens of one batch entry (about 4 characters per token, plus the heading)."""
+    chars = len(entry["from"]) + len(entry["to"]) + len(entry["subject"]) + len(entry["body"]) + len(entry["thread_context"])
+    return chars // 4 + 40
+
+
+def _pack_batches(entries: list[dict], token_budget: int, max_emails: int) -> list[list[int]]:
+    """Split entry positions, in order, into batches under token_budget and max_emails."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for i, entry in enumerate(entries):
+        cost = _estimate_tokens(entry)
+        if current and (used + cost > token_budget or len(current) >= max_emails):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_settings(token_budget: Optional[int], max_emails: Optional[int]) -> tuple[int, int, int]:
+    """(token budget, max emails, body chars) from the arguments or TRIAGE_BATCH_TOKENS / _MAX / _BODY_CHARS."""
+    return (
+        int(token_budget or os.getenv("TRIAGE_BATCH_TOKENS", str(BATCH_TOKEN_BUDGET))),
+        max(1, int(max_emails or os.getenv("TRIAGE_BATCH_MAX", str(BATCH_MAX_EMAILS)))),
+        int(os.getenv("TRIAGE_BATCH_BODY_CHARS", str(BATCH_BODY_CHARS))),
+    )
+
+
+def _batch_messages(entries: list[dict], triage_instructions: Optional[str]) -> list:
+    system = get_triage_system_prompt(background="", triage_instructions=triage_instructions or "")
+    return [SystemMessage(content=system), HumanMessage(content=get_triage_batch_user_prompt(entries))]
+
+
+def _structured_batch_llm():
+    """ChatOpenAI bound to BatchRouterSchema structured output."""
+    llm = ChatOpenAI(
+        model=_triage_model(),
+        api_key=os.getenv("OPENAI_API_KEY"),
+    )
+    return llm.with_structured_output(BatchRouterSchema)
+
+
+def _parse_batch(result, size: int) -> dict[int, dict]:
+    """Valid per-email updates by batch position; missing, duplicate or unknown entries are left out."""
+    items = result.get("results") if isinstance(result, dict) else None
+    out: dict[int, dict] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        classification = str(item.get("classification") or "").strip().lower()
+        if isinstance(index, int) and 0 <= index < size and index not in out and classification in DECISIONS:
+            out[index] = {"classification_decision": classification, "triage_rule": None}
+    return out
+
+
+def _split_by_rules(email_inputs: list[dict], rules: Optional[TriageRules]) -> tuple[list[Optional[dict]], list[int]]:
+    """Rule decisions by position (no log lines: the graph reports the rule again) and the positions left for the LLM."""
+    if rules is None:
+        rules = get_triage_rules()
+    results: list[Optional[dict]] = []
+    pending: list[int] = []
+    for i, email_input in enumerate(email_inputs):
+        update = _rule_update(email_input, rules, log=False) if email_input else {"classification_decision": "ignore"}
+        results.append(update)
+        if update is None:
+            pending.append(i)
+    return results, pending
+
+
+def _triage_one_batch(
+    email_inputs: list[dict],
+    contexts: list[str],
+    entries: list[dict],
+    pending: list[int],
+    batch: list[int],
+    triage_instructions: Optional[str],
+) -> tuple[dict[int, dict], int]:
+    """One batch call plus its per-email fallbacks; returns ({input position: update}, fallbacks)."""
+    parsed: dict[int, dict] = {}
+    if len(batch) > 1:
+        try:
+            result = cached_invoke(
+                "triage_batch",
+                _structured_batch_llm(),
+                _batch_messages([entries[p] for p in batch], triage_instructions),
+                model=_triage_model(),
+                schema=BatchRouterSchema,
+            )
+            parsed = _parse_batch(result, len(batch))
+        except Exception as e:
+            print(f"[triage] batch of {len(batch)} failed, triaging one by one: {e}")
+    out = {pending[p]: parsed[position] for position, p in enumerate(batch) if position in parsed}
+    missing = [pending[p] for p in batch if pending[p] not in out]
+    for i in missing:
+        out[i] = _llm_update(email_inputs[i], triage_instructions, contexts[i])
+    return out, len(missing) if len(batch) > 1 else 0
+
+
+def triage_batch(
+    email_inputs: list[dict],
+    *,
+    triage_instructions: Optional[str] = None,
+    thread_contexts: Optional[list[str]] = None,
+    rules: Optional[TriageRules] = None,
+    token_budget: Optional[int] = None,
+    max_emails: Optional[int] = None,
+) -> list[dict]:
     """
-    True if the email clearly asks the recipient to send something, reply, or take an action.
+    Classify many emails: triage rules first, then one BatchRouterSchema call per batch of the rest.
 
-    Use cases: force triage to "respond" for colleague requests like "send me the report by Friday"
-    so the LLM cannot misclassify as ignore.
+    Use cases: the watcher triages a poll's (or drain chunk's) new emails in a few LLM round trips
+    and hands each decision to the graph as state["_triage_decision"]. triage_instructions and
+    thread_contexts (one rendered thread context per email, "" for none) are what the graph's triage
+    node would pass to triage_router, so a batch decision is made on the same prompt content.
+    Batches are packed in order under token_budget (TRIAGE_BATCH_TOKENS, default 12000; body cut
+    to TRIAGE_BATCH_BODY_CHARS) and max_emails (TRIAGE_BATCH_MAX, default 25). An email whose batch
+    result is missing or invalid, or whose batch call failed, is triaged on its own. No Gmail labels
+    here (the graph's triage node adds the label). Returns one state update per email, in input order.
     """
-    combined = f"{subject}\n{body}".lower()
-    patterns = (
-        "send me the",
-        "send me a",
-        "could you send",
-        "can you send",
-        "please send",
-        "please reply",
-        "reply with",
-        "by friday",
-        "by monday",
-        "by end of",
-        "q4 report",
-        "the report",
+    budget, max_emails, body_chars = _batch_settings(token_budget, max_emails)
+    contexts = list(thread_contexts or [""] * len(email_inputs))
+    results, pending = _split_by_rules(email_inputs, rules)
+    entries = [_batch_entry(email_inputs[i], body_chars, contexts[i]) for i in pending]
+    batches = _pack_batches(entries, budget, max_emails)
+    fallbacks = 0
+    for batch in batches:
+        updates, n = _triage_one_batch(email_inputs, contexts, entries, pending, batch, triage_instructions)
+        for i, update in updates.items():
+            results[i] = update
+        fallbacks += n
+    if pending:
+        print(f"[triage] batch: {len(pending)} email(s) in {len(batches)} call(s), {fallbacks} fallback(s)")
+    return results
+
+
+async def _atriage_one_batch(
+    email_inputs: list[dict],
+    contexts: list[str],
+    entries: list[dict],
+    pending: list[int],
+    batch: list[int],
+    triage_instructions: Optional[str],
+) -> tuple[dict[int, dict], int]:
+    """Async _triage_one_batch: the per-email fallbacks run concurrently."""
+    parsed: dict[int, dict] = {}
+    if len(batch) > 1:
+        try:
+            result = await acached_invoke(
+                "triage_batch",
+                _structured_batch_llm(),
+                _batch_messages([entries[p] for p in batch], triage_instructions),
+                model=_triage_model(),
+                schema=BatchRouterSchema,
+            )
+            parsed = _parse_batch(result, len(batch))
+        except Exception as e:
+            print(f"[triage] batch of {len(batch)} failed, triaging one by one: {e}")
+    out = {pending[p]: parsed[position] for position, p in enumerate(batch) if position in parsed}
+    missing = [pending[p] for p in batch if pending[p] not in out]
+    updates = await asyncio.gather(*(_allm_update(email_inputs[i], triage_instructions, contexts[i]) for i in missing))
+    out.update(zip(missing, updates))
+    return out, len(missing) if len(batch) > 1 else 0
+
+
+async def atriage_batch(
+    email_inputs: list[dict],
+    *,
+    triage_instructions: Optional[str] = None,
+    thread_contexts: Optional[list[str]] = None,
+    rules: Optional[TriageRules] = None,
+    token_budget: Optional[int] = None,
+    max_emails: Optional[int] = None,
+) -> list[dict]:
+    """Async triage_batch: the batch calls (and their fallbacks) run concurrently with ainvoke."""
+    budget, max_emails, body_chars = _batch_settings(token_budget, max_emails)
+    contexts = list(thread_contexts or [""] * len(email_inputs))
+    results, pending = _split_by_rules(email_inputs, rules)
+    entries = [_batch_entry(email_inputs[i], body_chars, contexts[i]) for i in pending]
+    batches = _pack_batches(entries, budget, max_emails)
+    done = await asyncio.gather(
+        *(_atriage_one_batch(email_inputs, contexts, entries, pending, batch, triage_instructions) for batch in batches)
     )
-    return any(p in combined for p in patterns)
+    for updates, _ in done:
+        for i, update in updates.items():
+            results[i] = update
+    if pending:
+        fallbacks = sum(n for _, n in done)
+        print(f"[triage] batch: {len(pending)} email(s) in {len(batches)} call(s), {fallbacks} fallback(s)")
+    return results
@@ -5,6 +5,8 @@ Use cases: centralize system prompts for triage router, response agent, and
 memory-update LLM; keep prompt text out of node code.
 """
 
+from typing import Optional
+
 # Phase 2: system prompt for the simple Q&A agent (no tools, no triage).
 SIMPLE_AGENT_SYSTEM_PROMPT = (
     "You are a helpful assistant. Answer the user's questions clearly and concisely."
@@ -19,11 +21,12 @@ DEFAULT_TRIAGE_INSTRUCTIONS = """## Triage categories (use exactly one)
 When in doubt between ignore and notify, prefer **notify**. When in doubt between notify and respond, prefer **respond** when a direct reply or action is requested. If the body or subject contains a request (e.g. "send me", "could you send", "please reply"), classify as **respond**."""
 
 
-def get_triage_system_prompt(background: str = "", triage_instructions: str = "") -> str:
-    """System prompt for triage router LLM. Injects background and triage_instructions (from memory or default)."""
+def get_triage_system_prompt(background: str = "", triage_instructions: str = "", today: Optional[str] = None) -> str:
+    """System prompt for triage router LLM. Injects background, triage_instructions (from memory or default) and today (default: current UTC date)."""
     from datetime import datetime
     instructions = triage_instructions or DEFAULT_TRIAGE_INSTRUCTIONS
-    today = datetime.utcnow().strftime("%Y-%m-%d")
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
     return f"""You are an email triage assistant. Your task is to classify each email into exactly one of: ignore, notify, respond.
 
 **CRITICAL:** If the subject or body asks the recipient to send something, reply, or take an action (e.g. "send me the report", "could you send me the Q4 report", "by Friday"), you MUST classify as **respond**. Do not use ignore or notify for such emails.
@@ -39,21 +42,56 @@ When the email is from the user's Gmail inbox (incoming message just sent to the
 Today's date is {today}. You must output exactly one classification. Do not invent categories. **If the subject or body asks the recipient to send a document, report, or reply (e.g. "Can you send me the report", "could you send me the Q4 report"), always classify as respond.** If the content is the user asking the assistant to send an email or take an action, always classify as **respond**. Prefer notify over ignore when in doubt; prefer respond when a direct reply or action is requested."""
 
 
-def get_triage_user_prompt(from_addr: str, to_addr: str, subject: str, body_or_thread: str, from_gmail_inbox: bool = False) -> str:
+def get_triage_user_prompt(
+    from_addr: str,
+    to_addr: str,
+    subject: str,
+    body_or_thread: str,
+    from_gmail_inbox: bool = False,
+    thread_context: str = "",
+) -> str:
     """User prompt for triage: email metadata and content in a fixed format.
-    When from_gmail_inbox is True, states that this email was just sent to the user's Gmail inbox."""
+    When from_gmail_inbox is True, states that this email was just sent to the user's Gmail inbox.
+    thread_context: earlier messages of the Gmail thread (thread_context.ThreadContextCache), shown before the body."""
     inbox_note = "\n**This email just arrived in the user's Gmail inbox (incoming message).**\n" if from_gmail_inbox else ""
+    earlier = f"\n## Earlier in this thread (context only; classify the new email)\n{thread_context}\n" if thread_context else ""
     return f"""## Email to classify{inbox_note}
 - **From:** {from_addr}
 - **To:** {to_addr}
 - **Subject:** {subject}
-
+{earlier}
 ## Body / thread
 {body_or_thread}
 
 Classify the above email into exactly one of: ignore, notify, respond. Output your reasoning and then your classification."""
 
 
+def get_triage_batch_user_prompt(emails: list[dict]) -> str:
+    """User prompt for batch triage: several emails under numbered headings (index from 0).
+    Each email dict has from, to, subject, body, from_gmail_inbox and thread_context (see get_triage_user_prompt)."""
+    sections = []
+    for i, email in enumerate(emails):
+        inbox_note = " (just arrived in the user's Gmail inbox)" if email.get("from_gmail_inbox") else ""
+        thread_context = email.get("thread_context") or ""
+        earlier = f"\n### Earlier in this thread (context only; classify the new email)\n{thread_context}\n" if thread_context else ""
+        sections.append(f"""## Email {i}{inbox_note}
+- **From:** {email.get("from", "")}
+- **To:** {email.get("to", "")}
+- **Subject:** {email.get("subject", "")}
+{earlier}
+{email.get("body", "")}""")
+    emails_text = "\n\n".join(sections)
+    return f"""Classify each of the {len(emails)} emails below on its own into exactly one of: ignore, notify, respond.
+
+{emails_text}
+
+Return one result for every email, with its index (as in "Email <index>"), your reasoning and the classification."""
+
+
+# Thread context: extend a running summary of a Gmail thread with the messages folded out of the recent window.
+THREAD_SUMMARY_SYSTEM = """You maintain a short running summary of an email thread. You get the summary so far and the next messages (oldest first). Output the updated summary only: who asked for what, decisions, dates, open questions. Keep facts from the existing summary unless the new messages change them. At most 8 short bullet points, no preamble."""
+
+
 NOTIFY_CHOICE_SYSTEM = """You are an email assistant. The previous step classified this email as "notify" (FYI - user should see it but no reply was required). Now you must decide: should the assistant **respond** to this email anyway (e.g. send a short acknowledgment or reply), or **ignore** it (no response)?
 
 - Choose **respond** if: the content might benefit from a brief reply, acknowledgment, or the user would likely want to reply (e.g. from a colleague, contains a question, or actionable item).
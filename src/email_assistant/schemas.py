@@ -27,6 +27,9 @@ State = TypedDict(
         "email_input": Optional[dict],
         "classification_decision": Optional[ClassificationDecision],
         "email_id": Optional[str],
+        "triage_rule": Optional[str],  # Id of the triage rule that decided (triage_rules.py); None when the LLM did
+        "thread_context": Optional[str],  # Earlier messages of the Gmail thread, rendered by triage (thread_context.py)
+        "_triage_decision": Optional[str],  # Batch triage decision from the watcher (nodes/triage.triage_batch); skips the triage LLM call
         "_notify_choice": Optional[str],  # "respond" | "ignore" after triage_interrupt (user resumes with Command(resume=...))
         "_tool_approval": Optional[bool],  # True = run tools (send_email/schedule_meeting approved); False = declined
         "user_message": Optional[str],
@@ -40,6 +43,7 @@ StateInput = TypedDict(
     {
         "messages": Annotated[list, add_messages],
         "email_input": Optional[dict],
+        "_triage_decision": Optional[str],  # Watcher only: see State
         "user_message": Optional[str],
         "question": Optional[str],
     },
@@ -55,6 +59,20 @@ RouterSchema = TypedDict(
     },
 )
 
+# Batch triage: one structured-output call classifies several emails (nodes/triage.triage_batch).
+BatchRouterItem = TypedDict(
+    "BatchRouterItem",
+    {
+        "index": int,
+        "reasoning": str,
+        "classification": ClassificationDecision,
+    },
+)
+BatchRouterSchema = TypedDict(
+    "BatchRouterSchema",
+    {"results": list[BatchRouterItem]},
+)
+
 # Phase 5: auto-decision when classification is notify (no HITL).
 NotifyChoiceSchema = TypedDict(
     "NotifyChoiceSchema",
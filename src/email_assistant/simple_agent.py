@@ -3,46 +3,87 @@ Response subgraph: chat → tool_approval_gate (if tool_calls) → tools or chat
 
 Use cases: user can ask to send an email; agent uses send_email_tool and tool-call loop.
 Phase 6: HITL approval before send_email/schedule_meeting; memory (response/cal preferences) when store is passed.
+chat and persist_messages have async variants (LLM ainvoke; store/DB calls in worker threads) used under graph.ainvoke.
+The chat LLM call goes through llm_cache.py (site "chat", off unless LLM_CACHE_TTL_CHAT is set).
 """
 
+import asyncio
 import os
 
 from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
 from langgraph.config import get_config
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 
+from email_assistant.llm_cache import acached_invoke, cached_invoke
 from email_assistant.prompts import get_agent_system_prompt_with_tools, get_agent_system_prompt_hitl_memory
 from email_assistant.schemas import State
 from email_assistant.tools import get_tools
 
 
+def _chat_model() -> str:
+    return os.getenv("OPENAI_MODEL", "gpt-4o")
+
+
+def _chat_llm_with_tools():
+    """ChatOpenAI bound to the response-agent tools."""
+    llm = ChatOpenAI(
+        model=_chat_model(),
+        api_key=os.getenv("OPENAI_API_KEY"),
+    )
+    tools = get_tools(include_gmail=True, include_calendar=True)
+    return llm.bind_tools(tools)
+
+
+def _chat_system_text(store, user_id: str) -> str:
+    """System prompt for the chat node; loads response/cal preferences when store is set (blocking store reads)."""
+    if store is None:
+        return get_agent_system_prompt_with_tools()
+    from email_assistant.memory import get_memory
+    response_prefs = get_memory(store, user_id, "response_preferences") or ""
+    cal_prefs = get_memory(store, user_id, "cal_preferences") or ""
+    return get_agent_system_prompt_hitl_memory(response_preferences=response_prefs, cal_preferences=cal_prefs)
+
+
+def _config_user_id() -> str:
+    config = get_config()
+    return (config.get("configurable") or {}).get("user_id", os.getenv("USER_ID", "default-user"))
+
+
 def _make_chat_node(store=None):
     """Build chat node; when store is set, use get_memory for response/cal preferences and get_agent_system_prompt_hitl_memory."""
 
     def _chat_node(state: State) -> dict:
-        llm = ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-            api_key=os.getenv("OPENAI_API_KEY"),
+        llm_with_tools = _chat_llm_with_tools()
+        user_id = _config_user_id() if store is not None else ""
+        system = SystemMessage(content=_chat_system_text(store, user_id))
+        messages = [system] + list(state.get("messages") or [])
+        response = cached_invoke(
+            "chat", llm_with_tools, messages, model=_chat_model(), schema=llm_with_tools.kwargs.get("tools")
         )
-        tools = get_tools(include_gmail=True, include_calendar=True)
-        llm_with_tools = llm.bind_tools(tools)
+        return {"messages": [response]}
+
+    return _chat_node
+
+
+def _make_achat_node(store=None):
+    """Async chat node: store reads run in a worker thread, LLM called with ainvoke."""
+
+    async def _achat_node(state: State) -> dict:
+        llm_with_tools = _chat_llm_with_tools()
         if store is not None:
-            config = get_config()
-            user_id = (config.get("configurable") or {}).get("user_id", os.getenv("USER_ID", "default-user"))
-            from email_assistant.memory import get_memory
-            response_prefs = get_memory(store, user_id, "response_preferences") or ""
-            cal_prefs = get_memory(store, user_id, "cal_preferences") or ""
-            system_text = get_agent_system_prompt_hitl_memory(response_preferences=response_prefs, cal_preferences=cal_prefs)
+            system_text = await asyncio.to_thread(_chat_system_text, store, _config_user_id())
         else:
-            system_text = get_agent_system_prompt_with_tools()
-        system = SystemMessage(content=system_text)
-        messages = [system] + list(state.get("messages") or [])
-        response = llm_with_tools.invoke(messages)
+            system_text = _chat_system_text(None, "")
+        messages = [SystemMessage(content=system_text)] + list(state.get("messages") or [])
+        response = await acached_invoke(
+            "chat", llm_with_tools, messages, model=_chat_model(), schema=llm_with_tools.kwargs.get("tools")
+        )
         return {"messages": [response]}
 
-    return _chat_node
+    return _achat_node
 
 
 def _should_continue(state: State) -> str:
@@ -63,16 +104,11 @@ def _after_approval(state: State) -> str:
     return "chat"
 
 
-def _persist_messages_node(state: State) -> dict:
-    """
-    When DATABASE_URL is set, persist state["messages"] to email_assistant.messages.
-
-    Use cases: run after chat so messages are stored when using CLI or LangSmith Studio.
-    Reads thread_id and user_id from LangGraph config (get_config()).
-    """
+def _persist_target(state: State):
+    """Return (conn_string, thread_id, user_id) when messages should be persisted, else None."""
     conn_string = os.getenv("DATABASE_URL")
     if not conn_string or not state.get("messages"):
-        return {}
+        return None
     try:
         config = get_config()
         configurable = config.get("configurable") or {}
@@ -81,9 +117,35 @@ def _persist_messages_node(state: State) -> dict:
     except Exception:
         thread_id = "default-thread"
         user_id = os.getenv("USER_ID", "default-user")
+    return conn_string, thread_id, user_id
+
+
+def _persist_messages_node(state: State) -> dict:
+    """
+    When DATABASE_URL is set, persist state["messages"] to email_assistant.messages.
+
+    Use cases: run after chat so messages are stored when using CLI or LangSmith Studio.
+    Reads thread_id and user_id from LangGraph config (get_config()).
+    """
+    target = _persist_target(state)
+    if target is None:
+        return {}
+    try:
+        from email_assistant.db.persist_messages import persist_messages
+        persist_messages(*target, list(state["messages"]))
+    except Exception:
+        pass  # Don't fail the graph if DB write fails
+    return {}
+
+
+async def _apersist_messages_node(state: State) -> dict:
+    """Async _persist_messages_node: the blocking DB write runs in a worker thread."""
+    target = _persist_target(state)
+    if target is None:
+        return {}
     try:
         from email_assistant.db.persist_messages import persist_messages
-        persist_messages(conn_string, thread_id, user_id, list(state["messages"]))
+        await asyncio.to_thread(persist_messages, *target, list(state["messages"]))
     except Exception:
         pass  # Don't fail the graph if DB write fails
     return {}
@@ -94,15 +156,16 @@ def build_response_subgraph(checkpointer=None, store=None):
     Build and compile the Response subgraph: START → chat → [tool_approval_gate →] tools or persist_messages → END.
 
     When tool_calls present: chat → tool_approval_gate (HITL) → tools or chat. Phase 6: store enables memory in chat node.
+    chat and persist_messages carry sync and async implementations, so the subgraph works with invoke and ainvoke.
     """
     from email_assistant.nodes.tool_approval import tool_approval_gate
     tools = get_tools(include_gmail=True, include_calendar=True)
     tool_node = ToolNode(tools)
     builder = StateGraph(State)
-    builder.add_node("chat", _make_chat_node(store))
+    builder.add_node("chat", RunnableLambda(_make_chat_node(store), afunc=_make_achat_node(store), name="chat"))
     builder.add_node("tool_approval_gate", tool_approval_gate)
     builder.add_node("tools", tool_node)
-    builder.add_node("persist_messages", _persist_messages_node)
+    builder.add_node("persist_messages", RunnableLambda(_persist_messages_node, afunc=_apersist_messages_node, name="persist_messages"))
     builder.add_edge(START, "chat")
     builder.add_conditional_edges("chat", _should_continue, {"tool_approval_gate": "tool_approval_gate", "persist_messages": "persist_messages"})
     builder.add_conditional_edges("tool_approval_gate", _after_approval, {"tools": "tools", "chat": "chat"})
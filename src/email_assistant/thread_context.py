@@ -0,0 +1,272 @@
+"""
+Gmail thread context cache: a compact, bounded rendering of earlier messages per Gmail threadId.
+
+Use cases: triage and the reply context see what came before in the thread without fetching
+the thread on every run. Each processed message is appended as a turn (quoted text stripped,
+truncated); once a thread has more than max_turns turns, the oldest are folded into a running
+summary, which is extended with the folded turns (one small LLM call) instead of re-summarizing
+the whole thread. Entries live in the LangGraph store under ("thread_context", user_id), so they
+are shared by the watcher, the job worker and Studio; without a store, a per-process LRU is used.
+The first message seen for a thread that is a reply (References header) seeds the entry once
+from users.threads.get.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from email_assistant.utils import extract_text_body
+
+MAX_TURNS = 4
+TURN_CHARS = 800
+SUMMARY_CHARS = 1500
+# In-process fallback when the graph runs without a store.
+_LOCAL_MAX_THREADS = 2000
+_local_lock = threading.Lock()
+_local: "OrderedDict[tuple[str, str], dict]" = OrderedDict()
+# record() reads, extends and writes an entry; a fixed set of locks (picked by thread key) makes
+# that atomic for concurrent runs in one process without keeping a lock per thread forever.
+_RECORD_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+# "On Tue, 1 Oct 2026 at 10:00, Alice <a@x.com> wrote:" and Outlook-style "-----Original Message-----".
+_QUOTE_HEADER = re.compile(r"^(on .{0,200} wrote:|-{2,}\s*original message\s*-{2,}|_{5,})\s*$", re.IGNORECASE)
+
+
+def strip_quoted(text: str) -> str:
+    """Drop quoted replies (lines starting with '>' and everything after an 'On ... wrote:' line)."""
+    out = []
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if _QUOTE_HEADER.match(stripped):
+            break
+        if stripped.startswith(">"):
+            continue
+        out.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip()
+
+
+def _turn(message_id: str, sender: str, body: str, turn_chars: int) -> dict:
+    text = strip_quoted(body)
+    if len(text) > turn_chars:
+        text = text[:turn_chars] + " ..."
+    return {"id": str(message_id or ""), "from": (sender or "").strip(), "text": text}
+
+
+def _thread_enabled() -> bool:
+    """THREAD_CONTEXT (default on): keep and use per-thread context."""
+    return os.getenv("THREAD_CONTEXT", "1").strip().lower() in ("1", "true", "yes")
+
+
+def _clip_middle(text: str, max_chars: int) -> str:
+    """Trim text to max_chars by dropping the middle, so the opening context and the newest lines survive."""
+    if len(text) <= max_chars:
+        return text
+    marker = "\n...\n"
+    if max_chars <= len(marker):
+        return text[:max_chars]
+    head = (max_chars - len(marker)) // 2
+    tail = max_chars - len(marker) - head
+    return text[:head] + marker + text[len(text) - tail:]
+
+
+def _record_lock(user_id: str, thread_id: str) -> threading.Lock:
+    return _RECORD_LOCKS[hash((str(user_id), str(thread_id))) % len(_RECORD_LOCKS)]
+
+
+def _summarize(summary: str, turns: list[dict], max_chars: int) -> str:
+    """
+    Extend summary with turns. THREAD_CONTEXT_SUMMARY=llm (default) asks the LLM for an updated
+    summary; "extract" (or any LLM failure) appends one truncated line per turn instead.
+    Beyond max_chars the middle is trimmed: the start of the thread and the latest turns are kept.
+    """
+    lines = "\n".join(f"- {t['from']}: {t['text'][:300]}" for t in turns)
+    if os.getenv("THREAD_CONTEXT_SUMMARY", "llm").strip().lower() == "llm" and os.getenv("OPENAI_API_KEY"):
+        try:
+            from langchain_core.messages import HumanMessage, SystemMessage
+            from langchain_openai import ChatOpenAI
+
+            from email_assistant.prompts import THREAD_SUMMARY_SYSTEM
+
+            llm = ChatOpenAI(
+                model=os.getenv("THREAD_SUMMARY_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o")),
+                api_key=os.getenv("OPENAI_API_KEY"),
+            )
+            user = f"## Summary so far\n{summary or '(none)'}\n\n## New messages (oldest first)\n{lines}"
+            result = llm.invoke([SystemMessage(content=THREAD_SUMMARY_SYSTEM), HumanMessage(content=user)])
+            text = str(getattr(result, "content", "") or "").strip()
+            if text:
+                return _clip_middle(text, max_chars)
+        except Exception as e:
+            print(f"Thread summary LLM failed, using extractive summary: {e}")
+    combined = f"{summary}\n{lines}".strip() if summary else lines
+    return _clip_middle(combined, max_chars)
+
+
+class ThreadContextCache:
+    """
+    Read / extend thread context entries: {"summary", "turns": [{id, from, text}], "seen": [ids], "updated_at"}.
+
+    store: LangGraph BaseStore (PostgresStore, InMemoryStore) or None for the per-process LRU.
+    """
+
+    def __init__(
+        self,
+        store: Any = None,
+        max_turns: int = MAX_TURNS,
+        turn_chars: int = TURN_CHARS,
+        summary_chars: int = SUMMARY_CHARS,
+    ):
+        self.store = store
+        self.max_turns = max(1, int(max_turns))
+        self.turn_chars = int(turn_chars)
+        self.summary_chars = int(summary_chars)
+
+    def get(self, user_id: str, thread_id: str) -> Optional[dict]:
+        if self.store is None:
+            with _local_lock:
+                entry = _local.get((str(user_id), str(thread_id)))
+                if entry is not None:
+                    _local.move_to_end((str(user_id), str(thread_id)))
+                return entry
+        try:
+            item = self.store.get(("thread_context", str(user_id)), str(thread_id))
+        except Exception as e:
+            print(f"Thread context read failed: {e}")
+            return None
+        value = getattr(item, "value", item) if item is not None else None
+        return value if isinstance(value, dict) else None
+
+    def put(self, user_id: str, thread_id: str, entry: dict) -> None:
+        entry = {**entry, "updated_at": time.time()}
+        if self.store is None:
+            with _local_lock:
+                _local[(str(user_id), str(thread_id))] = entry
+                _local.move_to_end((str(user_id), str(thread_id)))
+                while len(_local) > _LOCAL_MAX_THREADS:
+                    _local.popitem(last=False)
+            return
+        try:
+            self.store.put(("thread_context", str(user_id)), str(thread_id), entry)
+        except Exception as e:
+            print(f"Thread context write failed: {e}")
+
+    def extend(self, entry: Optional[dict], turns: list[dict]) -> dict:
+        """Append turns (skipping ids already seen); fold the oldest into the summary beyond max_turns."""
+        entry = dict(entry or {"summary": "", "turns": [], "seen": []})
+        seen = list(entry.get("seen") or [])
+        current = list(entry.get("turns") or [])
+        for turn in turns:
+            if turn["id"] and turn["id"] in seen:
+                continue
+            current.append(turn)
+            if turn["id"]:
+                seen.append(turn["id"])
+        if len(current) > self.max_turns:
+            folded, current = current[: len(current) - self.max_turns], current[-self.max_turns:]
+            entry["summary"] = _summarize(entry.get("summary") or "", folded, self.summary_chars)
+        entry["turns"] = current
+        entry["seen"] = seen[-200:]
+        return entry
+
+    @staticmethod
+    def render(entry: Optional[dict]) -> str:
+        """Compact text of an entry for prompts ("" when there is nothing earlier in the thread)."""
+        if not entry:
+            return ""
+        parts = []
+        if entry.get("summary"):
+            parts.append(f"Summary of earlier messages: {entry['summary']}")
+        for t in entry.get("turns") or []:
+            parts.append(f"- {t.get('from') or 'unknown'}: {t.get('text') or ''}")
+        return "\n".join(parts)
+
+    def _seed_from_gmail(self, thread_id: str, message_id: str) -> Optional[dict]:
+        """Build an entry from users.threads.get for the messages before message_id (one 10-unit call)."""
+        try:
+            from email_assistant.tools.gmail.api import execute
+            from email_assistant.tools.gmail.auth import get_gmail_service
+
+            thread = execute(get_gmail_service().users().threads().get(userId="me", id=thread_id, format="full"))
+        except Exception as e:
+            print(f"Thread context seed failed for {thread_id}: {e}")
+            return None
+        turns = []
+        for msg in thread.get("messages") or []:
+            if msg.get("id") == message_id:
+                break
+            payload = msg.get("payload") or {}
+            sender = next(
+                ((h.get("value") or "") for h in payload.get("headers") or [] if (h.get("name") or "").lower() == "from"),
+                "",
+            )
+            turns.append(_turn(msg.get("id"), sender, extract_text_body(payload) or msg.get("snippet") or "", self.turn_chars))
+        return self.extend(None, turns)
+
+    def record(self, user_id: str, email_input: dict) -> str:
+        """
+        Return the rendered context of messages before email_input in its Gmail thread, then add email_input.
+
+        Use cases: triage node, once per processed email. Returns "" for non-Gmail input, the first
+        message of a thread, or when THREAD_CONTEXT=0. Reprocessing a message does not duplicate it.
+        Read, extend and write run under a per-thread lock, so concurrent messages of one thread in
+        this process (thread pool, --async) do not overwrite each other's turns.
+        """
+        thread_id = email_input.get("gmail_thread_id")
+        if not thread_id or not _thread_enabled():
+            return ""
+        with _record_lock(user_id, thread_id):
+            return self._record(user_id, str(thread_id), email_input)
+
+    def peek(self, user_id: str, email_input: dict) -> Optional[str]:
+        """
+        The context record() would return for email_input, without recording it.
+
+        Use cases: the watcher's batch triage, before the graph records the email. None when
+        record() would first seed the entry from Gmail (a reply of a thread not seen yet).
+        """
+        thread_id = email_input.get("gmail_thread_id")
+        if not thread_id or not _thread_enabled():
+            return ""
+        entry = self.get(user_id, str(thread_id))
+        if entry is None:
+            return None if email_input.get("references") and email_input.get("_source") == "gmail" else ""
+        message_id = str(email_input.get("id") or "")
+        if message_id in (entry.get("seen") or []):
+            turns = entry.get("turns") or []
+            ids = [t.get("id") for t in turns]
+            entry = dict(entry, turns=turns[: ids.index(message_id)] if message_id in ids else [])
+        return self.render(entry)
+
+    def _record(self, user_id: str, thread_id: str, email_input: dict) -> str:
+        message_id = str(email_input.get("id") or "")
+        entry = self.get(user_id, thread_id)
+        if entry is None and email_input.get("references") and email_input.get("_source") == "gmail":
+            entry = self._seed_from_gmail(thread_id, message_id)
+        if entry is not None and message_id in (entry.get("seen") or []):
+            # Re-run of a message already recorded: show only what came before it.
+            turns = entry.get("turns") or []
+            ids = [t.get("id") for t in turns]
+            before = dict(entry, turns=turns[: ids.index(message_id)] if message_id in ids else [])
+            return self.render(before)
+        context = self.render(entry)
+        turn = _turn(message_id, email_input.get("from", ""), str(email_input.get("body") or ""), self.turn_chars)
+        self.put(user_id, thread_id, self.extend(entry, [turn]))
+        return context
+
+
+def get_thread_context_cache(store: Any = None) -> ThreadContextCache:
+    """
+    ThreadContextCache over store (or the per-process LRU).
+
+    THREAD_CONTEXT_MAX_TURNS: recent messages kept verbatim (default 4).
+    THREAD_CONTEXT_TURN_CHARS / THREAD_CONTEXT_SUMMARY_CHARS: per-message and summary caps (800 / 1500).
+    """
+    return ThreadContextCache(
+        store,
+        max_turns=int(os.getenv("THREAD_CONTEXT_MAX_TURNS", str(MAX_TURNS))),
+        turn_chars=int(os.getenv("THREAD_CONTEXT_TURN_CHARS", str(TURN_CHARS))),
+        summary_chars=int(os.getenv("THREAD_CONTEXT_SUMMARY_CHARS", str(SUMMARY_CHARS))),
+    )
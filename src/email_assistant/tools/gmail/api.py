@@ -0,0 +1,244 @@
+"""
+Shared execution layer for Gmail and Calendar API requests: rate limiting, retries, quota accounting.
+
+Use cases: every Gmail / Calendar helper runs its googleapiclient request through execute()
+instead of calling request.execute() directly. A per-API token bucket keeps the process under
+the per-user quota (Gmail counts quota units per method, e.g. 5 for messages.get and 100 for
+messages.send); 429, 5xx and 403 rate-limit responses are retried with exponential backoff and
+jitter (honouring Retry-After). Per-method counters (calls, errors, retries, quota units,
+latency) are available from api_stats() for monitoring.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from googleapiclient.errors import HttpError
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded")
+
+# Gmail quota units per method (developers.google.com/gmail/api/reference/quota); 1 when not listed.
+QUOTA_UNITS = {
+    "gmail.users.getProfile": 1,
+    "gmail.users.watch": 100,
+    "gmail.users.stop": 50,
+    "gmail.users.history.list": 2,
+    "gmail.users.labels.list": 1,
+    "gmail.users.labels.get": 1,
+    "gmail.users.labels.create": 5,
+    "gmail.users.messages.list": 5,
+    "gmail.users.messages.get": 5,
+    "gmail.users.messages.send": 100,
+    "gmail.users.messages.modify": 5,
+    "gmail.users.messages.batchModify": 50,
+    "gmail.users.messages.attachments.get": 5,
+    "gmail.users.threads.list": 10,
+    "gmail.users.threads.get": 10,
+}
+# Methods that must not be re-sent after a server error: the first attempt may have gone through.
+# They are retried only on throttling responses, which Google returns before doing the work.
+NON_IDEMPOTENT = frozenset({"gmail.users.messages.send", "gmail.users.drafts.send", "calendar.events.insert"})
+# Client errors no retry can fix for one message id: malformed id (400), deleted or moved message (404).
+MISSING_MESSAGE_STATUSES = frozenset({400, 404})
+
+
+def _http_error(exc: BaseException) -> Optional[HttpError]:
+    """Find an HttpError in exc or its cause chain (Gmail helpers wrap them in RuntimeError)."""
+    seen = 0
+    while exc is not None and seen < 10:
+        if isinstance(exc, HttpError):
+            return exc
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return None
+
+
+def classify_error(exc: BaseException) -> tuple[bool, Optional[int], Optional[float]]:
+    """
+    Return (throttled, http_status, retry_after_seconds) for an exception raised by an API call.
+
+    throttled is True for 429, 5xx and 403 responses whose reason is a rate or quota limit.
+    """
+    err = _http_error(exc)
+    if err is None:
+        return False, None, None
+    status = getattr(err.resp, "status", None)
+    try:
+        status = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status = None
+    retry_after = None
+    try:
+        value = err.resp.get("retry-after") if hasattr(err.resp, "get") else None
+        retry_after = float(value) if value else None
+    except (TypeError, ValueError):
+        retry_after = None
+    throttled = status in RETRYABLE_STATUSES or (
+        status == 403 and any(reason in str(getattr(err, "content", b"")) for reason in RATE_LIMIT_REASONS)
+    )
+    return throttled, status, retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket: up to `capacity` units at once, refilled at `rate` units per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float = 1) -> float:
+        """
+        Take units, sleeping until the bucket has refilled enough. Returns seconds slept.
+
+        Callers reserve in arrival order (the balance may go negative), so concurrent
+        threads queue up fairly instead of polling.
+        """
+        if self.rate <= 0 or units <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= units
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class _MethodStats:
+    __slots__ = ("calls", "errors", "retries", "units", "latency_total", "latency_max", "throttle_wait")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.units = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.throttle_wait = 0.0
+
+
+_stats_lock = threading.Lock()
+_stats: dict[str, _MethodStats] = {}
+_buckets_lock = threading.Lock()
+_buckets: dict[str, TokenBucket] = {}
+_rng = random.Random()
+
+
+def _bucket(api: str) -> TokenBucket:
+    """
+    Process-wide bucket per API.
+
+    GMAIL_API_UNITS_PER_SECOND: Gmail quota units per second (default 250, the per-user limit).
+    CALENDAR_API_REQUESTS_PER_SECOND: Calendar requests per second (default 10).
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(api)
+        if bucket is None:
+            if api == "gmail":
+                rate = float(os.getenv("GMAIL_API_UNITS_PER_SECOND", "250"))
+            else:
+                rate = float(os.getenv("CALENDAR_API_REQUESTS_PER_SECOND", "10"))
+            bucket = _buckets[api] = TokenBucket(rate)
+        return bucket
+
+
+def _record(method: str, units: int, latency: float, error: bool, retry: bool, waited: float) -> None:
+    with _stats_lock:
+        s = _stats.get(method)
+        if s is None:
+            s = _stats[method] = _MethodStats()
+        s.calls += 1
+        s.units += units
+        s.latency_total += latency
+        s.latency_max = max(s.latency_max, latency)
+        s.throttle_wait += waited
+        if error:
+            s.errors += 1
+        if retry:
+            s.retries += 1
+
+
+def _max_retries() -> int:
+    return max(0, int(os.getenv("GMAIL_API_MAX_RETRIES", "5")))
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """
+    Equal-jitter exponential backoff for retry number attempt (1-based): uniform in [c/2, c], c = min(cap, 2^attempt).
+
+    GMAIL_API_BACKOFF_MAX caps the delay (default 32 seconds); never below Retry-After.
+    """
+    if cap is None:
+        cap = float(os.getenv("GMAIL_API_BACKOFF_MAX", "32"))
+    ceiling = min(cap, 2.0 ** attempt)
+    delay = _rng.uniform(ceiling / 2, ceiling)
+    if retry_after:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+def execute(request, method: Optional[str] = None, units: Optional[int] = None, max_retries: Optional[int] = None):
+    """
+    Execute a googleapiclient request (or batch) with rate limiting, retries and accounting.
+
+    method: label for stats and quota lookup (default: the request's methodId, e.g.
+    "gmail.users.messages.get"); units: quota units to charge (default QUOTA_UNITS[method]).
+    Retries 429 / 5xx / 403 rate-limit errors up to GMAIL_API_MAX_RETRIES times; methods in
+    NON_IDEMPOTENT (sends, event inserts) are retried only on 429 and 403 rate limits.
+    Raises the last error when retries are exhausted or the error is not retryable.
+    """
+    method = method or getattr(request, "methodId", None) or "unknown"
+    if units is None:
+        units = QUOTA_UNITS.get(method, 1)
+    retries = _max_retries() if max_retries is None else max(0, int(max_retries))
+    bucket = _bucket(method.split(".", 1)[0])
+    attempt = 0
+    while True:
+        waited = bucket.acquire(units)
+        started = time.monotonic()
+        try:
+            result = request.execute()
+        except Exception as e:
+            latency = time.monotonic() - started
+            throttled, status, retry_after = classify_error(e)
+            if throttled and method in NON_IDEMPOTENT and status not in (429, 403):
+                throttled = False
+            retry = throttled and attempt < retries
+            _record(method, units, latency, error=True, retry=retry, waited=waited)
+            if not retry:
+                raise
+            attempt += 1
+            time.sleep(backoff_delay(attempt, retry_after))
+            continue
+        _record(method, units, time.monotonic() - started, error=False, retry=False, waited=waited)
+        return result
+
+
+def api_stats() -> dict:
+    """Per-method snapshot: calls, errors, retries, quota units, latency (avg / max ms), rate-limit wait."""
+    with _stats_lock:
+        return {
+            method: {
+                "calls": s.calls,
+                "errors": s.errors,
+                "retries": s.retries,
+                "units": s.units,
+                "latency_avg_ms": round(1000 * s.latency_total / s.calls, 1) if s.calls else 0.0,
+                "latency_max_ms": round(1000 * s.latency_max, 1),
+                "throttle_wait_s": round(s.throttle_wait, 3),
+            }
+            for method, s in sorted(_stats.items())
+        }
+
+
+def reset_api_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
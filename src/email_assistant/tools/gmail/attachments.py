@@ -0,0 +1,315 @@
+"""
+Lazy Gmail attachments: on-demand download, content-addressed disk cache, text extraction.
+
+Use cases: ingestion records attachment metadata only (utils.attachment_parts -> email_input
+["attachments"]); nothing is downloaded until the response agent calls read_attachment_tool
+or code calls get_attachment_bytes / get_attachment_text. Bodies are fetched with
+users.messages.attachments.get and stored by SHA-256 of their content, so the same file sent
+in several emails is stored once; the cache is trimmed to GMAIL_ATTACHMENT_CACHE_MAX_MB by
+evicting the least recently used blobs. Text extraction covers text/*, HTML, JSON/XML/CSV,
+DOCX (stdlib) and PDF (optional pypdf: pip install 'email-assistant[attachments]').
+"""
+
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+import threading
+import zipfile
+from pathlib import Path
+from typing import Annotated, Optional
+
+from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
+
+from email_assistant.tools.gmail.api import execute
+from email_assistant.tools.gmail.auth import _resolve_path, get_gmail_service
+
+MAX_TEXT_CHARS = 8000
+TEXT_MIME_TYPES = ("application/json", "application/xml", "application/csv", "application/x-yaml")
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class AttachmentTooLarge(RuntimeError):
+    """Raised when an attachment exceeds GMAIL_ATTACHMENT_MAX_MB; it is not downloaded."""
+
+
+class AttachmentCache:
+    """
+    Content-addressed blob store: blobs/<sha[:2]>/<sha> plus keys/<key> -> sha.
+
+    Keys are (message_id, part_id) hashes; part ids are stable for a message while Gmail
+    attachment ids are not. Reads touch the blob's mtime, and trim() evicts the oldest blobs
+    until the total is under max_bytes. A key whose blob was evicted is a cache miss.
+    Safe across threads and processes: blobs and keys are written to temp files and renamed.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(message_id: str, part_id: str) -> str:
+        return hashlib.sha256(f"{message_id}:{part_id}".encode()).hexdigest()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def _key_path(self, key: str) -> Path:
+        return self.directory / "keys" / key
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str, suffix: str = "") -> Optional[bytes]:
+        """Cached bytes for key (suffix ".txt" = extracted text sidecar), or None."""
+        try:
+            digest = self._key_path(key).read_text().strip()
+            path = self._blob_path(digest)
+            if suffix:
+                path = path.with_name(path.name + suffix)
+            data = path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store data under its SHA-256 and point key at it; returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest)
+        if blob.exists():
+            os.utime(blob)
+        else:
+            self._write(blob, data)
+        self._write(self._key_path(key), digest.encode())
+        self.trim()
+        return digest
+
+    def put_sidecar(self, key: str, suffix: str, data: bytes) -> None:
+        """Store derived data (e.g. extracted text) next to key's blob; evicted with it."""
+        try:
+            digest = self._key_path(key).read_text().strip()
+        except OSError:
+            return
+        blob = self._blob_path(digest)
+        if blob.exists():
+            self._write(blob.with_name(blob.name + suffix), data)
+
+    def trim(self) -> int:
+        """Evict least recently used blobs (and their sidecars) until under max_bytes. Returns bytes freed."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in (self.directory / "blobs").glob("*/*"):
+                if path.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                total += st.st_size
+                if "." not in path.name:
+                    entries.append((st.st_mtime, path))
+            freed = 0
+            for _, path in sorted(entries):
+                if total - freed <= self.max_bytes:
+                    break
+                for victim in [path, *path.parent.glob(path.name + ".*")]:
+                    try:
+                        size = victim.stat().st_size
+                        victim.unlink()
+                        freed += size
+                    except OSError:
+                        pass
+            return freed
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[AttachmentCache] = None
+
+
+def get_attachment_cache() -> AttachmentCache:
+    """
+    Process-wide AttachmentCache.
+
+    GMAIL_ATTACHMENT_CACHE_DIR: cache directory (default .gmail_attachment_cache in project root).
+    GMAIL_ATTACHMENT_CACHE_MAX_MB: cache size limit in MB (default 500).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            directory = _resolve_path(os.getenv("GMAIL_ATTACHMENT_CACHE_DIR", ".gmail_attachment_cache"))
+            max_mb = float(os.getenv("GMAIL_ATTACHMENT_CACHE_MAX_MB", "500"))
+            _cache = AttachmentCache(directory, int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def _max_attachment_bytes() -> int:
+    """GMAIL_ATTACHMENT_MAX_MB: attachments larger than this are never downloaded (default 25)."""
+    return int(float(os.getenv("GMAIL_ATTACHMENT_MAX_MB", "25")) * 1024 * 1024)
+
+
+def get_attachment_bytes(message_id: str, attachment: dict, service=None) -> bytes:
+    """
+    Bytes of one attachment (an entry of email_input["attachments"]), from the cache or Gmail.
+
+    Raises AttachmentTooLarge above GMAIL_ATTACHMENT_MAX_MB; Gmail errors propagate as RuntimeError.
+    """
+    cache = get_attachment_cache()
+    key = cache.key(message_id, attachment.get("part_id") or attachment.get("attachment_id", ""))
+    data = cache.get(key)
+    if data is not None:
+        return data
+    limit = _max_attachment_bytes()
+    if int(attachment.get("size") or 0) > limit:
+        raise AttachmentTooLarge(f"{attachment.get('filename') or 'attachment'} is larger than {limit // (1024 * 1024)} MB")
+    service = service or get_gmail_service()
+    try:
+        result = execute(service.users().messages().attachments().get(
+            userId="me", messageId=message_id, id=attachment["attachment_id"],
+        ))
+    except Exception as e:
+        raise RuntimeError(f"Gmail API attachment get failed: {e}") from e
+    raw = result.get("data") or ""
+    data = base64.urlsafe_b64decode((raw + "=" * (-len(raw) % 4)).encode("ASCII"))
+    cache.put(key, data)
+    return data
+
+
+def _html_to_text(text: str) -> str:
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", text)
+    text = re.sub(r"(?i)<br\s*/?>|</p>|</div>|</tr>|</li>", "\n", text)
+    text = html.unescape(re.sub(r"<[^>]+>", " ", text))
+    return re.sub(r"[ \t]+", " ", re.sub(r"\n\s*\n+", "\n\n", text)).strip()
+
+
+def _docx_to_text(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        xml = z.read("word/document.xml").decode("utf-8", errors="replace")
+    xml = re.sub(r"</w:p>", "\n", xml)
+    return html.unescape(re.sub(r"<[^>]+>", "", xml)).strip()
+
+
+def _pdf_to_text(data: bytes, max_chars: int) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("PDF text extraction needs pypdf (pip install 'email-assistant[attachments]')")
+    reader = PdfReader(io.BytesIO(data))
+    out, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        out.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return "\n".join(out).strip()
+
+
+def text_kind(mime_type: str, filename: str = "") -> Optional[str]:
+    """Extractor for an attachment type ("pdf", "docx", "html", "text"), or None when text cannot be extracted."""
+    mime_type = (mime_type or "").lower()
+    name = (filename or "").lower()
+    if mime_type == "application/pdf" or name.endswith(".pdf"):
+        return "pdf"
+    if mime_type == DOCX_MIME_TYPE or name.endswith(".docx"):
+        return "docx"
+    if mime_type.startswith("text/html") or name.endswith((".html", ".htm")):
+        return "html"
+    if mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES or name.endswith(
+        (".txt", ".csv", ".md", ".json", ".xml", ".yaml", ".yml", ".ics", ".log")
+    ):
+        return "text"
+    return None
+
+
+def extract_text(data: bytes, mime_type: str, filename: str = "", max_chars: int = MAX_TEXT_CHARS) -> str:
+    """
+    Text of an attachment for the LLM, truncated to max_chars.
+
+    Raises ValueError for unsupported types (images, archives, ...).
+    """
+    kind = text_kind(mime_type, filename)
+    if kind == "pdf":
+        text = _pdf_to_text(data, max_chars)
+    elif kind == "docx":
+        text = _docx_to_text(data)
+    elif kind == "html":
+        text = _html_to_text(data.decode("utf-8", errors="replace"))
+    elif kind == "text":
+        text = data.decode("utf-8", errors="replace")
+    else:
+        raise ValueError(f"cannot extract text from {mime_type or 'unknown type'}")
+    return text[:max_chars]
+
+
+def get_attachment_text(message_id: str, attachment: dict, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """
+    Extracted text of an attachment; the text is cached next to the blob, so repeat reads skip extraction.
+
+    Raises ValueError before downloading anything when the type has no text extractor.
+    """
+    if text_kind(attachment.get("mime_type", ""), attachment.get("filename", "")) is None:
+        raise ValueError(f"cannot extract text from {attachment.get('mime_type') or 'unknown type'}")
+    cache = get_attachment_cache()
+    key = cache.key(message_id, attachment.get("part_id") or attachment.get("attachment_id", ""))
+    cached = cache.get(key, ".txt")
+    if cached is not None:
+        return cached.decode("utf-8", errors="replace")[:max_chars]
+    data = get_attachment_bytes(message_id, attachment)
+    text = extract_text(data, attachment.get("mime_type", ""), attachment.get("filename", ""), MAX_TEXT_CHARS)
+    cache.put_sidecar(key, ".txt", text.encode("utf-8"))
+    return text[:max_chars]
+
+
+def _describe(index: int, attachment: dict) -> str:
+    size = int(attachment.get("size") or 0)
+    size_text = f"{size // 1024} KB" if size >= 1024 else f"{size} bytes"
+    return f"{index}. {attachment.get('filename') or '(unnamed)'} ({attachment.get('mime_type') or 'unknown'}, {size_text})"
+
+
+@tool
+def read_attachment_tool(
+    filename: Optional[str] = None,
+    index: Optional[int] = None,
+    email_input: Annotated[Optional[dict], InjectedState("email_input")] = None,
+) -> str:
+    """
+    Read an attachment of the email being handled. Call with no arguments to list the attachments,
+    then with filename (or its 1-based index from the list) to get its text content.
+    """
+    attachments = list((email_input or {}).get("attachments") or [])
+    message_id = (email_input or {}).get("id")
+    if not attachments or not message_id:
+        return "This email has no attachments."
+    if filename is None and index is None:
+        return "Attachments:\n" + "\n".join(_describe(i, a) for i, a in enumerate(attachments, 1))
+    chosen = None
+    if index is not None and 1 <= index <= len(attachments):
+        chosen = attachments[index - 1]
+    elif filename:
+        wanted = filename.strip().lower()
+        chosen = next((a for a in attachments if (a.get("filename") or "").lower() == wanted), None)
+        if chosen is None:
+            chosen = next((a for a in attachments if wanted in (a.get("filename") or "").lower()), None)
+    if chosen is None:
+        return "No such attachment. Attachments:\n" + "\n".join(_describe(i, a) for i, a in enumerate(attachments, 1))
+    try:
+        text = get_attachment_text(str(message_id), chosen)
+    except (AttachmentTooLarge, ValueError) as e:
+        return f"Cannot read {chosen.get('filename') or 'attachment'}: {e}"
+    except Exception as e:
+        return f"Failed to read attachment: {e}"
+    return f"Content of {chosen.get('filename') or 'attachment'}:\n{text}" if text.strip() else "The attachment has no text."
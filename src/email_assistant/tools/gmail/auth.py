@@ -2,17 +2,37 @@
 Gmail API credentials and service builder.
 
 Use cases: load OAuth token from GOOGLE_TOKEN_PATH; run OAuth flow if missing/expired;
-build Gmail API service for send_email and (later) mark_as_read, fetch_emails.
+build Gmail and Calendar API services for send_email, mark_as_read, fetch_emails and calendar.
+Credentials are cached process-wide and services per thread, so repeated calls are cheap.
+Refresh is single-flight within a process and serialized across processes by a lock file
+next to token.json, which is rewritten atomically.
+Clients are built from the discovery documents bundled in tools/gmail/discovery/ (pinned
+revisions, no discovery fetch at startup).
 """
 
+import contextlib
+import functools
 import json
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Optional
 
+import httplib2
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+
+from email_assistant.tools.gmail.fake_api import fake_api_enabled, fake_service
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Gmail send scope; gmail.readonly + gmail.modify for reply (get message/thread) and mark_as_read.
 # Calendar for check_calendar_tool and schedule_meeting_tool.
@@ -47,76 +67,256 @@ def _credentials_path() -> str:
     return _resolve_path(os.getenv("GOOGLE_CREDENTIALS_PATH", ".secrets/credentials.json"))
 
 
-def get_credentials() -> Credentials:
+def _token_dict(creds: Credentials) -> dict:
+    return {
+        "token": creds.token,
+        "refresh_token": creds.refresh_token,
+        "token_uri": creds.token_uri,
+        "client_id": creds.client_id,
+        "client_secret": creds.client_secret,
+        "scopes": creds.scopes,
+        "expiry": creds.expiry.isoformat() if creds.expiry else None,
+    }
+
+
+def _save_token(creds: Credentials, token_path: str) -> None:
+    """
+    Write creds to token.json atomically (temp file + rename), so readers never see a half-written file.
+
+    Expiry is included so the next process knows when to refresh. Call with the token file lock held.
+    """
+    path = Path(token_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(_token_dict(creds), f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _token_file_lock(token_path: str):
+    """Exclusive cross-process lock on <token_path>.lock, held while token.json is refreshed or rewritten."""
+    lock_path = Path(token_path + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _refresh_margin() -> float:
+    """GOOGLE_TOKEN_REFRESH_MARGIN: seconds before expiry at which the access token is refreshed (default 300)."""
+    return max(0.0, float(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300")))
+
+
+class SharedCredentials(Credentials):
+    """
+    OAuth credentials shared by every thread and process using the same token.json.
+
+    refresh() is single-flight: concurrent callers (get_credentials and AuthorizedHttp's
+    before_request / 401 retry) wait for one refresh and reuse its token. Across processes,
+    the refresh runs under a file lock; a process that finds a newer token already saved
+    adopts it instead of refreshing again. Tokens count as expired refresh_margin seconds
+    early, so they are renewed before requests start failing.
     """
-    Load credentials from token.json; run OAuth flow if missing or expired.
+
+    def __init__(self, *args, token_path: Optional[str] = None, refresh_margin: float = 300, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_path = token_path or _token_path()
+        self.refresh_margin = refresh_margin
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+
+    @property
+    def expired(self) -> bool:
+        if not self.expiry:
+            return False
+        now = datetime.now(timezone.utc).replace(tzinfo=None)  # expiry is naive UTC
+        return now >= self.expiry - timedelta(seconds=self.refresh_margin)
+
+    def refresh(self, request) -> None:
+        stale_token = self.token
+        with self._refresh_lock:
+            if self.token != stale_token and self.valid:
+                return  # Another thread refreshed while this one waited.
+            with _token_file_lock(self.token_path):
+                on_disk = _read_token(self.token_path)
+                if on_disk is not None and on_disk.token not in (None, stale_token) and on_disk.valid:
+                    # Another process refreshed and saved a newer token.
+                    self.token = on_disk.token
+                    self.expiry = on_disk.expiry
+                    if on_disk.refresh_token:
+                        self._refresh_token = on_disk.refresh_token
+                    return
+                super().refresh(request)
+                self.refreshes += 1
+                try:
+                    _save_token(self, self.token_path)
+                except OSError as e:
+                    print(f"Could not save refreshed token to {self.token_path}: {e}")
+
+
+def _credentials_from_dict(data: dict, token_path: str) -> SharedCredentials:
+    expiry = None
+    if data.get("expiry"):
+        # google-auth compares expiry as naive UTC
+        expiry = datetime.fromisoformat(data["expiry"]).replace(tzinfo=None)
+    return SharedCredentials(
+        token=data.get("token"),
+        refresh_token=data.get("refresh_token"),
+        token_uri=data.get("token_uri") or "https://oauth2.googleapis.com/token",
+        client_id=data.get("client_id"),
+        client_secret=data.get("client_secret"),
+        scopes=data.get("scopes", SCOPES),
+        expiry=expiry,
+        token_path=token_path,
+        refresh_margin=_refresh_margin(),
+    )
+
+
+def _read_token(token_path: str) -> Optional[SharedCredentials]:
+    """Credentials from token.json, or None when the file does not exist."""
+    if not os.path.exists(token_path):
+        return None
+    with open(token_path, "r") as f:
+        data = json.load(f)
+    return _credentials_from_dict(data, token_path)
+
+
+def _load_credentials() -> SharedCredentials:
+    """Read token.json (refresh or run the OAuth flow when it is missing or expired)."""
+    token_path = _token_path()
+    creds = _read_token(token_path)
+    if creds is not None and creds.valid:
+        return creds
+    if creds is not None and creds.refresh_token:
+        creds.refresh(Request())
+        return creds
+    with _token_file_lock(token_path):
+        # Another process may have completed the OAuth flow while this one waited for the lock.
+        creds = _read_token(token_path)
+        if creds is not None and creds.valid:
+            return creds
+        cred_path = _credentials_path()
+        if not os.path.exists(cred_path):
+            raise FileNotFoundError(
+                f"Credentials not found at {cred_path}. "
+                "Download OAuth client secrets from Google Cloud Console, save as "
+                ".secret/credentials.json (or .secrets/credentials.json) in the project root, then run again."
+            )
+        flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
+        creds = _credentials_from_dict(_token_dict(flow.run_local_server(port=0)), token_path)
+        _save_token(creds, token_path)
+    return creds
+
+
+# Process-wide credentials, shared by every thread; refreshed in place (single-flight, see SharedCredentials).
+_creds_lock = threading.Lock()
+_creds: Optional[SharedCredentials] = None
+# Per-thread service clients: httplib2.Http (and so a built service) must not be shared across threads.
+_local = threading.local()
+HTTP_TIMEOUT = 60
+# Version-pinned discovery documents (<api>.<version>.json). Update by copying newer files from
+# googleapiclient/discovery_cache/documents/ and checking the Gmail / Calendar calls still work.
+DISCOVERY_DIR = Path(__file__).resolve().parent / "discovery"
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str) -> Optional[str]:
+    """Bundled discovery JSON text for (api, version), read once per process; None if not bundled."""
+    path = DISCOVERY_DIR / f"{api}.{version}.json"
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8")
+
+
+def get_credentials() -> SharedCredentials:
+    """
+    Return process-wide OAuth credentials; token.json is read once, then refreshed shortly before expiry.
 
     Use cases: call before building Gmail service. On first run, ensure
     .secrets/credentials.json exists (from Google Cloud Console) so the flow can open
-    a browser and save .secrets/token.json.
+    a browser and save .secrets/token.json. Concurrent callers share one refresh.
     """
-    token_path = _token_path()
-    creds = None
-    if os.path.exists(token_path):
-        with open(token_path, "r") as f:
-            data = json.load(f)
-        creds = Credentials(
-            token=data.get("token"),
-            refresh_token=data.get("refresh_token"),
-            token_uri=data.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=data.get("client_id"),
-            client_secret=data.get("client_secret"),
-            scopes=data.get("scopes", SCOPES),
-        )
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    global _creds
+    with _creds_lock:
+        if _creds is None:
+            _creds = _load_credentials()
+        creds = _creds
+    if not creds.valid:
+        if creds.refresh_token:
             creds.refresh(Request())
-            Path(token_path).parent.mkdir(parents=True, exist_ok=True)
-            with open(token_path, "w") as f:
-                json.dump(
-                    {
-                        "token": creds.token,
-                        "refresh_token": creds.refresh_token,
-                        "token_uri": creds.token_uri,
-                        "client_id": creds.client_id,
-                        "client_secret": creds.client_secret,
-                        "scopes": creds.scopes,
-                    },
-                    f,
-                    indent=2,
-                )
         else:
-            cred_path = _credentials_path()
-            if not os.path.exists(cred_path):
-                raise FileNotFoundError(
-                    f"Credentials not found at {cred_path}. "
-                    "Download OAuth client secrets from Google Cloud Console, save as "
-                    ".secret/credentials.json (or .secrets/credentials.json) in the project root, then run again."
-                )
-            flow = InstalledAppFlow.from_client_secrets_file(cred_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-        Path(token_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(token_path, "w") as f:
-            json.dump(
-                {
-                    "token": creds.token,
-                    "refresh_token": creds.refresh_token,
-                    "token_uri": creds.token_uri,
-                    "client_id": creds.client_id,
-                    "client_secret": creds.client_secret,
-                    "scopes": creds.scopes,
-                },
-                f,
-                indent=2,
-            )
+            with _creds_lock:
+                if _creds is creds:
+                    _creds = _load_credentials()
+                creds = _creds
     return creds
 
 
+def get_service(api: str, version: str):
+    """
+    Return this thread's cached API client for (api, version), building it on first use.
+
+    Use cases: every Gmail / Calendar helper; repeated calls in one email run reuse the client
+    and its HTTP connections. Each thread (watcher workers, asyncio.to_thread calls) gets its
+    own httplib2 transport; all share one Credentials object. With GOOGLE_API_FAKE=1 the
+    in-process fake (tools/gmail/fake_api.py) is returned and no credentials are loaded.
+    """
+    if fake_api_enabled():
+        return fake_service(api, version)
+    creds = get_credentials()
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+    cached = services.get((api, version))
+    if cached is not None and cached[0] is creds:
+        return cached[1]
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+    document = _discovery_document(api, version)
+    if document is not None:
+        # Parsed per build: build_from_document adds keys to the dict it is given, so it is not shared.
+        service = build_from_document(document, http=http)
+    else:
+        service = build(api, version, http=http, cache_discovery=False, static_discovery=True)
+    services[(api, version)] = (creds, service)
+    return service
+
+
+def reset_service_cache() -> None:
+    """Drop cached credentials and clients (e.g. after replacing token.json); rebuilt on next use."""
+    global _creds, _local
+    with _creds_lock:
+        _creds = None
+        _local = threading.local()
+
+
 def get_gmail_service():
     """
-    Return a Gmail API v1 service instance using get_credentials().
+    Return this thread's cached Gmail API v1 service (see get_service).
 
     Use cases: pass to send_new_email() or other Gmail tool functions.
     """
-    creds = get_credentials()
-    return build("gmail", "v1", credentials=creds)
+    return get_service("gmail", "v1")
+
+
+def get_calendar_service():
+    """
+    Return this thread's cached Google Calendar API v3 service (see get_service).
+
+    Use cases: pass to list_events and create_event. Requires Calendar scope in auth.
+    """
+    return get_service("calendar", "v3")
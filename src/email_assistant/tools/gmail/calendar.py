@@ -1,26 +1,19 @@
 """
-check_calendar_tool and schedule_meeting_tool via Google Calendar API.
+check_calendar_tool, find_free_slots_tool and schedule_meeting_tool via Google Calendar API.
 
-Use cases: "What's on my calendar?" and scheduling meetings from email or user request.
+Use cases: "What's on my calendar?", "When can we meet?" and scheduling meetings from email or user request.
 """
 
-from datetime import datetime, timedelta
+import os
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from langchain_core.tools import tool
 
-from email_assistant.tools.gmail.auth import get_credentials
-
-
-def get_calendar_service():
-    """
-    Return a Google Calendar API v3 service instance using shared OAuth credentials.
-
-    Use cases: pass to list_events and create_event. Requires Calendar scope in auth.
-    """
-    from googleapiclient.discovery import build
-    creds = get_credentials()
-    return build("calendar", "v3", credentials=creds)
+from email_assistant.tools.gmail.api import execute
+from email_assistant.tools.gmail.auth import get_calendar_service
+from email_assistant.tools.gmail.calendar_mirror import calendar_mirror_enabled, get_calendar_mirror
+from email_assistant.tools.gmail.free_slots import find_free_slots, working_hours
 
 
 def list_events(
@@ -33,7 +26,16 @@ def list_events(
     List calendar events in the given time range.
 
     Use cases: check_calendar_tool calls this; agent answers "What's on my calendar tomorrow?"
+    Served from the local mirror (calendar_mirror.py) when CALENDAR_MIRROR is on; falls back
+    to events.list if the mirror cannot sync.
     """
+    if calendar_mirror_enabled():
+        mirror = get_calendar_mirror(calendar_id)
+        try:
+            mirror.sync()
+            return mirror.query(time_min, time_max, max_results)
+        except Exception as e:
+            print(f"Calendar mirror unavailable, listing events directly: {e}")
     service = get_calendar_service()
     params = {
         "calendarId": calendar_id,
@@ -45,7 +47,7 @@ def list_events(
         params["timeMin"] = time_min.isoformat() + "Z" if time_min.tzinfo is None else time_min.isoformat()
     if time_max is not None:
         params["timeMax"] = time_max.isoformat() + "Z" if time_max.tzinfo is None else time_max.isoformat()
-    result = service.events().list(**params).execute()
+    result = execute(service.events().list(**params))
     return result.get("items", [])
 
 
@@ -75,7 +77,61 @@ def create_event(
         body["location"] = location
     if attendees:
         body["attendees"] = [{"email": e} for e in attendees]
-    return service.events().insert(calendarId=calendar_id, body=body).execute()
+    created = execute(service.events().insert(calendarId=calendar_id, body=body))
+    if calendar_mirror_enabled():
+        mirror = get_calendar_mirror(calendar_id)
+        if mirror.is_seeded():
+            mirror.apply(created)
+    return created
+
+
+def query_freebusy(time_min: datetime, time_max: datetime, calendar_ids: list[str]) -> dict[str, dict]:
+    """
+    Busy intervals for several calendars in one freebusy.query call.
+
+    Use cases: find_free_slots_tool checks the user's and the attendees' calendars together.
+    Returns {calendar id: {"busy": [(start, end)] (aware UTC datetimes), "error": reason or None}};
+    calendars Google cannot read (other domains, no sharing) come back with an error and no busy times.
+    """
+    service = get_calendar_service()
+    body = {
+        "timeMin": time_min.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "timeMax": time_max.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "timeZone": "UTC",
+        "items": [{"id": cid} for cid in dict.fromkeys(calendar_ids)],
+    }
+    result = execute(service.freebusy().query(body=body))
+    out = {}
+    for cid in dict.fromkeys(calendar_ids):
+        entry = (result.get("calendars") or {}).get(cid) or {}
+        errors = entry.get("errors") or []
+        busy = []
+        for period in entry.get("busy") or []:
+            try:
+                start = datetime.fromisoformat(period["start"].replace("Z", "+00:00"))
+                end = datetime.fromisoformat(period["end"].replace("Z", "+00:00"))
+            except (KeyError, ValueError):
+                continue
+            busy.append((start.astimezone(timezone.utc), end.astimezone(timezone.utc)))
+        out[cid] = {"busy": busy, "error": errors[0].get("reason", "unknown") if errors else None}
+    return out
+
+
+def _cal_preferences() -> str:
+    """cal_preferences of the current user when running inside a graph compiled with a store, else ""."""
+    try:
+        from langgraph.config import get_config, get_store
+
+        store = get_store()
+        config = get_config()
+    except Exception:
+        return ""
+    if store is None:
+        return ""
+    from email_assistant.memory import get_memory
+
+    user_id = (config.get("configurable") or {}).get("user_id", os.getenv("USER_ID", "default-user"))
+    return get_memory(store, user_id, "cal_preferences") or ""
 
 
 def _parse_date(s: str) -> datetime:
@@ -124,6 +180,58 @@ def check_calendar_tool(
     return "\n".join(lines)
 
 
+# freebusy.query accepts at most a few months per call; longer windows are cut here.
+MAX_FREE_SLOT_DAYS = 31
+
+
+@tool
+def find_free_slots_tool(
+    duration_minutes: int = 30,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    attendees: Optional[str] = None,
+    max_results: int = 5,
+) -> str:
+    """
+    Find free meeting times for me and the attendees within my working hours.
+    duration_minutes: meeting length. start_date / end_date: YYYY-MM-DD or ISO (default: now to 7 days ahead).
+    attendees: comma-separated email addresses. Use this before schedule_meeting_tool instead of
+    scanning check_calendar_tool output for gaps.
+    """
+    now = datetime.now(timezone.utc)
+    start = max(now, _parse_date(start_date).replace(tzinfo=timezone.utc)) if start_date else now
+    if end_date:
+        end = _parse_date(end_date).replace(tzinfo=timezone.utc)
+        if "T" not in end_date:
+            end += timedelta(days=1)  # A plain date includes that whole day.
+    else:
+        end = start + timedelta(days=7)
+    end = min(end, start + timedelta(days=MAX_FREE_SLOT_DAYS))
+    if end <= start:
+        return "The requested range is empty or in the past."
+    duration = timedelta(minutes=max(5, int(duration_minutes or 30)))
+    attendee_list = [a.strip() for a in (attendees or "").split(",") if a.strip()]
+    hours = working_hours(_cal_preferences())
+    try:
+        calendars = query_freebusy(start, end, ["primary"] + attendee_list)
+    except Exception as e:
+        return f"Failed to query free/busy: {e}"
+    busy = [interval for entry in calendars.values() for interval in entry["busy"]]
+    slots = find_free_slots(busy, start, end, duration, hours, max_results=max(1, min(int(max_results or 5), 20)))
+    tz_name = str(hours.tz)
+    lines = [
+        f"- {s.astimezone(hours.tz):%a %Y-%m-%d %H:%M}-{e.astimezone(hours.tz):%H:%M} {tz_name} "
+        f"(start_time {s.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%S}, end_time {e.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%S} UTC)"
+        for s, e in slots
+    ]
+    unavailable = [f"{cid} ({entry['error']})" for cid, entry in calendars.items() if entry["error"]]
+    if not lines:
+        lines = [f"No free {int(duration.total_seconds() // 60)}-minute slot in working hours between {start:%Y-%m-%d} and {end:%Y-%m-%d}."]
+    if unavailable:
+        lines.append("Busy times unavailable for: " + ", ".join(unavailable) + "; slots do not account for them.")
+    return "\n".join(lines)
+
+
 @tool
 def schedule_meeting_tool(
     summary: str,
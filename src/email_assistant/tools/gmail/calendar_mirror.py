@@ -0,0 +1,240 @@
+"""
+Local calendar mirror: events kept in memory and refreshed with Calendar incremental sync.
+
+Use cases: check_calendar_tool (via calendar.list_events) answers range questions from memory
+instead of calling events.list for every question; the agent often asks several times per tool
+loop. The mirror is seeded once with a full events.list (singleEvents, all pages) and then
+kept current with nextSyncToken incremental syncs, at most every CALENDAR_SYNC_INTERVAL
+seconds; a 410 Gone (token expired) triggers a full resync. Events are indexed by start time
+(a sorted list searched with bisect), so a range query only scans events that can overlap it.
+Events created through create_event are applied straight away.
+"""
+
+import bisect
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.api import execute
+from email_assistant.tools.gmail.auth import get_calendar_service
+
+# events.list page size (the API maximum).
+SYNC_PAGE_SIZE = 2500
+
+
+class SyncTokenExpired(RuntimeError):
+    """Raised when Calendar rejects the stored sync token (HTTP 410); a full sync is required."""
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """datetime -> POSIX seconds; naive datetimes are UTC (as in calendar.list_events)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def event_bounds(event: dict) -> Optional[tuple[float, float]]:
+    """
+    (start, end) of an event in POSIX seconds, or None when it has no usable times.
+
+    All-day events (start.date / end.date) are taken as midnight UTC boundaries.
+    """
+    bounds = []
+    for key in ("start", "end"):
+        value = event.get(key) or {}
+        raw = value.get("dateTime") or (value.get("date") + "T00:00:00+00:00" if value.get("date") else None)
+        if not raw:
+            return None
+        try:
+            dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        bounds.append(_timestamp(dt))
+    start, end = bounds
+    return start, max(start, end)
+
+
+class CalendarMirror:
+    """In-memory copy of one calendar: {event id: event} plus a start-sorted interval index."""
+
+    def __init__(
+        self,
+        calendar_id: str = "primary",
+        sync_interval: float = 60.0,
+        service_factory: Callable = get_calendar_service,
+    ):
+        self.calendar_id = calendar_id
+        self.sync_interval = float(sync_interval)
+        self._service_factory = service_factory
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._events: dict[str, dict] = {}
+        # Parallel lists sorted by (start, id): interval starts and the matching (end, id).
+        self._starts: list[tuple[float, str]] = []
+        self._ends: list[float] = []
+        self._max_duration = 0.0
+        self._sync_token: Optional[str] = None
+        self._synced_at = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    # ---- index -------------------------------------------------------------------------
+
+    def _unindex(self, event_id: str) -> None:
+        event = self._events.pop(event_id, None)
+        bounds = event_bounds(event) if event else None
+        if bounds is None:
+            return
+        i = bisect.bisect_left(self._starts, (bounds[0], event_id))
+        if i < len(self._starts) and self._starts[i] == (bounds[0], event_id):
+            del self._starts[i]
+            del self._ends[i]
+
+    def _upsert(self, event: dict) -> None:
+        event_id = event.get("id")
+        if not event_id:
+            return
+        self._unindex(event_id)
+        if event.get("status") == "cancelled":
+            return
+        self._events[event_id] = event
+        bounds = event_bounds(event)
+        if bounds is None:
+            return
+        start, end = bounds
+        i = bisect.bisect_left(self._starts, (start, event_id))
+        self._starts.insert(i, (start, event_id))
+        self._ends.insert(i, end)
+        self._max_duration = max(self._max_duration, end - start)
+
+    def apply(self, event: dict) -> None:
+        """Apply one created / updated / cancelled event (e.g. the result of events.insert)."""
+        with self._lock:
+            self._upsert(event)
+
+    def query(self, time_min: Optional[datetime] = None, time_max: Optional[datetime] = None, max_results: Optional[int] = None) -> list[dict]:
+        """
+        Events overlapping [time_min, time_max), ordered by start (as events.list with orderBy=startTime).
+
+        Only index entries starting after time_min - longest event duration are scanned.
+        """
+        lo, hi = _timestamp(time_min), _timestamp(time_max)
+        with self._lock:
+            first = 0 if lo is None else bisect.bisect_left(self._starts, (lo - self._max_duration, ""))
+            last = len(self._starts) if hi is None else bisect.bisect_left(self._starts, (hi, ""))
+            out = []
+            for i in range(first, last):
+                if lo is not None and self._ends[i] <= lo:
+                    continue
+                out.append(self._events[self._starts[i][1]])
+                if max_results is not None and len(out) >= max_results:
+                    break
+            return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    # ---- sync --------------------------------------------------------------------------
+
+    def _list_all(self, service, **params) -> tuple[list[dict], Optional[str]]:
+        """Every page of events.list; returns (items, nextSyncToken)."""
+        items: list[dict] = []
+        page_token = None
+        while True:
+            kwargs = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": SYNC_PAGE_SIZE, **params}
+            if page_token:
+                kwargs["pageToken"] = page_token
+            try:
+                result = execute(service.events().list(**kwargs))
+            except HttpError as e:
+                if getattr(e.resp, "status", None) == 410:
+                    raise SyncTokenExpired("Calendar sync token expired; full sync required") from e
+                raise
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items, result.get("nextSyncToken")
+
+    def full_sync(self) -> None:
+        """Replace the mirror with a full listing and store its nextSyncToken."""
+        items, token = self._list_all(self._service_factory())
+        with self._lock:
+            self._events.clear()
+            self._starts.clear()
+            self._ends.clear()
+            self._max_duration = 0.0
+            for event in items:
+                self._upsert(event)
+            self._sync_token = token
+            self._synced_at = time.monotonic()
+        self.full_syncs += 1
+
+    def sync(self, force: bool = False) -> None:
+        """
+        Bring the mirror up to date: full sync the first time, incremental (syncToken) afterwards.
+
+        Skipped when the last sync is younger than sync_interval (unless force). Single-flight:
+        concurrent callers wait for the running sync instead of starting another.
+        """
+        with self._sync_lock:
+            with self._lock:
+                token = self._sync_token
+                fresh = time.monotonic() - self._synced_at < self.sync_interval
+            if token is not None and fresh and not force:
+                return
+            if token is None:
+                self.full_sync()
+                return
+            try:
+                items, next_token = self._list_all(self._service_factory(), syncToken=token)
+            except SyncTokenExpired as e:
+                print(f"{e}. Running full calendar sync.")
+                self.full_sync()
+                return
+            with self._lock:
+                for event in items:
+                    self._upsert(event)
+                self._sync_token = next_token or token
+                self._synced_at = time.monotonic()
+            self.incremental_syncs += 1
+
+    def is_seeded(self) -> bool:
+        with self._lock:
+            return self._sync_token is not None
+
+
+def calendar_mirror_enabled() -> bool:
+    """CALENDAR_MIRROR (default on): answer calendar range queries from the local mirror."""
+    return os.getenv("CALENDAR_MIRROR", "1").strip().lower() in ("1", "true", "yes")
+
+
+_mirrors_lock = threading.Lock()
+_mirrors: dict[str, CalendarMirror] = {}
+
+
+def get_calendar_mirror(calendar_id: str = "primary") -> CalendarMirror:
+    """
+    Process-wide mirror per calendar id (synced on first query).
+
+    CALENDAR_SYNC_INTERVAL: seconds between incremental syncs triggered by queries (default 60).
+    """
+    with _mirrors_lock:
+        mirror = _mirrors.get(calendar_id)
+        if mirror is None:
+            mirror = _mirrors[calendar_id] = CalendarMirror(
+                calendar_id, sync_interval=float(os.getenv("CALENDAR_SYNC_INTERVAL", "60"))
+            )
+        return mirror
+
+
+def reset_calendar_mirrors() -> None:
+    """Drop all mirrors (e.g. after switching accounts); the next query seeds again."""
+    with _mirrors_lock:
+        _mirrors.clear()
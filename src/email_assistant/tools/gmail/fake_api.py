@@ -0,0 +1,864 @@
+"""
+In-process stand-in for the Gmail and Calendar APIs, plus a synthetic inbox traffic generator.
+
+Use cases: run the watcher, fetch / send / label helpers and calendar tools without a Google
+account, and benchmark ingestion offline (scripts/load_gmail.py). With GOOGLE_API_FAKE=1,
+auth.get_service() returns FakeGmailService / FakeCalendarService bound to one process-wide
+FakeGoogleBackend instead of a googleapiclient client. The fakes implement the calls this repo
+makes (messages list / get / modify / batchModify / send / attachments.get, history.list,
+labels, threads.get, getProfile, watch, events list / insert / delete with sync tokens, freebusy.query, HTTP batches) with the same
+request / execute() shape, methodId and HttpError responses, so api.execute() rate limiting
+and retries run unchanged. Latency, injected server errors and a per-second quota (429 with
+Retry-After when exceeded) are configurable.
+"""
+
+import base64
+import copy
+import email
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Callable, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.api import QUOTA_UNITS
+
+SYSTEM_LABEL_IDS = ("INBOX", "UNREAD", "STARRED", "IMPORTANT", "SENT", "DRAFT", "SPAM", "TRASH",
+                    "CATEGORY_PERSONAL", "CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_UPDATES", "CATEGORY_FORUMS")
+# Gmail keeps roughly a week of history; the fake keeps this many records, older cursors get 404.
+HISTORY_RETENTION = 20000
+HISTORY_TYPES = {
+    "messageAdded": "messagesAdded",
+    "messageDeleted": "messagesDeleted",
+    "labelAdded": "labelsAdded",
+    "labelRemoved": "labelsRemoved",
+}
+
+
+def fake_api_enabled() -> bool:
+    """GOOGLE_API_FAKE (default off): serve Gmail / Calendar from the in-process fake."""
+    return os.getenv("GOOGLE_API_FAKE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def http_error(status: int, reason: str, message: str = "", retry_after: Optional[float] = None) -> HttpError:
+    """HttpError shaped like a Google JSON error response (api.classify_error reads status, reason, Retry-After)."""
+    headers = {"status": str(status), "content-type": "application/json"}
+    if retry_after is not None:
+        headers["retry-after"] = str(retry_after)
+    content = json.dumps({
+        "error": {"code": status, "message": message or reason, "errors": [{"reason": reason, "message": message or reason}]}
+    }).encode("utf-8")
+    return HttpError(httplib2.Response(headers), content, uri="https://fake.googleapis.com")
+
+
+class _QuotaWindow:
+    """Units spent in the last second; over the limit the call is rejected (the server does not queue)."""
+
+    def __init__(self, limit: float):
+        self.limit = float(limit)
+        self._spent: deque[tuple[float, float]] = deque()
+        self._total = 0.0
+
+    def consume(self, units: float, now: float) -> bool:
+        if self.limit <= 0:
+            return True
+        while self._spent and now - self._spent[0][0] >= 1.0:
+            self._total -= self._spent.popleft()[1]
+        if self._total + units > self.limit:
+            return False
+        self._spent.append((now, units))
+        self._total += units
+        return True
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _rfc3339(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _event_bound(value: dict) -> Optional[float]:
+    value = value or {}
+    if value.get("dateTime"):
+        return _rfc3339(value["dateTime"])
+    if value.get("date"):
+        return _rfc3339(value["date"] + "T00:00:00Z")
+    return None
+
+
+class FakeGoogleBackend:
+    """
+    Mailbox and calendar state shared by all fake clients, with latency, errors and quota.
+
+    latency / latency_jitter: seconds added to every call (uniform +- jitter); error_rate: share
+    of calls (or batch parts) failing with error_status; gmail_units_per_second /
+    calendar_requests_per_second: server-side quota, 0 for unlimited.
+    """
+
+    def __init__(
+        self,
+        address: str = "me@example.com",
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        gmail_units_per_second: float = 0,
+        calendar_requests_per_second: float = 0,
+        seed: Optional[int] = None,
+    ):
+        self.address = address
+        self.latency = float(latency)
+        self.latency_jitter = float(latency_jitter)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._gmail_quota = _QuotaWindow(gmail_units_per_second)
+        self._calendar_quota = _QuotaWindow(calendar_requests_per_second)
+        self._next_id = 0x18f0000000000000
+        self._history_id = 1000
+        self.messages: dict[str, dict] = {}
+        self._threads: set[str] = set()
+        self._order: list[str] = []
+        self._attachments: dict[tuple[str, str], bytes] = {}
+        self._history: deque[dict] = deque(maxlen=HISTORY_RETENTION)
+        self._labels: dict[str, str] = {name: name for name in SYSTEM_LABEL_IDS}
+        self._events: dict[str, dict[str, dict]] = {}
+        # Calendar change sequence: events changed after a sync token's sequence are returned for it.
+        self._event_seq = 0
+        self._event_changed: dict[tuple[str, str], int] = {}
+        self._sync_token_floor = 0
+        self._external_busy: dict[str, list[tuple[str, str]]] = {}
+        self.delivered_at: dict[str, float] = {}
+        self.sent: list[dict] = []
+        self.stats = {"calls": 0, "errors_injected": 0, "throttled": 0, "not_found": 0}
+        self.calls_by_method: dict[str, int] = {}
+
+    # ---- call plumbing -------------------------------------------------------------------
+
+    def delay(self) -> None:
+        if self.latency <= 0 and self.latency_jitter <= 0:
+            return
+        time.sleep(max(0.0, self.latency + self._rng.uniform(-self.latency_jitter, self.latency_jitter)))
+
+    def admit(self, method: str) -> None:
+        """Count the call, then raise the injected error or quota 429 it draws (if any)."""
+        units = QUOTA_UNITS.get(method, 1)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.calls_by_method[method] = self.calls_by_method.get(method, 0) + 1
+            window = self._gmail_quota if method.startswith("gmail.") else self._calendar_quota
+            if not window.consume(units if method.startswith("gmail.") else 1, time.monotonic()):
+                self.stats["throttled"] += 1
+                raise http_error(429, "rateLimitExceeded", "User-rate limit exceeded.", retry_after=1)
+            if self.error_rate > 0 and self._rng.random() < self.error_rate:
+                self.stats["errors_injected"] += 1
+                raise http_error(self.error_status, "backendError", "Backend Error")
+
+    def _not_found(self, what: str) -> HttpError:
+        self.stats["not_found"] += 1
+        return http_error(404, "notFound", f"Requested entity was not found: {what}")
+
+    def _new_id(self) -> str:
+        self._next_id += self._rng.randint(1, 4096)
+        return f"{self._next_id:016x}"
+
+    def _record_history(self, kind: str, message: dict, label_ids: Optional[list[str]] = None) -> None:
+        self._history_id += 1
+        entry = {"id": str(self._history_id), "messages": [{"id": message["id"], "threadId": message["threadId"]}]}
+        ref = {"message": {"id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}}
+        if label_ids is not None:
+            ref["labelIds"] = list(label_ids)
+        entry[kind] = [ref]
+        self._history.append(entry)
+        message["historyId"] = str(self._history_id)
+
+    # ---- mailbox --------------------------------------------------------------------------
+
+    def deliver(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        to: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        headers: Optional[dict] = None,
+        label_ids: Optional[list[str]] = None,
+        attachments: Optional[list[tuple[str, str, bytes]]] = None,
+    ) -> dict:
+        """
+        Add a message to the inbox (INBOX, UNREAD plus label_ids) and record messageAdded history.
+
+        thread_id joins an existing thread; headers adds extra headers (e.g. References,
+        List-Unsubscribe); attachments is [(filename, mime_type, data)]. Returns the message.
+        """
+        with self._lock:
+            mid = self._new_id()
+            now = time.time()
+            all_headers = {
+                "From": sender,
+                "To": to or self.address,
+                "Subject": subject,
+                "Date": email.utils.formatdate(now),
+                "Message-ID": f"<{mid}@fake.mail>",
+                **(headers or {}),
+            }
+            text_part = {
+                "partId": "0",
+                "mimeType": "text/plain",
+                "filename": "",
+                "headers": [{"name": "Content-Type", "value": "text/plain; charset=UTF-8"}],
+                "body": {"size": len(body.encode("utf-8")), "data": _b64(body.encode("utf-8"))},
+            }
+            if attachments:
+                parts = [text_part]
+                for i, (filename, mime_type, data) in enumerate(attachments, start=1):
+                    attachment_id = f"ANGjd{mid}{i}"
+                    self._attachments[(mid, attachment_id)] = data
+                    parts.append({
+                        "partId": str(i),
+                        "mimeType": mime_type,
+                        "filename": filename,
+                        "headers": [{"name": "Content-Disposition", "value": f'attachment; filename="{filename}"'}],
+                        "body": {"size": len(data), "attachmentId": attachment_id},
+                    })
+                payload = {"partId": "", "mimeType": "multipart/mixed", "filename": "", "body": {"size": 0}, "parts": parts}
+            else:
+                payload = dict(text_part, partId="")
+            payload["headers"] = [{"name": k, "value": v} for k, v in all_headers.items()] + payload.get("headers", [])
+            message = {
+                "id": mid,
+                "threadId": thread_id if thread_id in self._threads else mid,
+                "labelIds": list(dict.fromkeys(["INBOX", "UNREAD", *(label_ids or [])])),
+                "snippet": " ".join(body.split())[:200],
+                "internalDate": str(int(now * 1000)),
+                "sizeEstimate": len(body) + sum(len(a[2]) for a in attachments or []) + 600,
+                "payload": payload,
+            }
+            self.messages[mid] = message
+            self._threads.add(message["threadId"])
+            self._order.append(mid)
+            self.delivered_at[mid] = now
+            self._record_history("messagesAdded", message)
+            return copy.deepcopy(message)
+
+    def _message(self, message_id: str) -> dict:
+        message = self.messages.get(str(message_id))
+        if message is None:
+            raise self._not_found(f"message {message_id}")
+        return message
+
+    def _label_id(self, name_or_id: str) -> str:
+        if name_or_id in self._labels.values():
+            return name_or_id
+        if name_or_id in self._labels:
+            return self._labels[name_or_id]
+        raise http_error(400, "invalidArgument", f"Invalid label: {name_or_id}")
+
+    def get_profile(self) -> dict:
+        with self._lock:
+            return {
+                "emailAddress": self.address,
+                "messagesTotal": len(self.messages),
+                "threadsTotal": len(self._threads),
+                "historyId": str(self._history_id),
+            }
+
+    def list_messages(self, labelIds=None, q=None, maxResults=100, pageToken=None, **_) -> dict:
+        """Newest first; q understands is:unread / is:read (other terms are ignored)."""
+        terms = (q or "").split()
+        with self._lock:
+            ids = []
+            for mid in reversed(self._order):
+                labels = self.messages[mid]["labelIds"]
+                if any(label not in labels for label in labelIds or []):
+                    continue
+                if "is:unread" in terms and "UNREAD" not in labels:
+                    continue
+                if "is:read" in terms and "UNREAD" in labels:
+                    continue
+                ids.append(mid)
+            start = int(pageToken or 0)
+            size = max(1, min(int(maxResults or 100), 500))
+            page = ids[start:start + size]
+            result = {
+                "messages": [{"id": mid, "threadId": self.messages[mid]["threadId"]} for mid in page],
+                "resultSizeEstimate": len(ids),
+            }
+            if start + size < len(ids):
+                result["nextPageToken"] = str(start + size)
+            if not page:
+                result.pop("messages")
+            return result
+
+    def get_message(self, id, format="full", metadataHeaders=None, **_) -> dict:
+        with self._lock:
+            message = copy.deepcopy(self._message(id))
+        if format == "minimal":
+            message.pop("payload", None)
+        elif format == "metadata":
+            wanted = {h.lower() for h in metadataHeaders or []}
+            headers = message["payload"].get("headers") or []
+            message["payload"] = {
+                "mimeType": message["payload"].get("mimeType"),
+                "headers": [h for h in headers if not wanted or h["name"].lower() in wanted],
+            }
+        elif format == "raw":
+            message["raw"] = _b64(self._to_rfc822(message))
+            message.pop("payload", None)
+        return message
+
+    def _to_rfc822(self, message: dict) -> bytes:
+        msg = EmailMessage()
+        payload = message["payload"]
+        for h in payload.get("headers") or []:
+            if h["name"].lower() != "content-type":
+                msg[h["name"]] = h["value"]
+        text = next((p for p in [payload, *(payload.get("parts") or [])] if p.get("mimeType") == "text/plain"), None)
+        data = ((text or {}).get("body") or {}).get("data") or ""
+        msg.set_content(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace"))
+        return msg.as_bytes()
+
+    def modify(self, id, body=None, **_) -> dict:
+        body = body or {}
+        with self._lock:
+            message = self._message(id)
+            add = [self._label_id(label) for label in body.get("addLabelIds") or []]
+            remove = [self._label_id(label) for label in body.get("removeLabelIds") or []]
+            added = [label for label in add if label not in message["labelIds"]]
+            removed = [label for label in remove if label in message["labelIds"]]
+            message["labelIds"] = [label for label in message["labelIds"] if label not in remove] + added
+            if added:
+                self._record_history("labelsAdded", message, added)
+            if removed:
+                self._record_history("labelsRemoved", message, removed)
+            return {"id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}
+
+    def batch_modify(self, body=None, **_) -> dict:
+        body = body or {}
+        ids = list(body.get("ids") or [])
+        if len(ids) > 1000:
+            raise http_error(400, "invalidArgument", "Too many ids (max 1000)")
+        with self._lock:
+            missing = [mid for mid in ids if mid not in self.messages]
+            if missing:
+                raise http_error(400, "invalidArgument", f"Invalid id value: {missing[0]}")
+            for mid in ids:
+                self.modify(mid, body)
+        return {}
+
+    def send(self, body=None, **_) -> dict:
+        """Parse the raw RFC 822 message; store it under SENT in its thread (new thread unless threadId given)."""
+        body = body or {}
+        raw = body.get("raw") or ""
+        parsed = email.message_from_bytes(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        with self._lock:
+            mid = self._new_id()
+            thread_id = body.get("threadId") if body.get("threadId") in self._threads else mid
+            text = parsed.get_payload(decode=True) if not parsed.is_multipart() else b""
+            message = {
+                "id": mid,
+                "threadId": thread_id,
+                "labelIds": ["SENT"],
+                "snippet": (text or b"").decode("utf-8", errors="replace")[:200],
+                "internalDate": str(int(time.time() * 1000)),
+                "sizeEstimate": len(raw),
+                "payload": {
+                    "partId": "",
+                    "mimeType": parsed.get_content_type(),
+                    "filename": "",
+                    "headers": [{"name": k, "value": str(v)} for k, v in parsed.items()],
+                    "body": {"size": len(text or b""), "data": _b64(text or b"")},
+                },
+            }
+            self.messages[mid] = message
+            self._threads.add(thread_id)
+            self._order.append(mid)
+            self._record_history("messagesAdded", message)
+            self.sent.append(copy.deepcopy(message))
+            return {"id": mid, "threadId": thread_id, "labelIds": ["SENT"]}
+
+    def get_attachment(self, messageId, id, **_) -> dict:
+        with self._lock:
+            self._message(messageId)
+            data = self._attachments.get((str(messageId), str(id)))
+        if data is None:
+            raise self._not_found(f"attachment {id}")
+        return {"attachmentId": id, "size": len(data), "data": _b64(data)}
+
+    def list_history(self, startHistoryId, historyTypes=None, labelId=None, maxResults=100, pageToken=None, **_) -> dict:
+        """Records after startHistoryId; 404 when the cursor is older than the retained history."""
+        start = int(startHistoryId)
+        with self._lock:
+            oldest = int(self._history[0]["id"]) if self._history else self._history_id + 1
+            if len(self._history) == self._history.maxlen and start < oldest - 1:
+                raise self._not_found(f"historyId {startHistoryId}")
+            records = []
+            for entry in self._history:
+                if int(entry["id"]) <= start:
+                    continue
+                wanted = [HISTORY_TYPES[t] for t in historyTypes or HISTORY_TYPES if t in HISTORY_TYPES]
+                kinds = [k for k in wanted if k in entry]
+                if not kinds:
+                    continue
+                if labelId and not any(labelId in ref["message"]["labelIds"] for k in kinds for ref in entry[k]):
+                    continue
+                records.append(copy.deepcopy(entry))
+            offset = int(pageToken or 0)
+            size = max(1, min(int(maxResults or 100), 500))
+            result = {"history": records[offset:offset + size], "historyId": str(self._history_id)}
+            if offset + size < len(records):
+                result["nextPageToken"] = str(offset + size)
+            return result
+
+    def list_labels(self, **_) -> dict:
+        with self._lock:
+            return {"labels": [
+                {"id": label_id, "name": name, "type": "system" if name == label_id else "user"}
+                for name, label_id in self._labels.items()
+            ]}
+
+    def create_label(self, body=None, **_) -> dict:
+        name = (body or {}).get("name") or ""
+        with self._lock:
+            if not name or name in self._labels:
+                raise http_error(409, "duplicate", f"Label name exists or conflicts: {name}")
+            label_id = f"Label_{len(self._labels) + 1}"
+            self._labels[name] = label_id
+            return {"id": label_id, "name": name, "type": "user"}
+
+    def get_thread(self, id, format="full", metadataHeaders=None, **_) -> dict:
+        with self._lock:
+            ids = [mid for mid in self._order if self.messages[mid]["threadId"] == id]
+            if not ids:
+                raise self._not_found(f"thread {id}")
+        messages = [self.get_message(mid, format=format, metadataHeaders=metadataHeaders) for mid in ids]
+        return {"id": id, "historyId": messages[-1].get("historyId"), "messages": messages}
+
+    def watch(self, body=None, **_) -> dict:
+        with self._lock:
+            return {"historyId": str(self._history_id), "expiration": str(int((time.time() + 7 * 86400) * 1000))}
+
+    # ---- calendar -------------------------------------------------------------------------
+
+    def insert_event(self, calendarId="primary", body=None, **_) -> dict:
+        body = dict(body or {})
+        with self._lock:
+            event_id = self._new_id()
+            now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            event = {
+                "kind": "calendar#event",
+                "id": event_id,
+                "status": "confirmed",
+                "htmlLink": f"https://calendar.fake/event?eid={event_id}",
+                "created": now,
+                "updated": now,
+                "organizer": {"email": self.address, "self": True},
+                **body,
+            }
+            self._events.setdefault(calendarId, {})[event_id] = event
+            self._touch_event(calendarId, event_id)
+            return copy.deepcopy(event)
+
+    def _touch_event(self, calendar_id: str, event_id: str) -> None:
+        self._event_seq += 1
+        self._event_changed[(calendar_id, event_id)] = self._event_seq
+
+    def delete_event(self, calendarId="primary", eventId=None, **_) -> str:
+        """Mark the event cancelled (incremental syncs then report it with status "cancelled")."""
+        with self._lock:
+            event = (self._events.get(calendarId) or {}).get(eventId)
+            if event is None or event.get("status") == "cancelled":
+                raise self._not_found(f"event {eventId}")
+            event["status"] = "cancelled"
+            event["updated"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            self._touch_event(calendarId, eventId)
+            return ""
+
+    def expire_sync_tokens(self) -> None:
+        """Make every sync token issued so far invalid (the next incremental sync gets 410 Gone)."""
+        with self._lock:
+            self._sync_token_floor = self._event_seq
+
+    def list_events(
+        self, calendarId="primary", timeMin=None, timeMax=None, maxResults=250, pageToken=None,
+        syncToken=None, showDeleted=False, **_,
+    ) -> dict:
+        """
+        Events overlapping [timeMin, timeMax), ordered by start; nextSyncToken on the last page.
+
+        With syncToken: every event changed since that token, cancelled ones included (410 when expired).
+        """
+        lo, hi = _rfc3339(timeMin), _rfc3339(timeMax)
+        with self._lock:
+            if syncToken is not None and int(syncToken) < self._sync_token_floor:
+                raise http_error(410, "fullSyncRequired", "Sync token is no longer valid, a full sync is required.")
+            events = []
+            for event_id, event in (self._events.get(calendarId) or {}).items():
+                if syncToken is not None:
+                    if self._event_changed.get((calendarId, event_id), 0) > int(syncToken):
+                        events.append((self._event_changed[(calendarId, event_id)], event))
+                    continue
+                start, end = _event_bound(event.get("start")), _event_bound(event.get("end"))
+                if start is None or end is None or (event.get("status") == "cancelled" and not showDeleted):
+                    continue
+                if (lo is not None and end <= lo) or (hi is not None and start >= hi):
+                    continue
+                events.append((start, event))
+            events.sort(key=lambda pair: pair[0])
+            offset = int(pageToken or 0)
+            size = max(1, min(int(maxResults or 250), 2500))
+            result = {"kind": "calendar#events", "items": [copy.deepcopy(e) for _, e in events[offset:offset + size]]}
+            if offset + size < len(events):
+                result["nextPageToken"] = str(offset + size)
+            else:
+                result["nextSyncToken"] = str(self._event_seq)
+            return result
+
+    def set_busy(self, calendar_id: str, intervals: list[tuple[str, str]]) -> None:
+        """Busy periods (RFC 3339 start, end) that freebusy.query reports for another user's calendar."""
+        with self._lock:
+            self._external_busy[calendar_id] = list(intervals)
+
+    def freebusy(self, body=None, **_) -> dict:
+        """freebusy.query: busy periods of the own calendar (primary / address) and of set_busy calendars."""
+        body = body or {}
+        lo, hi = _rfc3339(body.get("timeMin")), _rfc3339(body.get("timeMax"))
+        calendars = {}
+        with self._lock:
+            for item in body.get("items") or []:
+                cid = item.get("id")
+                if cid in ("primary", self.address):
+                    periods = []
+                    for event in (self._events.get("primary") or {}).values():
+                        start, end = _event_bound(event.get("start")), _event_bound(event.get("end"))
+                        if start is None or end is None or event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+                            continue
+                        periods.append((start, end))
+                elif cid in self._external_busy:
+                    periods = [(_rfc3339(a), _rfc3339(b)) for a, b in self._external_busy[cid]]
+                else:
+                    calendars[cid] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                    continue
+                iso = lambda t: datetime.fromtimestamp(t, timezone.utc).isoformat().replace("+00:00", "Z")
+                calendars[cid] = {"busy": [
+                    {"start": iso(max(a, lo)), "end": iso(min(b, hi))}
+                    for a, b in sorted(periods) if b > lo and a < hi
+                ]}
+        return {"kind": "calendar#freeBusy", "timeMin": body.get("timeMin"), "timeMax": body.get("timeMax"), "calendars": calendars}
+
+    def snapshot(self) -> dict:
+        """Counters for reports: calls, injected errors, 429s, 404s, mailbox size, sent count."""
+        with self._lock:
+            return {
+                **self.stats,
+                "messages": len(self.messages),
+                "sent": len(self.sent),
+                "history_id": self._history_id,
+                "calls_by_method": dict(sorted(self.calls_by_method.items())),
+            }
+
+
+class FakeRequest:
+    """One pending call: execute() applies latency, quota and error injection, then runs the handler."""
+
+    def __init__(self, backend: FakeGoogleBackend, method_id: str, handler: Callable, kwargs: dict):
+        self.backend = backend
+        self.methodId = method_id
+        self._handler = handler
+        self._kwargs = kwargs
+
+    def execute(self, http=None, num_retries: int = 0):
+        self.backend.delay()
+        self.backend.admit(self.methodId)
+        return self._handler(**self._kwargs)
+
+    def _run_in_batch(self):
+        self.backend.admit(self.methodId)
+        return self._handler(**self._kwargs)
+
+
+class FakeBatch:
+    """HTTP batch: one round trip of latency; each part is admitted (and may fail) on its own, as in Gmail."""
+
+    def __init__(self, backend: FakeGoogleBackend, callback: Optional[Callable] = None):
+        self.backend = backend
+        self._callback = callback
+        self._parts: list[tuple[str, FakeRequest, Optional[Callable]]] = []
+
+    def add(self, request: FakeRequest, callback: Optional[Callable] = None, request_id: Optional[str] = None) -> None:
+        if len(self._parts) >= 1000:
+            raise ValueError("Exceeded the maximum calls (1000) in a single batch request.")
+        self._parts.append((str(request_id if request_id is not None else len(self._parts) + 1), request, callback))
+
+    def execute(self, http=None):
+        self.backend.delay()
+        for request_id, request, callback in self._parts:
+            try:
+                response, exception = request._run_in_batch(), None
+            except HttpError as e:
+                response, exception = None, e
+            handler = callback or self._callback
+            if handler is not None:
+                handler(request_id, response, exception)
+
+
+class _Resource:
+    """Attribute bag mirroring googleapiclient's nested resource objects (users().messages().get(...))."""
+
+    def __init__(self, backend: FakeGoogleBackend, prefix: str, methods: dict, children: Optional[dict] = None):
+        self._backend = backend
+        self._prefix = prefix
+        self._methods = methods
+        self._children = children or {}
+
+    def __getattr__(self, name: str):
+        if name in self._children:
+            return lambda: self._children[name]
+        if name in self._methods:
+            handler = self._methods[name]
+            return lambda **kwargs: FakeRequest(self._backend, f"{self._prefix}.{name}", handler, kwargs)
+        raise AttributeError(f"{self._prefix} has no method {name}")
+
+
+class FakeGmailService:
+    """gmail v1 client over a FakeGoogleBackend."""
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self.backend = backend
+        b = backend
+        messages = _Resource(b, "gmail.users.messages", {
+            "list": lambda userId="me", **kw: b.list_messages(**kw),
+            "get": lambda userId="me", **kw: b.get_message(**kw),
+            "modify": lambda userId="me", **kw: b.modify(**kw),
+            "batchModify": lambda userId="me", **kw: b.batch_modify(**kw),
+            "send": lambda userId="me", **kw: b.send(**kw),
+        }, {"attachments": _Resource(b, "gmail.users.messages.attachments", {
+            "get": lambda userId="me", **kw: b.get_attachment(**kw),
+        })})
+        self._users = _Resource(b, "gmail.users", {
+            "getProfile": lambda userId="me": b.get_profile(),
+            "watch": lambda userId="me", **kw: b.watch(**kw),
+            "stop": lambda userId="me": {},
+        }, {
+            "messages": messages,
+            "history": _Resource(b, "gmail.users.history", {"list": lambda userId="me", **kw: b.list_history(**kw)}),
+            "labels": _Resource(b, "gmail.users.labels", {
+                "list": lambda userId="me": b.list_labels(),
+                "create": lambda userId="me", **kw: b.create_label(**kw),
+            }),
+            "threads": _Resource(b, "gmail.users.threads", {"get": lambda userId="me", **kw: b.get_thread(**kw)}),
+        })
+
+    def users(self):
+        return self._users
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> FakeBatch:
+        return FakeBatch(self.backend, callback)
+
+
+class FakeCalendarService:
+    """calendar v3 client over a FakeGoogleBackend."""
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self.backend = backend
+        self._events = _Resource(backend, "calendar.events", {
+            "list": backend.list_events,
+            "insert": backend.insert_event,
+            "delete": backend.delete_event,
+        })
+        self._freebusy = _Resource(backend, "calendar.freebusy", {"query": backend.freebusy})
+
+    def events(self):
+        return self._events
+
+    def freebusy(self):
+        return self._freebusy
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> FakeBatch:
+        return FakeBatch(self.backend, callback)
+
+
+# ---- synthetic traffic ----------------------------------------------------------------------
+
+_SENDERS = [
+    "Alice Chen <alice@partner.example>", "Bob Ortiz <bob@client.example>", "Priya Nair <priya@team.example>",
+    "Dan Wu <dan@vendor.example>", "Sara Kim <sara@team.example>",
+]
+_BULK_SENDERS = ["Deals <offers@shop.example>", "Weekly Digest <digest@news.example>", "noreply@service.example"]
+_REQUESTS = [
+    ("Quarterly report", "Hi,\n\nCould you send me the Q3 report by Friday?\n\nThanks"),
+    ("Meeting next week", "Are you free for a 30 minute call on Tuesday afternoon to go over the roadmap?"),
+    ("Invoice 4471", "Please find the invoice details below. Let me know if anything needs changing."),
+    ("Quick question", "Do we still plan to ship the beta this month, or has it slipped?"),
+    ("Contract review", "Legal left comments on the contract. Can you take a look before our sync?"),
+]
+_BULK = [
+    ("Your weekly digest", "Top stories this week. Unsubscribe at any time."),
+    ("48 hour sale", "Everything 30% off until Sunday. View in browser."),
+    ("Your receipt", "Thanks for your order. This is an automated message, do not reply."),
+]
+
+
+class InboxTrafficGenerator:
+    """
+    Deliver synthetic mail into a FakeGoogleBackend at `rate` messages per second (Poisson arrivals).
+
+    Mix: reply_ratio of messages continue a recent thread (Re: subject, In-Reply-To / References),
+    bulk_ratio are newsletters / receipts (List-Unsubscribe, CATEGORY_PROMOTIONS, caught by
+    pre-triage), attachment_ratio carry a small text attachment; the rest are direct requests.
+    """
+
+    def __init__(
+        self,
+        backend: FakeGoogleBackend,
+        rate: float,
+        reply_ratio: float = 0.3,
+        bulk_ratio: float = 0.25,
+        attachment_ratio: float = 0.1,
+        seed: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.rate = float(rate)
+        self.reply_ratio = reply_ratio
+        self.bulk_ratio = bulk_ratio
+        self.attachment_ratio = attachment_ratio
+        self.delivered = 0
+        self._rng = random.Random(seed)
+        self._threads: deque[dict] = deque(maxlen=200)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def deliver_one(self) -> dict:
+        """Deliver one synthetic message now and return it."""
+        rng = self._rng
+        roll = rng.random()
+        if roll < self.bulk_ratio:
+            sender = rng.choice(_BULK_SENDERS)
+            subject, body = rng.choice(_BULK)
+            message = self.backend.deliver(
+                sender, subject, body,
+                headers={"List-Unsubscribe": "<mailto:unsubscribe@news.example>", "Precedence": "bulk"},
+                label_ids=["CATEGORY_PROMOTIONS"],
+            )
+        elif roll < self.bulk_ratio + self.reply_ratio and self._threads:
+            prior = rng.choice(list(self._threads))
+            body = rng.choice(["Sounds good, thanks!", "One more thing: can we move it to 3pm?",
+                               "Following up on this, any update?", "Attached the notes from today."])
+            body += "\n\nOn Mon, someone wrote:\n> " + prior["body"].splitlines()[0]
+            message = self.backend.deliver(
+                prior["from"], "Re: " + prior["subject"].removeprefix("Re: "), body,
+                thread_id=prior["thread_id"],
+                headers={"In-Reply-To": prior["message_id"], "References": f"{prior['references']} {prior['message_id']}".strip()},
+            )
+            prior.update(message_id=f"<{message['id']}@fake.mail>", references=f"{prior['references']} {prior['message_id']}".strip(), body=body)
+        else:
+            sender = rng.choice(_SENDERS)
+            subject, body = rng.choice(_REQUESTS)
+            attachments = None
+            if rng.random() < self.attachment_ratio:
+                attachments = [("notes.txt", "text/plain", f"Notes for {subject}\n".encode("utf-8") * 20)]
+            message = self.backend.deliver(sender, subject, body, attachments=attachments)
+            self._threads.append({
+                "thread_id": message["threadId"], "from": sender, "subject": subject, "body": body,
+                "message_id": f"<{message['id']}@fake.mail>", "references": "",
+            })
+        self.delivered += 1
+        return message
+
+    def _run(self, duration: Optional[float]) -> None:
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            if self._stop.wait(self._rng.expovariate(self.rate)):
+                break
+            self.deliver_one()
+
+    def start(self, duration: Optional[float] = None) -> "InboxTrafficGenerator":
+        """Deliver in a background thread until stop() (or for duration seconds)."""
+        if self.rate > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(duration,), name="fake-inbox-traffic", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+_backend_lock = threading.Lock()
+_backend: Optional[FakeGoogleBackend] = None
+_generator: Optional[InboxTrafficGenerator] = None
+
+
+def get_fake_backend() -> FakeGoogleBackend:
+    """
+    Process-wide backend, configured from the environment on first use.
+
+    GOOGLE_API_FAKE_LATENCY_MS / GOOGLE_API_FAKE_JITTER_MS: per-call latency (default 0 / 0).
+    GOOGLE_API_FAKE_ERROR_RATE: share of calls failing with GOOGLE_API_FAKE_ERROR_STATUS (0 / 503).
+    GOOGLE_API_FAKE_GMAIL_QUOTA / GOOGLE_API_FAKE_CALENDAR_QUOTA: Gmail units / Calendar requests
+    per second before 429 (default 0 = unlimited).
+    GOOGLE_API_FAKE_INBOX_SEED: messages in the inbox at start (default 0).
+    GOOGLE_API_FAKE_INBOX_RATE: synthetic messages per second delivered in the background (default 0).
+    """
+    global _backend, _generator
+    with _backend_lock:
+        if _backend is None:
+            seed = os.getenv("GOOGLE_API_FAKE_SEED")
+            _backend = FakeGoogleBackend(
+                latency=float(os.getenv("GOOGLE_API_FAKE_LATENCY_MS", "0")) / 1000,
+                latency_jitter=float(os.getenv("GOOGLE_API_FAKE_JITTER_MS", "0")) / 1000,
+                error_rate=float(os.getenv("GOOGLE_API_FAKE_ERROR_RATE", "0")),
+                error_status=int(os.getenv("GOOGLE_API_FAKE_ERROR_STATUS", "503")),
+                gmail_units_per_second=float(os.getenv("GOOGLE_API_FAKE_GMAIL_QUOTA", "0")),
+                calendar_requests_per_second=float(os.getenv("GOOGLE_API_FAKE_CALENDAR_QUOTA", "0")),
+                seed=int(seed) if seed else None,
+            )
+            _generator = InboxTrafficGenerator(
+                _backend, float(os.getenv("GOOGLE_API_FAKE_INBOX_RATE", "0")), seed=int(seed) if seed else None
+            )
+            for _ in range(int(os.getenv("GOOGLE_API_FAKE_INBOX_SEED", "0"))):
+                _generator.deliver_one()
+            _generator.start()
+        return _backend
+
+
+def set_fake_backend(backend: Optional[FakeGoogleBackend]) -> None:
+    """Replace the process-wide backend (None: rebuild from the environment on next use)."""
+    global _backend, _generator
+    with _backend_lock:
+        if _generator is not None:
+            _generator.stop()
+        _backend, _generator = backend, None
+
+
+def fake_service(api: str, version: str):
+    """Fake client for (api, version) on the process-wide backend; used by auth.get_service."""
+    backend = get_fake_backend()
+    if api == "gmail":
+        return FakeGmailService(backend)
+    if api == "calendar":
+        return FakeCalendarService(backend)
+    raise ValueError(f"No fake for Google API {api} {version}")
@@ -6,12 +6,17 @@ so the graph can run triage and response. Used by the Gmail watcher script to fe
 real emails into the agent automatically.
 """
 
-import base64
-from typing import Optional
+import os
+import time
+from typing import Iterator, Optional
 
+from googleapiclient.errors import HttpError
 from langchain_core.tools import tool
 
+from email_assistant.tools.gmail.api import MISSING_MESSAGE_STATUSES, QUOTA_UNITS, backoff_delay, classify_error, execute
 from email_assistant.tools.gmail.auth import get_gmail_service
+from email_assistant.triage_rules import RULE_HEADERS
+from email_assistant.utils import MAX_BODY_CHARS, attachment_parts, extract_text_body
 
 
 def _header(msg: dict, name: str) -> str:
@@ -23,55 +28,220 @@ def _header(msg: dict, name: str) -> str:
     return ""
 
 
-def _decode_body(payload: dict) -> str:
-    """Extract plain text body from Gmail payload (single or multipart)."""
-    if not payload:
-        return ""
-    # Single-part: payload.body.data (base64url)
-    body = payload.get("body") or {}
-    data = body.get("data")
-    if data:
-        try:
-            return base64.urlsafe_b64decode(data.encode("ASCII")).decode("utf-8", errors="replace")
-        except Exception:
-            return ""
-    # Multipart: find first text/plain or text/html part
-    for part in payload.get("parts") or []:
-        mimetype = (part.get("mimeType") or "").lower()
-        if "text/plain" in mimetype or "text/html" in mimetype:
-            part_body = part.get("body") or {}
-            part_data = part_body.get("data")
-            if part_data:
-                try:
-                    return base64.urlsafe_b64decode(part_data.encode("ASCII")).decode("utf-8", errors="replace")
-                except Exception:
-                    pass
-    return ""
+def _message_to_email_input(msg: dict) -> dict:
+    """Convert a format=full Gmail message resource to email_input shape."""
+    payload = msg.get("payload") or {}
+    body = extract_text_body(payload, MAX_BODY_CHARS)
+    snippet = (msg.get("snippet") or "").strip()
+    return {
+        "from": _header(msg, "From"),
+        "to": _header(msg, "To"),
+        "subject": _header(msg, "Subject"),
+        "body": body or snippet[:MAX_BODY_CHARS],
+        "id": msg.get("id"),
+        "gmail_thread_id": msg.get("threadId"),
+        # Reply headers, so send_reply_email does not fetch the original again.
+        "message_id_header": _header(msg, "Message-ID"),
+        "references": _header(msg, "References"),
+        # Attachment metadata only; bodies are downloaded on demand (tools/gmail/attachments.py).
+        "attachments": attachment_parts(payload),
+        # Bulk / automation signals for the triage rules (triage_rules.py).
+        "headers": {name: _header(msg, name) for name in RULE_HEADERS if _header(msg, name)},
+        "label_ids": list(msg.get("labelIds") or []),
+    }
 
 
 def get_message_as_email_input(service, message_id: str) -> Optional[dict]:
     """
     Fetch a Gmail message by id and return it in email_input shape for the graph.
 
-    Returns dict with from, to, subject, body, id (and _source will be set by input_router).
-    Returns None if the message cannot be fetched.
+    Returns dict with from, to, subject, body, id, gmail_thread_id, message_id_header, references,
+    attachments, headers, label_ids (and _source will be set by input_router).
+    Returns None if the message does not exist (404) or the id is invalid (400); other API
+    errors (auth, quota after execute()'s retries, network) are raised.
     """
     try:
-        msg = service.users().messages().get(userId="me", id=message_id, format="full").execute()
-    except Exception:
-        return None
-    payload = msg.get("payload") or {}
-    body = _decode_body(payload)
-    snippet = (msg.get("snippet") or "").strip()
-    if not body and snippet:
-        body = snippet
+        msg = execute(service.users().messages().get(userId="me", id=message_id, format="full"))
+    except HttpError as e:
+        _, status, _ = classify_error(e)
+        if status in MISSING_MESSAGE_STATUSES:
+            return None
+        raise
+    return _message_to_email_input(msg)
+
+
+# Gmail accepts at most 100 calls per HTTP batch request.
+MAX_BATCH_SIZE = 100
+
+
+def _batch_get(
+    service,
+    message_ids: list[str],
+    convert,
+    batch_size: int = MAX_BATCH_SIZE,
+    **get_kwargs,
+) -> tuple[list[Optional[dict]], dict[str, str]]:
+    """
+    Run messages.get for every id with HTTP batch requests and convert each response.
+
+    Batches go through api.execute (rate limited, charged 5 quota units per message, retried as a
+    whole on throttling). Gmail can also throttle single parts of a batch (429 per message); those
+    ids are re-sent in a smaller batch after a backoff, up to GMAIL_API_MAX_RETRIES rounds.
+    Returns (items aligned with message_ids, None where the get failed; {message_id: error}).
+    """
+    batch_size = max(1, min(int(batch_size), MAX_BATCH_SIZE))
+    results: dict[str, dict] = {}
+    errors: dict[str, str] = {}
+    throttled: dict[str, Optional[float]] = {}
+
+    def on_response(request_id: str, response, exception) -> None:
+        if exception is not None:
+            errors[request_id] = str(exception)
+            is_throttled, _, retry_after = classify_error(exception)
+            if is_throttled:
+                throttled[request_id] = retry_after
+        elif not response:
+            errors[request_id] = "empty response"
+        else:
+            errors.pop(request_id, None)
+            results[request_id] = convert(response)
+
+    max_rounds = max(0, int(os.getenv("GMAIL_API_MAX_RETRIES", "5")))
+    unique_ids = list(dict.fromkeys(message_ids))
+    for start in range(0, len(unique_ids), batch_size):
+        chunk = unique_ids[start:start + batch_size]
+        for attempt in range(max_rounds + 1):
+            throttled.clear()
+            batch = service.new_batch_http_request(callback=on_response)
+            for mid in chunk:
+                batch.add(service.users().messages().get(userId="me", id=mid, **get_kwargs), request_id=mid)
+            try:
+                execute(batch, method="gmail.users.messages.get[batch]", units=QUOTA_UNITS["gmail.users.messages.get"] * len(chunk))
+            except Exception as e:
+                for mid in chunk:
+                    if mid not in results:
+                        errors.setdefault(mid, f"batch request failed: {e}")
+                break
+            if not throttled or attempt == max_rounds:
+                break
+            time.sleep(backoff_delay(attempt + 1, max((r or 0) for r in throttled.values()) or None))
+            chunk = list(throttled)
+    return [results.get(mid) for mid in message_ids], errors
+
+
+def get_messages_as_email_inputs(
+    service,
+    message_ids: list[str],
+    batch_size: int = MAX_BATCH_SIZE,
+) -> tuple[list[Optional[dict]], dict[str, str]]:
+    """
+    Fetch many Gmail messages with HTTP batch requests (up to 100 messages.get calls per round trip).
+
+    Use cases: watcher and fetch_recent_inbox drain many new ids at once instead of one
+    HTTPS round trip per message.
+    Returns (email_inputs, errors): email_inputs is aligned with message_ids (None where the
+    fetch failed); errors maps each failed message id to its error text.
+    """
+    return _batch_get(service, message_ids, _message_to_email_input, batch_size, format="full")
+
+
+# Headers pulled by the metadata (pre-triage) fetch; enough to spot bulk and automated mail.
+PRE_TRIAGE_HEADERS = ("From", "To", "Subject", "List-Unsubscribe", "Precedence", "Auto-Submitted")
+
+
+def _message_to_metadata(msg: dict) -> dict:
+    """Convert a format=metadata Gmail message resource to {id, gmail_thread_id, headers, snippet, label_ids}."""
+    headers = {name: _header(msg, name) for name in PRE_TRIAGE_HEADERS}
     return {
-        "from": _header(msg, "From"),
-        "to": _header(msg, "To"),
-        "subject": _header(msg, "Subject"),
-        "body": body[:8000] if body else snippet[:8000],
         "id": msg.get("id"),
+        "gmail_thread_id": msg.get("threadId"),
+        "headers": headers,
+        "snippet": (msg.get("snippet") or "").strip(),
+        "label_ids": list(msg.get("labelIds") or []),
+    }
+
+
+def get_messages_metadata(
+    service,
+    message_ids: list[str],
+    batch_size: int = MAX_BATCH_SIZE,
+) -> tuple[list[Optional[dict]], dict[str, str]]:
+    """
+    Batch-fetch headers and snippet only (format=metadata, PRE_TRIAGE_HEADERS) for many messages.
+
+    Use cases: first phase of the watcher's two-phase fetch; ingest/pretriage.py decides from
+    this which messages are worth a format=full get. Same return shape as get_messages_as_email_inputs.
+    """
+    return _batch_get(
+        service, message_ids, _message_to_metadata, batch_size,
+        format="metadata", metadataHeaders=list(PRE_TRIAGE_HEADERS),
+    )
+
+
+# Gmail caps messages.list at 500 ids per page.
+MAX_LIST_PAGE_SIZE = 500
+
+
+def _inbox_query(unread_only: bool, query: Optional[str]) -> Optional[str]:
+    q = "is:unread" if unread_only else None
+    if query:
+        q = f"{q} {query}".strip() if q else query
+    return q
+
+
+def list_inbox_message_page(
+    service,
+    page_size: int = MAX_LIST_PAGE_SIZE,
+    unread_only: bool = False,
+    query: Optional[str] = None,
+    page_token: Optional[str] = None,
+) -> tuple[list[str], Optional[str]]:
+    """
+    List one page of INBOX message ids (newest first).
+
+    Returns (ids, next_page_token); next_page_token is None on the last page.
+    """
+    kwargs = {
+        "userId": "me",
+        "labelIds": ["INBOX"],
+        "maxResults": max(1, min(int(page_size), MAX_LIST_PAGE_SIZE)),
+        "q": _inbox_query(unread_only, query),
     }
+    if page_token:
+        kwargs["pageToken"] = page_token
+    try:
+        result = execute(service.users().messages().list(**kwargs))
+    except Exception as e:
+        raise RuntimeError(f"Gmail API list failed: {e}") from e
+    return [m["id"] for m in result.get("messages", [])], result.get("nextPageToken") or None
+
+
+def iter_inbox_message_ids(
+    service,
+    max_results: Optional[int] = None,
+    unread_only: bool = False,
+    query: Optional[str] = None,
+    page_size: int = MAX_LIST_PAGE_SIZE,
+) -> Iterator[str]:
+    """
+    Stream INBOX message ids (newest first), following nextPageToken until max_results or the end.
+
+    Use cases: see more than one page of the inbox without holding every id in memory;
+    pages are requested lazily as the caller consumes ids.
+    """
+    remaining = None if max_results is None else max(0, int(max_results))
+    page_token = None
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        ids, page_token = list_inbox_message_page(
+            service, page_size=size, unread_only=unread_only, query=query, page_token=page_token
+        )
+        if remaining is not None:
+            ids = ids[:remaining]
+            remaining -= len(ids)
+        yield from ids
+        if not page_token or not ids:
+            return
 
 
 def list_inbox_message_ids(
@@ -81,24 +251,100 @@ def list_inbox_message_ids(
     query: Optional[str] = None,
 ) -> list[str]:
     """
-    List message ids from the user's INBOX.
+    List up to max_results message ids from the user's INBOX (newest first, across pages).
 
     Use cases: watcher uses this to find new emails to process.
     """
-    label_ids = ["INBOX"]
-    q = "is:unread" if unread_only else None
-    if query:
-        q = f"{q} {query}".strip() if q else query
+    return list(iter_inbox_message_ids(service, max_results=max_results, unread_only=unread_only, query=query))
+
+
+class HistoryCursorExpired(RuntimeError):
+    """Raised when a stored historyId is too old for users.history.list (HTTP 404); caller must do a full resync."""
+
+
+def get_history_id(service) -> str:
+    """
+    Return the mailbox's current historyId (users.getProfile).
+
+    Use cases: seed or reset the watcher's incremental sync cursor. Take it *before* a
+    full list so that messages arriving during the list are picked up by the next history sync.
+    """
     try:
-        result = service.users().messages().list(
-            userId="me",
-            labelIds=label_ids,
-            maxResults=max_results,
-            q=q,
-        ).execute()
+        profile = execute(service.users().getProfile(userId="me"))
     except Exception as e:
-        raise RuntimeError(f"Gmail API list failed: {e}") from e
-    return [m["id"] for m in result.get("messages", [])]
+        raise RuntimeError(f"Gmail API getProfile failed: {e}") from e
+    return str(profile.get("historyId", ""))
+
+
+def list_history_message_ids(
+    service,
+    start_history_id: str,
+    unread_only: bool = False,
+    label_id: str = "INBOX",
+) -> tuple[list[str], str]:
+    """
+    List ids of messages added to label_id since start_history_id (users.history.list).
+
+    Use cases: watcher incremental sync; only messages added since the last cursor are
+    returned, across all result pages, oldest first and without duplicates.
+    Returns (message_ids, new_history_id). Raises HistoryCursorExpired when Gmail no
+    longer has history for start_history_id.
+    """
+    ids: list[str] = []
+    seen: set[str] = set()
+    new_history_id = str(start_history_id)
+    page_token = None
+    while True:
+        params = {
+            "userId": "me",
+            "startHistoryId": start_history_id,
+            "historyTypes": ["messageAdded"],
+            "labelId": label_id,
+        }
+        if page_token:
+            params["pageToken"] = page_token
+        try:
+            result = execute(service.users().history().list(**params))
+        except HttpError as e:
+            if getattr(e.resp, "status", None) == 404:
+                raise HistoryCursorExpired(f"historyId {start_history_id} expired; full resync required") from e
+            raise RuntimeError(f"Gmail API history list failed: {e}") from e
+        except Exception as e:
+            raise RuntimeError(f"Gmail API history list failed: {e}") from e
+        for record in result.get("history", []):
+            for added in record.get("messagesAdded", []):
+                msg = added.get("message") or {}
+                mid = msg.get("id")
+                if not mid or mid in seen:
+                    continue
+                label_ids = msg.get("labelIds") or []
+                if label_id and label_id not in label_ids:
+                    continue
+                if unread_only and "UNREAD" not in label_ids:
+                    continue
+                seen.add(mid)
+                ids.append(mid)
+        if result.get("historyId"):
+            new_history_id = str(result["historyId"])
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+    return ids, new_history_id
+
+
+def watch_mailbox(service, topic_name: str, label_ids: Optional[list[str]] = None) -> dict:
+    """
+    Register a Gmail push watch (users.watch) publishing INBOX changes to a Cloud Pub/Sub topic.
+
+    Use cases: watcher with GMAIL_PUSH_TOPIC; the topic's push subscription targets the
+    watcher's PushReceiver. Returns {"historyId", "expiration" (ms since epoch)}; Gmail
+    expires watches after 7 days, so callers renew before expiration.
+    """
+    body = {"topicName": topic_name, "labelIds": label_ids or ["INBOX"], "labelFilterBehavior": "include"}
+    try:
+        return execute(service.users().watch(userId="me", body=body))
+    except Exception as e:
+        raise RuntimeError(f"Gmail API watch failed: {e}") from e
 
 
 def fetch_recent_inbox(
@@ -114,12 +360,8 @@ def fetch_recent_inbox(
     if service is None:
         service = get_gmail_service()
     ids = list_inbox_message_ids(service, max_results=max_results, unread_only=unread_only)
-    out = []
-    for mid in ids:
-        email_input = get_message_as_email_input(service, mid)
-        if email_input:
-            out.append(email_input)
-    return out
+    email_inputs, _errors = get_messages_as_email_inputs(service, ids)
+    return [e for e in email_inputs if e]
 
 
 def _fetch_emails_impl(max_results: int = 10, unread_only: bool = False) -> str:
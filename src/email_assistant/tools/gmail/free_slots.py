@@ -0,0 +1,202 @@
+"""
+Free-slot search: merge busy intervals with a sweep line and cut working-hour gaps into meeting slots.
+
+Use cases: find_free_slots_tool (tools/gmail/calendar.py) turns one freebusy.query over the
+user's and attendees' calendars into a short list of candidate meeting times, so the agent
+does not page through check_calendar_tool output looking for gaps. Working hours (days, start /
+end time, time zone) are read from the user's cal_preferences text, falling back to
+CALENDAR_WORK_DAYS / CALENDAR_WORK_START / CALENDAR_WORK_END / CALENDAR_TIMEZONE.
+"""
+
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# "9:00-17:30", "09:00 to 17:00", "9am - 5pm", "9.30am–6pm".
+_HOURS = re.compile(
+    r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?\s*(?:-|–|—|to|until)\s*(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?\b",
+    re.IGNORECASE,
+)
+_DAY_RANGE = re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)[a-z]*\s*(?:-|–|—|to|through)\s*(mon|tue|wed|thu|fri|sat|sun)[a-z]*\b", re.IGNORECASE)
+_DAY = re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)(?:day|s|\.)?\b", re.IGNORECASE)
+_TZ = re.compile(r"\b((?:Africa|America|Antarctica|Asia|Atlantic|Australia|Europe|Indian|Pacific)/[A-Za-z_]+(?:/[A-Za-z_]+)?|UTC|GMT)\b")
+
+
+class WorkingHours(NamedTuple):
+    days: frozenset  # weekday numbers, Monday = 0
+    start: time
+    end: time
+    tz: ZoneInfo
+
+
+def _clock(hour: str, minute: Optional[str], meridiem: Optional[str]) -> Optional[time]:
+    h, m = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12 + (12 if meridiem.lower() == "pm" else 0)
+    if h == 24 and m == 0:
+        return time(23, 59)
+    if not (0 <= h <= 23 and 0 <= m <= 59):
+        return None
+    return time(h, m)
+
+
+def _env_clock(name: str, default: time) -> time:
+    """HH:MM from the environment, or default when unset or invalid."""
+    hour, _, minute = os.getenv(name, "").strip().partition(":")
+    if not hour.isdigit() or (minute and not minute.isdigit()):
+        return default
+    return _clock(hour, minute or None, None) or default
+
+
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo("UTC" if name.upper() == "GMT" else name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def _parse_days(text: str) -> Optional[frozenset]:
+    lowered = text.lower()
+    if "weekday" in lowered:
+        return frozenset(range(5))
+    match = _DAY_RANGE.search(text)
+    if match:
+        a, b = DAY_NAMES.index(match.group(1).lower()), DAY_NAMES.index(match.group(2).lower())
+        return frozenset((a + i) % 7 for i in range((b - a) % 7 + 1))
+    days = {DAY_NAMES.index(m.group(1).lower()) for m in _DAY.finditer(text)}
+    return frozenset(days) if days else None
+
+
+def working_hours(cal_preferences: str = "") -> WorkingHours:
+    """
+    Working hours from cal_preferences text, else the environment defaults.
+
+    Understands e.g. "Working hours: Mon-Fri 9:00-17:30, Europe/Berlin" or "weekdays 9am to 5pm".
+    Only the first hour range in the text is used. CALENDAR_WORK_DAYS (default mon-fri),
+    CALENDAR_WORK_START / CALENDAR_WORK_END (default 09:00 / 17:00), CALENDAR_TIMEZONE (default UTC).
+    """
+    text = cal_preferences or ""
+    start, end = _env_clock("CALENDAR_WORK_START", time(9)), _env_clock("CALENDAR_WORK_END", time(17))
+    # Prefer a range on a line about hours / availability over any "2 to 3" elsewhere in the text.
+    lines = [line for line in text.splitlines() if re.search(r"hour|work|availab|office", line, re.IGNORECASE)]
+    match = next((m for m in (_HOURS.search(line) for line in lines) if m), None) or _HOURS.search(text)
+    if match:
+        end_mer = match.group(6)
+        parsed_end = _clock(match.group(4), match.group(5), end_mer)
+        # "1-5pm": a missing start meridiem takes the end's when that keeps start before end.
+        options = [match.group(3)] if match.group(3) else [end_mer, None]
+        for meridiem in options:
+            parsed_start = _clock(match.group(1), match.group(2), meridiem)
+            if parsed_start and parsed_end and parsed_start < parsed_end:
+                start, end = parsed_start, parsed_end
+                break
+    days = _parse_days(text) or _parse_days(os.getenv("CALENDAR_WORK_DAYS", "mon-fri")) or frozenset(range(5))
+    tz_match = _TZ.search(text)
+    tz = _zone(tz_match.group(1) if tz_match else os.getenv("CALENDAR_TIMEZONE", "UTC"))
+    return WorkingHours(days, start, end, tz)
+
+
+def merge_busy(intervals: Iterable[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """
+    Union of busy intervals via a sweep line over start (+1) / end (-1) events.
+
+    Touching intervals (one ends when the next starts) are merged; empty ones are dropped.
+    """
+    points = []
+    for start, end in intervals:
+        if end > start:
+            # At equal times process starts before ends, so touching intervals stay merged.
+            points.append((start, 0))
+            points.append((end, 1))
+    points.sort()
+    merged: list[tuple[datetime, datetime]] = []
+    depth = 0
+    opened: Optional[datetime] = None
+    for at, kind in points:
+        if kind == 0:
+            if depth == 0:
+                opened = at
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                merged.append((opened, at))
+    return merged
+
+
+def _working_windows(window_start: datetime, window_end: datetime, hours: WorkingHours) -> list[tuple[datetime, datetime]]:
+    """Working-hour spans (UTC) inside [window_start, window_end)."""
+    out = []
+    day: date = window_start.astimezone(hours.tz).date()
+    last: date = window_end.astimezone(hours.tz).date()
+    while day <= last:
+        if day.weekday() in hours.days:
+            start = datetime.combine(day, hours.start, tzinfo=hours.tz).astimezone(timezone.utc)
+            end = datetime.combine(day, hours.end, tzinfo=hours.tz).astimezone(timezone.utc)
+            start, end = max(start, window_start), min(end, window_end)
+            if end > start:
+                out.append((start, end))
+        day += timedelta(days=1)
+    return out
+
+
+def _align(at: datetime, step: timedelta) -> datetime:
+    """Round at up to the next multiple of step (from the hour)."""
+    base = at.replace(minute=0, second=0, microsecond=0)
+    steps = -(-(at - base) // step)
+    return base + steps * step
+
+
+def find_free_slots(
+    busy: Iterable[tuple[datetime, datetime]],
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta,
+    hours: WorkingHours,
+    max_results: int = 5,
+    granularity: timedelta = timedelta(minutes=15),
+) -> list[tuple[datetime, datetime]]:
+    """
+    Up to max_results (start, end) slots of length duration, inside working hours and outside busy.
+
+    All datetimes are timezone-aware. Slots start on granularity boundaries. The earliest slot of
+    each free gap is taken first (so the suggestions spread over the days); remaining places are
+    filled with later starts, and the result is returned in time order.
+    """
+    merged = merge_busy(busy)
+    gaps: list[tuple[datetime, datetime]] = []
+    i = 0
+    # Both lists are sorted and disjoint, so one forward pass over merged covers every window.
+    for work_start, work_end in _working_windows(window_start, window_end, hours):
+        while i < len(merged) and merged[i][1] <= work_start:
+            i += 1
+        cursor, j = work_start, i
+        while j < len(merged) and merged[j][0] < work_end:
+            if merged[j][0] > cursor:
+                gaps.append((cursor, merged[j][0]))
+            cursor = max(cursor, merged[j][1])
+            j += 1
+        if work_end > cursor:
+            gaps.append((cursor, work_end))
+    candidates: list[list[datetime]] = []
+    for gap_start, gap_end in gaps:
+        starts, at = [], _align(gap_start, granularity)
+        while at + duration <= gap_end:
+            starts.append(at)
+            at += max(duration, granularity)
+        if starts:
+            candidates.append(starts)
+    picked: list[datetime] = []
+    depth = 0
+    while len(picked) < max_results and any(depth < len(starts) for starts in candidates):
+        for starts in candidates:
+            if depth < len(starts) and len(picked) < max_results:
+                picked.append(starts[depth])
+        depth += 1
+    return [(start, start + duration) for start in sorted(picked)]
@@ -0,0 +1,247 @@
+"""
+Batched Gmail label mutations: mark-as-read and assistant/* triage labels via users.messages.batchModify.
+
+Use cases: mark_as_read_node and triage enqueue label changes here instead of calling
+messages.modify per email. LabelMutationBuffer merges pending changes per message (a later
+add cancels an earlier remove of the same label and vice versa), groups messages that need
+the same change and flushes each group with batchModify (up to 1000 ids per call) when
+max_batch messages are pending or every flush_interval seconds. Label changes are set
+operations, so retrying a failed flush is idempotent; an invalid id only fails its own
+message (the batch is split until the bad id is isolated).
+"""
+
+import atexit
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.api import execute
+from email_assistant.tools.gmail.auth import get_gmail_service
+
+# Gmail accepts at most 1000 ids per users.messages.batchModify call.
+MAX_BATCH_MODIFY = 1000
+TRIAGE_LABELS = {
+    "ignore": "assistant/ignore",
+    "notify": "assistant/notify",
+    "respond": "assistant/respond",
+}
+# System labels are addressed by id; user labels (assistant/*) are resolved by name.
+SYSTEM_LABELS = frozenset({"INBOX", "UNREAD", "STARRED", "IMPORTANT", "SPAM", "TRASH", "SENT", "DRAFT"})
+
+
+class LabelMutationBuffer:
+    """Thread-safe buffer of pending label changes with a background size / time flusher."""
+
+    def __init__(
+        self,
+        max_batch: int = MAX_BATCH_MODIFY,
+        flush_interval: float = 5.0,
+        max_attempts: int = 5,
+        service_factory: Callable = get_gmail_service,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+    ):
+        self.max_batch = max(1, min(int(max_batch), MAX_BATCH_MODIFY))
+        self.flush_interval = float(flush_interval)
+        self.max_attempts = max(1, int(max_attempts))
+        self._service_factory = service_factory
+        self._on_error = on_error or (lambda what, e: print(f"Gmail label update failed ({what}): {e}"))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        # message_id -> [labels to add, labels to remove, failed attempts]
+        self._pending: dict[str, list] = {}
+        self._label_ids: dict[str, str] = {}
+        self._labels_listed_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.calls = 0
+
+    def add(
+        self,
+        message_ids: str | Iterable[str],
+        add_labels: Iterable[str] = (),
+        remove_labels: Iterable[str] = (),
+    ) -> None:
+        """Queue label changes (label names or system label ids) for one or many messages; never blocks on Gmail."""
+        ids = [message_ids] if isinstance(message_ids, str) else list(message_ids)
+        add_set, remove_set = set(add_labels), set(remove_labels)
+        with self._lock:
+            for mid in ids:
+                if not mid:
+                    continue
+                entry = self._pending.setdefault(str(mid), [set(), set(), 0])
+                entry[0] = (entry[0] - remove_set) | add_set
+                entry[1] = (entry[1] - add_set) | remove_set
+            size = len(self._pending)
+            self._ensure_thread()
+        if size >= self.max_batch:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="gmail-label-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self._on_error("flush", e)
+
+    def flush(self) -> int:
+        """Send every pending change now (blocking). Returns the number of messages updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            groups: dict[tuple[frozenset, frozenset], list[str]] = {}
+            for mid, (add, remove, _) in batch.items():
+                if add or remove:
+                    groups.setdefault((frozenset(add), frozenset(remove)), []).append(mid)
+            try:
+                service = self._service_factory()
+            except Exception as e:
+                self._requeue(batch, [mid for ids in groups.values() for mid in ids], e)
+                return 0
+            done = 0
+            for (add, remove), ids in groups.items():
+                try:
+                    body = {
+                        "addLabelIds": self._resolve(service, add, create=True),
+                        "removeLabelIds": self._resolve(service, remove, create=False),
+                    }
+                except Exception as e:
+                    self._requeue(batch, ids, e)
+                    continue
+                for start in range(0, len(ids), self.max_batch):
+                    chunk = ids[start:start + self.max_batch]
+                    if body["addLabelIds"] or body["removeLabelIds"]:
+                        done += self._modify(service, chunk, body, batch)
+            self.flushed += done
+            return done
+
+    def _modify(self, service, ids: list[str], body: dict, batch: dict) -> int:
+        """batchModify ids; on a client error split the ids to isolate invalid ones, else requeue."""
+        try:
+            self.calls += 1
+            execute(service.users().messages().batchModify(userId="me", body={"ids": ids, **body}))
+            return len(ids)
+        except HttpError as e:
+            status = getattr(e.resp, "status", None)
+            if status in (400, 404):
+                if len(ids) == 1:
+                    self._on_error(f"message {ids[0]}", e)  # Invalid / deleted message: drop it.
+                    return 0
+                mid = len(ids) // 2
+                return self._modify(service, ids[:mid], body, batch) + self._modify(service, ids[mid:], body, batch)
+            self._requeue(batch, ids, e)
+            return 0
+        except Exception as e:
+            self._requeue(batch, ids, e)
+            return 0
+
+    def _requeue(self, batch: dict, ids: list[str], error: Exception) -> None:
+        """Put failed changes back under any newer ones for the same message; drop after max_attempts."""
+        dropped = 0
+        with self._lock:
+            for mid in ids:
+                add, remove, attempts = batch[mid]
+                if attempts + 1 >= self.max_attempts:
+                    dropped += 1
+                    continue
+                newer = self._pending.get(mid)
+                if newer is None:
+                    self._pending[mid] = [set(add), set(remove), attempts + 1]
+                else:
+                    newer[0] = newer[0] | (add - newer[1])
+                    newer[1] = newer[1] | (remove - newer[0])
+                    newer[2] = max(newer[2], attempts + 1)
+        self._on_error(f"{len(ids)} message(s), {dropped} dropped after {self.max_attempts} attempts", error)
+
+    def _resolve(self, service, names: Iterable[str], create: bool) -> list[str]:
+        """
+        Map label names to Gmail label ids (cached per buffer).
+
+        Missing user labels are created when adding (create=True) and skipped when removing.
+        """
+        out = []
+        for name in sorted(names):
+            if name in SYSTEM_LABELS or name.startswith(("Label_", "CATEGORY_")):
+                out.append(name)
+                continue
+            if name not in self._label_ids and time.monotonic() - self._labels_listed_at > 60:
+                self._refresh_label_ids(service)
+            if name not in self._label_ids:
+                if not create:
+                    continue
+                created = execute(service.users().labels().create(
+                    userId="me",
+                    body={"name": name, "labelListVisibility": "labelShow", "messageListVisibility": "show"},
+                ))
+                self._label_ids[name] = created["id"]
+            out.append(self._label_ids[name])
+        return out
+
+    def _refresh_label_ids(self, service) -> None:
+        labels = execute(service.users().labels().list(userId="me")).get("labels", [])
+        self._labels_listed_at = time.monotonic()
+        self._label_ids.update({label["name"]: label["id"] for label in labels if label.get("name")})
+
+    def close(self) -> None:
+        """Flush what is pending and stop the background flusher."""
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            self._on_error("final flush", e)
+
+
+_buffer_lock = threading.Lock()
+_buffer: Optional[LabelMutationBuffer] = None
+
+
+def get_label_buffer() -> LabelMutationBuffer:
+    """
+    Process-wide LabelMutationBuffer (flushed at exit).
+
+    GMAIL_LABEL_FLUSH_INTERVAL: seconds between time-triggered flushes (default 5).
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LabelMutationBuffer(flush_interval=float(os.getenv("GMAIL_LABEL_FLUSH_INTERVAL", "5")))
+            atexit.register(_buffer.close)
+        return _buffer
+
+
+def triage_labels_enabled() -> bool:
+    """GMAIL_TRIAGE_LABELS (default on): write assistant/<decision> labels for Gmail emails."""
+    return os.getenv("GMAIL_TRIAGE_LABELS", "1").strip().lower() in ("1", "true", "yes")
+
+
+def enqueue_triage_label(message_id: str, decision: str) -> None:
+    """Queue assistant/<decision> on message_id and remove the other assistant/* labels (no-op when disabled)."""
+    label = TRIAGE_LABELS.get((decision or "").strip().lower())
+    if not message_id or label is None or not triage_labels_enabled():
+        return
+    others = [name for name in TRIAGE_LABELS.values() if name != label]
+    get_label_buffer().add(message_id, add_labels=[label], remove_labels=others)
+
+
+def enqueue_mark_as_read(message_id: str) -> None:
+    """Queue removal of UNREAD for message_id."""
+    if message_id and str(message_id).strip():
+        get_label_buffer().add(str(message_id), remove_labels=["UNREAD"])
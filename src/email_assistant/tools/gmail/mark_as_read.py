@@ -1,25 +1,23 @@
 """
-mark_as_read: Gmail API call to mark a message as read by id.
+mark_as_read: queue a Gmail message to be marked read by id.
 
 Use cases: called from mark_as_read node after response_agent finishes for email mode.
+The UNREAD removal goes through the Gmail label buffer (tools/gmail/labels.py), which
+merges it with other label changes and sends them with users.messages.batchModify.
 Requires gmail.modify scope.
 """
 
-from email_assistant.tools.gmail.auth import get_gmail_service
+from email_assistant.tools.gmail.labels import enqueue_mark_as_read
 
 
 def mark_as_read(email_id: str) -> str:
     """
-    Mark the Gmail message with the given id as read (remove UNREAD label).
+    Queue the Gmail message with the given id to be marked read (remove UNREAD label).
 
     Use cases: after the agent has replied to an email, mark the original as read.
+    Returns at once; the label buffer flushes the change in the background.
     """
     if not email_id or not email_id.strip():
         return "No email_id provided; nothing to mark as read."
-    service = get_gmail_service()
-    service.users().messages().modify(
-        userId="me",
-        id=email_id,
-        body={"removeLabelIds": ["UNREAD"]},
-    ).execute()
-    return f"Message {email_id} marked as read."
+    enqueue_mark_as_read(email_id.strip())
+    return f"Message {email_id} queued to be marked as read."
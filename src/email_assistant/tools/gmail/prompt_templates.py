@@ -13,11 +13,13 @@ def get_gmail_tools_prompt() -> str:
     return f"""## Tools
 - **send_email_tool**: Send an email. For a NEW email to a specific recipient, call with email_address, subject, body (no email_id). For REPLIES to an existing email, also pass email_id (Gmail message id).
 - **fetch_emails_tool**: List recent inbox emails. Use when the user asks what emails they have or to check inbox.
+- **read_attachment_tool**: Read an attachment of the email in context. Call with no arguments to list attachments, then with filename (or index) to get its text. Use when the reply depends on an attached document.
 - **check_calendar_tool**: List calendar events between start_date and end_date (YYYY-MM-DD). Use for "What's on my calendar?" or "Do I have meetings this week?"
+- **find_free_slots_tool**: Find free meeting times in working hours for the user and attendees (duration_minutes, optional start_date, end_date, attendees as comma-separated emails). Use before scheduling instead of reading check_calendar_tool output for gaps.
 - **schedule_meeting_tool**: Create a calendar event (summary, start_time, end_time in ISO format; optional description, location, attendees as comma-separated emails).
 - **question_tool**: Ask the user for clarification when you need more info.
 - **done_tool**: Call when you have finished the request.
 
-Today's date is {today}. Do not invent email addresses, events, or content. When the user asks to send an email to a specific address, use send_email_tool. When replying to an email in context, include email_id. For calendar questions use check_calendar_tool; to create a meeting use schedule_meeting_tool."""
+Today's date is {today}. Do not invent email addresses, events, or content. When the user asks to send an email to a specific address, use send_email_tool. When replying to an email in context, include email_id. For calendar questions use check_calendar_tool; to find a time use find_free_slots_tool; to create a meeting use schedule_meeting_tool."""
 
 GMAIL_TOOLS_PROMPT = get_gmail_tools_prompt()
@@ -7,10 +7,12 @@ when user asks to "email X with subject Y" or when replying to triaged email.
 
 import base64
 from email.mime.text import MIMEText
-from typing import Optional
+from typing import Annotated, Optional
 
 from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
 
+from email_assistant.tools.gmail.api import execute
 from email_assistant.tools.gmail.auth import get_gmail_service
 
 
@@ -34,23 +36,67 @@ def send_new_email(to_email: str, subject: str, body: str) -> str:
     message["to"] = to_email
     message["subject"] = subject
     raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    sent = service.users().messages().send(userId="me", body={"raw": raw}).execute()
+    sent = execute(service.users().messages().send(userId="me", body={"raw": raw}))
     return f"Email sent to {to_email} (message id: {sent.get('id', '')})."
 
 
-def send_reply_email(email_id: str, to_email: str, subject: str, body: str) -> str:
+# Headers of the original message a reply needs (threading and subject).
+REPLY_HEADERS = ("Message-ID", "References", "Subject")
+
+
+def reply_headers_from_email_input(email_input: Optional[dict], email_id: str) -> Optional[dict]:
+    """
+    Reply headers captured at ingestion (fetch_emails), when email_input is the message being replied to.
+
+    Returns {thread_id, message_id_header, references, subject}, or None when email_input is for another
+    message or lacks the Gmail fields (e.g. Studio / mock input), so the caller falls back to the API.
+    """
+    if not email_input or str(email_input.get("id") or "") != str(email_id):
+        return None
+    if not email_input.get("gmail_thread_id") or "message_id_header" not in email_input:
+        return None
+    return {
+        "thread_id": email_input.get("gmail_thread_id") or "",
+        "message_id_header": email_input.get("message_id_header") or "",
+        "references": email_input.get("references") or "",
+        "subject": email_input.get("subject") or "",
+    }
+
+
+def fetch_reply_headers(service, email_id: str) -> dict:
+    """Fetch only the reply headers of email_id (format=metadata), not the full message."""
+    orig = execute(service.users().messages().get(
+        userId="me", id=email_id, format="metadata", metadataHeaders=list(REPLY_HEADERS),
+    ))
+    headers = (orig.get("payload") or {}).get("headers") or []
+    return {
+        "thread_id": orig.get("threadId", ""),
+        "message_id_header": _get_header(headers, "Message-ID"),
+        "references": _get_header(headers, "References"),
+        "subject": _get_header(headers, "Subject"),
+    }
+
+
+def send_reply_email(
+    email_id: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    reply_headers: Optional[dict] = None,
+) -> str:
     """
-    Send a reply in the same Gmail thread. Fetches original message for threadId and Message-ID.
+    Send a reply in the same Gmail thread.
 
     Use cases: called by send_email_tool when email_id is provided; keeps thread continuity.
+    reply_headers (see reply_headers_from_email_input) come from ingestion; when missing, only
+    the original's headers are fetched.
     """
     service = get_gmail_service()
-    orig = service.users().messages().get(userId="me", id=email_id, format="full").execute()
-    payload = orig.get("payload") or {}
-    headers = payload.get("headers") or []
-    thread_id = orig.get("threadId", "")
-    message_id_header = _get_header(headers, "Message-ID")
-    orig_subject = _get_header(headers, "Subject")
+    if reply_headers is None:
+        reply_headers = fetch_reply_headers(service, email_id)
+    thread_id = reply_headers.get("thread_id", "")
+    message_id_header = reply_headers.get("message_id_header", "")
+    orig_subject = reply_headers.get("subject", "")
     reply_subject = f"Re: {orig_subject}" if orig_subject and not subject.strip().lower().startswith("re:") else (subject or f"Re: {orig_subject}")
 
     message = MIMEText(body)
@@ -58,13 +104,14 @@ def send_reply_email(email_id: str, to_email: str, subject: str, body: str) -> s
     message["subject"] = reply_subject
     if message_id_header:
         message["In-Reply-To"] = message_id_header
-        message["References"] = message_id_header
+        references = reply_headers.get("references", "")
+        message["References"] = f"{references} {message_id_header}".strip()
 
     raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
     body_send = {"raw": raw}
     if thread_id:
         body_send["threadId"] = thread_id
-    sent = service.users().messages().send(userId="me", body=body_send).execute()
+    sent = execute(service.users().messages().send(userId="me", body=body_send))
     return f"Reply sent in thread (message id: {sent.get('id', '')})."
 
 
@@ -74,6 +121,7 @@ def send_email_tool(
     subject: str,
     body: str,
     email_id: Optional[str] = None,
+    email_input: Annotated[Optional[dict], InjectedState("email_input")] = None,
 ) -> str:
     """
     Send an email. Use for NEW emails: provide email_address (recipient), subject, and body.
@@ -85,5 +133,6 @@ def send_email_tool(
             to_email=email_address,
             subject=subject,
             body=body,
+            reply_headers=reply_headers_from_email_input(email_input, email_id),
         )
     return send_new_email(to_email=email_address, subject=subject, body=body)
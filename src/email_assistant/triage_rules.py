@@ -0,0 +1,296 @@
+"""
+Rule-based pre-triage: settle obvious mail as ignore / notify / respond without the triage LLM.
+
+Use cases: triage_router (nodes/triage.py) evaluates the rules before building the LLM prompt,
+and the watcher's header-only pre-triage (ingest/pretriage.py) uses them to skip the full fetch
+of bulk mail. A rule is a dict:
+
+    {"id": "boss", "action": "respond",            # ignore | notify | respond
+     "senders": ["boss@corp.com"],                  # exact addresses
+     "domains": ["corp.com"],                       # sender domain or any parent domain
+     "headers": {"List-Unsubscribe": "*",           # "*" = present, "!no" = present and not "no",
+                 "Precedence": ["bulk", "list"]},   # list = any of these values (case-insensitive)
+     "labels": ["CATEGORY_PROMOTIONS"],             # Gmail label ids
+     "phrases": ["send me the"],                    # substrings of subject + body (case-insensitive)
+     "patterns": [r"invoice #\\d+"]}                # regular expressions (case-insensitive)
+
+A rule fires when any of its conditions matches. All rules are evaluated in one pass: senders,
+domains, headers and labels are dict lookups, and every phrase of every rule is matched by a
+single compiled regex scan. When several rules fire, the first in order wins: per-user rules
+(LangGraph store, ("triage_rules", user_id) / "rules") come first, then TRIAGE_RULES_FILE,
+then DEFAULT_RULES.
+"""
+
+import json
+import os
+import re
+import threading
+from email.utils import parseaddr
+from typing import Any, NamedTuple, Optional
+
+ACTIONS = ("ignore", "notify", "respond")
+
+DEFAULT_RULES: list[dict] = [
+    {
+        # Colleague requests like "send me the report by Friday": always respond, so the LLM cannot
+        # misclassify them as ignore. First, so a request on a mailing list still gets an answer.
+        "id": "explicit-request",
+        "action": "respond",
+        "phrases": [
+            "send me the",
+            "send me a",
+            "could you send",
+            "can you send",
+            "please send",
+            "please reply",
+            "reply with",
+            "by friday",
+            "by monday",
+            "by end of",
+            "q4 report",
+            "the report",
+        ],
+    },
+    {"id": "auto-submitted", "action": "ignore", "headers": {"Auto-Submitted": "!no"}},
+    {"id": "bulk-precedence", "action": "ignore", "headers": {"Precedence": ["bulk", "list", "junk"]}},
+    {"id": "list-unsubscribe", "action": "ignore", "headers": {"List-Unsubscribe": "*"}},
+    # Gmail system labels that only ever hold bulk mail.
+    {"id": "bulk-category", "action": "ignore", "labels": ["CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_FORUMS", "SPAM"]},
+]
+
+# Headers the rules can look at; fetch_emails copies these into email_input["headers"].
+RULE_HEADERS = ("List-Unsubscribe", "Precedence", "Auto-Submitted")
+
+
+class RuleMatch(NamedTuple):
+    action: str  # ignore | notify | respond
+    rule_id: str
+    reason: str  # which condition fired, e.g. "header Precedence: bulk"
+
+
+def _lower_list(value: Any) -> list[str]:
+    if isinstance(value, str):
+        value = [value]
+    return [str(v).strip().lower() for v in value or [] if str(v).strip()]
+
+
+def validate_rules(rules: Any) -> list[dict]:
+    """
+    Check a rule list and return it normalized (ids filled in, actions lowercased).
+
+    Raises ValueError on a rule that is not a dict, has an unknown action, or has no condition.
+    """
+    if not isinstance(rules, list):
+        raise ValueError("Triage rules must be a list of rule objects")
+    out = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"Triage rule {i} is not an object")
+        action = str(rule.get("action") or "").strip().lower()
+        if action not in ACTIONS:
+            raise ValueError(f"Triage rule {rule.get('id', i)!r}: action must be one of {', '.join(ACTIONS)}")
+        if not any(rule.get(key) for key in ("senders", "domains", "headers", "labels", "phrases", "patterns")):
+            raise ValueError(f"Triage rule {rule.get('id', i)!r} has no condition")
+        for pattern in rule.get("patterns") or []:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Triage rule {rule.get('id', i)!r}: bad pattern {pattern!r}: {e}") from e
+        out.append({**rule, "id": str(rule.get("id") or f"rule-{i}"), "action": action})
+    return out
+
+
+class TriageRules:
+    """Compiled rule set; evaluate() returns the winning RuleMatch or None (no rule fired: ask the LLM)."""
+
+    def __init__(self, rules: list[dict]):
+        self.rules = validate_rules(rules)
+        self._senders: dict[str, int] = {}
+        self._domains: dict[str, int] = {}
+        self._labels: dict[str, int] = {}
+        # header (lowercased) -> [(rule index, "*" | "!value" | frozenset of values)]
+        self._headers: dict[str, list[tuple[int, Any]]] = {}
+        self._phrase_rule: dict[str, int] = {}
+        self._patterns: list[tuple[int, re.Pattern]] = []
+        self._index: dict[str, int] = {}
+        # Rules with phrases / patterns: the only ones that need the message text.
+        self._text_rules = [i for i, r in enumerate(self.rules) if r.get("phrases") or r.get("patterns")]
+        for index, rule in enumerate(self.rules):
+            self._index.setdefault(rule["id"], index)
+            # setdefault: for a key listed by several rules, the earliest rule wins anyway.
+            for sender in _lower_list(rule.get("senders")):
+                self._senders.setdefault(sender, index)
+            for domain in _lower_list(rule.get("domains")):
+                self._domains.setdefault(domain.lstrip("@."), index)
+            for label in rule.get("labels") or []:
+                self._labels.setdefault(str(label).upper(), index)
+            for name, expected in (rule.get("headers") or {}).items():
+                if isinstance(expected, str) and (expected == "*" or expected.startswith("!")):
+                    condition = expected.lower()
+                else:
+                    condition = frozenset(_lower_list(expected))
+                self._headers.setdefault(name.lower(), []).append((index, condition))
+            for phrase in _lower_list(rule.get("phrases")):
+                self._phrase_rule.setdefault(phrase, index)
+            for pattern in rule.get("patterns") or []:
+                self._patterns.append((index, re.compile(pattern, re.IGNORECASE)))
+        self._phrase_regex = None
+        self._implied: dict[str, tuple[str, ...]] = {}
+        if self._phrase_rule:
+            # Longest first, inside a lookahead so finditer tests every start position: at each
+            # position the longest matching phrase is reported, and phrases that are prefixes of
+            # it are implied, so overlapping phrases are never missed.
+            phrases = sorted(self._phrase_rule, key=len, reverse=True)
+            self._phrase_regex = re.compile("(?=(" + "|".join(re.escape(p) for p in phrases) + "))")
+            self._implied = {p: tuple(q for q in phrases if p.startswith(q)) for p in phrases}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _phrase_hits(self, text: str) -> dict[int, str]:
+        hits: dict[int, str] = {}
+        if self._phrase_regex is None or not text:
+            return hits
+        for match in self._phrase_regex.finditer(text.lower()):
+            for phrase in self._implied[match.group(1)]:
+                hits.setdefault(self._phrase_rule[phrase], phrase)
+        return hits
+
+    def evaluate(
+        self,
+        sender: str = "",
+        subject: str = "",
+        body: str = "",
+        headers: Optional[dict] = None,
+        label_ids: Optional[list] = None,
+    ) -> Optional[RuleMatch]:
+        """Evaluate every rule against one message; the earliest firing rule wins."""
+        fired: dict[int, str] = {}
+
+        def hit(index: int, reason: str) -> None:
+            fired.setdefault(index, reason)
+
+        address = parseaddr(sender or "")[1].strip().lower()
+        if address in self._senders:
+            hit(self._senders[address], f"sender {address}")
+        domain = address.rpartition("@")[2]
+        while domain:
+            if domain in self._domains:
+                hit(self._domains[domain], f"domain {domain}")
+            domain = domain.partition(".")[2]
+        for name, value in (headers or {}).items():
+            conditions = self._headers.get(str(name).lower())
+            value = str(value or "").strip().lower()
+            if not conditions or not value:
+                continue
+            for index, condition in conditions:
+                if condition == "*" or (isinstance(condition, str) and value != condition[1:]) or (
+                    isinstance(condition, frozenset) and value in condition
+                ):
+                    hit(index, f"header {name}: {value[:60]}")
+        for label in label_ids or []:
+            if label in self._labels:
+                hit(self._labels[label], f"label {label}")
+        text = f"{subject or ''}\n{body or ''}"
+        for index, phrase in self._phrase_hits(text).items():
+            hit(index, f"phrase {phrase!r}")
+        for index, pattern in self._patterns:
+            if index not in fired:
+                match = pattern.search(text)
+                if match:
+                    hit(index, f"pattern {match.group(0)[:60]!r}")
+        if not fired:
+            return None
+        index = min(fired)
+        rule = self.rules[index]
+        return RuleMatch(rule["action"], rule["id"], fired[index])
+
+    def text_can_override(self, match: RuleMatch) -> bool:
+        """
+        True when text not evaluated yet could change match: an earlier rule with another action
+        has phrases or patterns. Use cases: pre-triage, which only sees the snippet of the body.
+        """
+        index = self._index.get(match.rule_id, len(self.rules))
+        return any(i < index and self.rules[i]["action"] != match.action for i in self._text_rules)
+
+    def evaluate_email(self, email_input: dict) -> Optional[RuleMatch]:
+        """evaluate() for an email_input dict (from, subject, body, optional headers and label_ids)."""
+        return self.evaluate(
+            sender=str(email_input.get("from") or ""),
+            subject=str(email_input.get("subject") or ""),
+            body=str(email_input.get("body") or "")[:8000],
+            headers=email_input.get("headers"),
+            label_ids=email_input.get("label_ids"),
+        )
+
+
+def triage_rules_enabled() -> bool:
+    """TRIAGE_RULES (default on): settle emails matched by a rule without the triage LLM."""
+    return os.getenv("TRIAGE_RULES", "1").strip().lower() in ("1", "true", "yes")
+
+
+def _file_rules() -> list[dict]:
+    """Rules from the JSON file at TRIAGE_RULES_FILE (a list of rules), or [] when unset / unreadable."""
+    path = os.getenv("TRIAGE_RULES_FILE", "").strip()
+    if not path:
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            return validate_rules(json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"Ignoring TRIAGE_RULES_FILE {path}: {e}")
+        return []
+
+
+def _stored_rules(store: Any, user_id: str) -> tuple[list[dict], Any]:
+    """(rules, version) for user_id from the store; version changes whenever the rules are rewritten."""
+    if store is None:
+        return [], None
+    try:
+        item = store.get(("triage_rules", str(user_id)), "rules")
+    except Exception as e:
+        print(f"Triage rules read failed: {e}")
+        return [], None
+    if item is None:
+        return [], None
+    value = getattr(item, "value", item)
+    rules = value.get("rules") if isinstance(value, dict) else value
+    try:
+        return validate_rules(rules or []), getattr(item, "updated_at", None) or json.dumps(rules, sort_keys=True, default=str)
+    except ValueError as e:
+        print(f"Ignoring stored triage rules for {user_id}: {e}")
+        return [], None
+
+
+_compiled_lock = threading.Lock()
+_compiled: dict[tuple, TriageRules] = {}
+
+
+def get_triage_rules(store: Any = None, user_id: str = "") -> TriageRules:
+    """
+    Compiled rules for user_id: stored per-user rules, then TRIAGE_RULES_FILE, then DEFAULT_RULES.
+
+    Compiled sets are cached per (user, stored version, rules file), so a store read is the only
+    per-email cost. With TRIAGE_RULES=0 the result is empty (every email goes to the LLM).
+    """
+    if not triage_rules_enabled():
+        return TriageRules([])
+    user_rules, version = _stored_rules(store, user_id)
+    rules_file = os.getenv("TRIAGE_RULES_FILE", "").strip()
+    key = (str(user_id) if user_rules else "", str(version), rules_file)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = TriageRules(user_rules + _file_rules() + DEFAULT_RULES)
+        with _compiled_lock:
+            if len(_compiled) > 256:
+                _compiled.clear()
+            _compiled[key] = compiled
+    return compiled
+
+
+def save_triage_rules(store: Any, user_id: str, rules: list[dict]) -> None:
+    """Validate and store user_id's own rules (they take precedence over the file and default rules)."""
+    if store is None:
+        raise RuntimeError("Saving triage rules requires a store (DATABASE_URL)")
+    store.put(("triage_rules", str(user_id)), "rules", {"rules": validate_rules(rules)})
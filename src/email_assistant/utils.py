@@ -5,7 +5,8 @@ Use cases: parse Gmail-style payloads, format email content for LLM or UI displa
 and shared formatting used by nodes and tools.
 """
 
-from typing import Any, Optional
+import base64
+from typing import Any, Iterator, Optional
 
 
 def _header(headers: list[dict], name: str) -> str:
@@ -17,6 +18,104 @@ def _header(headers: list[dict], name: str) -> str:
     return ""
 
 
+# Body text kept per email (characters); decoding stops after MAX_BODY_CHARS * 4 bytes (UTF-8 worst case).
+MAX_BODY_CHARS = 8000
+
+
+def _is_attachment(part: dict) -> bool:
+    """True for attachment parts (filename, attachmentId or Content-Disposition: attachment)."""
+    if part.get("filename") or (part.get("body") or {}).get("attachmentId"):
+        return True
+    disposition = _header(part.get("headers") or [], "Content-Disposition")
+    return disposition.lower().startswith("attachment")
+
+
+def iter_mime_leaves(payload: dict) -> Iterator[dict]:
+    """
+    Yield the non-attachment leaf parts of a Gmail payload in document order (depth first).
+
+    Use cases: find body parts in nested multipart/mixed, multipart/alternative and forwarded
+    (message/rfc822) structures. Attachments are skipped without touching their data.
+    Iterative, so deeply nested messages cannot hit the recursion limit.
+    """
+    stack = [payload] if payload else []
+    while stack:
+        part = stack.pop()
+        if _is_attachment(part):
+            continue
+        children = part.get("parts") or []
+        if children:
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def attachment_parts(payload: dict) -> list[dict]:
+    """
+    Metadata of the downloadable attachments in a Gmail payload (no attachment data is read).
+
+    Returns [{part_id, attachment_id, filename, mime_type, size}] for parts with a body.attachmentId,
+    in document order; the bodies are fetched later with messages.attachments.get on demand.
+    """
+    out = []
+    stack = [payload] if payload else []
+    while stack:
+        part = stack.pop()
+        body = part.get("body") or {}
+        if body.get("attachmentId"):
+            out.append({
+                "part_id": part.get("partId") or "",
+                "attachment_id": body["attachmentId"],
+                "filename": part.get("filename") or "",
+                "mime_type": (part.get("mimeType") or "").lower(),
+                "size": int(body.get("size") or 0),
+            })
+        stack.extend(reversed(part.get("parts") or []))
+    return out
+
+
+def decode_part_data(data: str, max_bytes: Optional[int] = None) -> str:
+    """
+    Decode a Gmail base64url body to text, decoding at most max_bytes (None = all).
+
+    Only the needed prefix of data is base64-decoded, so a huge part costs no more than max_bytes.
+    """
+    if not data:
+        return ""
+    if max_bytes is not None:
+        data = data[: -(-max_bytes // 3) * 4]
+    data += "=" * (-len(data) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(data.encode("ASCII"))
+    except Exception:
+        return ""
+    if max_bytes is not None:
+        raw = raw[:max_bytes]
+    return raw.decode("utf-8", errors="replace")
+
+
+def extract_text_body(payload: dict, max_chars: int = MAX_BODY_CHARS) -> str:
+    """
+    Body text of a Gmail payload in one pass: the first text/plain part, else the first text/html part.
+
+    Use cases: shared by parse_gmail, fetch_emails and input_router. Walks nested multiparts
+    (iter_mime_leaves), stops at the first text/plain part, decodes only the chosen part and
+    at most max_chars * 4 bytes of it, and never decodes attachments.
+    """
+    html_part = None
+    for part in iter_mime_leaves(payload or {}):
+        mimetype = (part.get("mimeType") or "").lower()
+        if not (part.get("body") or {}).get("data"):
+            continue
+        if mimetype.startswith("text/plain"):
+            return decode_part_data(part["body"]["data"], max_chars * 4)[:max_chars]
+        if html_part is None and mimetype.startswith("text/html"):
+            html_part = part
+    if html_part is not None:
+        return decode_part_data(html_part["body"]["data"], max_chars * 4)[:max_chars]
+    return ""
+
+
 def parse_gmail(payload: dict) -> dict:
     """
     Parse a Gmail API message payload into a flat email_input-style dict.
@@ -31,32 +130,11 @@ def parse_gmail(payload: dict) -> dict:
     if not payload or not isinstance(payload, dict):
         return {"from": "", "to": "", "subject": "", "body": "", "id": None}
     headers = payload.get("headers") or []
-    body_struct = payload.get("body") or {}
-    body_data = body_struct.get("data")
-    body = ""
-    if body_data:
-        import base64
-        try:
-            body = base64.urlsafe_b64decode(body_data.encode("ASCII")).decode("utf-8", errors="replace")
-        except Exception:
-            pass
-    if not body and payload.get("parts"):
-        for part in payload.get("parts") or []:
-            if (part.get("mimeType") or "").lower() in ("text/plain", "text/html"):
-                part_body = part.get("body") or {}
-                part_data = part_body.get("data")
-                if part_data:
-                    import base64
-                    try:
-                        body = base64.urlsafe_b64decode(part_data.encode("ASCII")).decode("utf-8", errors="replace")
-                        break
-                    except Exception:
-                        pass
     return {
         "from": _header(headers, "From"),
         "to": _header(headers, "To"),
         "subject": _header(headers, "Subject"),
-        "body": body,
+        "body": extract_text_body(payload),
         "id": None,
     }
 
@@ -77,9 +155,11 @@ def format_gmail_markdown(email: dict, max_body_chars: int = 8000) -> str:
     body = (email.get("body") or "").strip()
     if max_body_chars and len(body) > max_body_chars:
         body = body[:max_body_chars] + "\n..."
+    attachments = ", ".join(a.get("filename") or "(unnamed)" for a in email.get("attachments") or [])
+    attachments_line = f"\n- **Attachments:** {attachments}" if attachments else ""
     return f"""- **From:** {from_addr}
 - **To:** {to_addr}
-- **Subject:** {subject}
+- **Subject:** {subject}{attachments_line}
 
 ## Body
 
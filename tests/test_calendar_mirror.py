@@ -0,0 +1,76 @@
+"""CalendarMirror against the in-process fake: full seed, incremental sync, 410 resync."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from email_assistant.tools.gmail.calendar_mirror import CalendarMirror
+from email_assistant.tools.gmail.fake_api import FakeCalendarService, FakeGoogleBackend
+
+
+def _event(backend: FakeGoogleBackend, summary: str, start: str, end: str) -> dict:
+    return backend.insert_event("primary", {"summary": summary, "start": {"dateTime": start}, "end": {"dateTime": end}})
+
+
+@pytest.fixture
+def backend():
+    return FakeGoogleBackend(seed=1)
+
+
+@pytest.fixture
+def mirror(backend):
+    return CalendarMirror("primary", sync_interval=0, service_factory=lambda: FakeCalendarService(backend))
+
+
+def _summaries(mirror: CalendarMirror, lo: str, hi: str) -> list[str]:
+    parse = lambda s: datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+    return [e["summary"] for e in mirror.query(parse(lo), parse(hi))]
+
+
+def test_incremental_sync_applies_inserts_and_cancellations(backend, mirror):
+    standup = _event(backend, "standup", "2026-03-02T09:00:00Z", "2026-03-02T09:15:00Z")
+    _event(backend, "review", "2026-03-02T14:00:00Z", "2026-03-02T15:00:00Z")
+    mirror.sync()
+    assert (mirror.full_syncs, mirror.incremental_syncs) == (1, 0)
+    assert _summaries(mirror, "2026-03-02T00:00:00", "2026-03-03T00:00:00") == ["standup", "review"]
+
+    _event(backend, "lunch", "2026-03-02T12:00:00Z", "2026-03-02T13:00:00Z")
+    backend.delete_event("primary", standup["id"])
+    calls_before = backend.calls_by_method.get("calendar.events.list", 0)
+    mirror.sync()
+
+    assert (mirror.full_syncs, mirror.incremental_syncs) == (1, 1)
+    assert backend.calls_by_method["calendar.events.list"] == calls_before + 1
+    assert _summaries(mirror, "2026-03-02T00:00:00", "2026-03-03T00:00:00") == ["lunch", "review"]
+    assert len(mirror) == 2
+
+
+def test_query_finds_long_event_starting_before_the_range(backend, mirror):
+    _event(backend, "offsite", "2026-03-01T08:00:00Z", "2026-03-04T18:00:00Z")
+    _event(backend, "call", "2026-03-03T10:00:00Z", "2026-03-03T10:30:00Z")
+    mirror.sync()
+    assert _summaries(mirror, "2026-03-03T00:00:00", "2026-03-03T12:00:00") == ["offsite", "call"]
+    assert _summaries(mirror, "2026-03-05T00:00:00", "2026-03-06T00:00:00") == []
+
+
+def test_expired_sync_token_triggers_full_resync(backend, mirror, capsys):
+    _event(backend, "standup", "2026-03-02T09:00:00Z", "2026-03-02T09:15:00Z")
+    mirror.sync()
+    _event(backend, "retro", "2026-03-02T16:00:00Z", "2026-03-02T17:00:00Z")
+    backend.expire_sync_tokens()
+
+    mirror.sync()
+
+    assert (mirror.full_syncs, mirror.incremental_syncs) == (2, 0)
+    assert "full calendar sync" in capsys.readouterr().out
+    assert _summaries(mirror, "2026-03-02T00:00:00", "2026-03-03T00:00:00") == ["standup", "retro"]
+
+
+def test_sync_is_skipped_while_fresh(backend):
+    mirror = CalendarMirror("primary", sync_interval=3600, service_factory=lambda: FakeCalendarService(backend))
+    mirror.sync()
+    _event(backend, "late", "2026-03-02T09:00:00Z", "2026-03-02T10:00:00Z")
+    mirror.sync()
+    assert len(mirror) == 0
+    mirror.sync(force=True)
+    assert len(mirror) == 1
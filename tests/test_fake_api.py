@@ -0,0 +1,113 @@
+"""In-process Gmail fake: history sync, batch gets, batchModify, labels, quota 429s, and a load_gmail.py smoke run."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.api import classify_error
+from email_assistant.tools.gmail.fake_api import FakeGmailService, FakeGoogleBackend
+from email_assistant.tools.gmail.fetch_emails import (
+    get_history_id,
+    get_messages_as_email_inputs,
+    get_messages_metadata,
+    list_history_message_ids,
+)
+from email_assistant.tools.gmail.labels import LabelMutationBuffer
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def backend():
+    return FakeGoogleBackend(seed=1)
+
+
+@pytest.fixture
+def service(backend):
+    return FakeGmailService(backend)
+
+
+def test_history_sync_returns_new_inbox_messages_once(backend, service):
+    cursor = get_history_id(service)
+    first = backend.deliver("Alice <alice@example.com>", "Report", "Could you send the report?")
+    reply = backend.deliver("Alice <alice@example.com>", "Re: Report", "Any update?", thread_id=first["threadId"])
+    backend.modify(first["id"], {"removeLabelIds": ["UNREAD"]})  # label changes are not messageAdded
+
+    ids, cursor = list_history_message_ids(service, cursor)
+    assert ids == [first["id"], reply["id"]]
+    assert reply["threadId"] == first["threadId"]
+    assert list_history_message_ids(service, cursor) == ([], cursor)
+
+
+def test_batch_get_converts_full_and_metadata_and_reports_missing(backend, service):
+    sent = backend.deliver(
+        "Deals <offers@shop.example>", "48 hour sale", "Everything 30% off.",
+        headers={"List-Unsubscribe": "<mailto:u@shop.example>"}, label_ids=["CATEGORY_PROMOTIONS"],
+    )
+    ids = [sent["id"], "does-not-exist"]
+
+    metadata, errors = get_messages_metadata(service, ids)
+    assert metadata[0]["headers"]["List-Unsubscribe"] == "<mailto:u@shop.example>"
+    assert "CATEGORY_PROMOTIONS" in metadata[0]["label_ids"]
+    assert metadata[1] is None and "does-not-exist" in errors
+
+    email_inputs, errors = get_messages_as_email_inputs(service, ids)
+    assert email_inputs[0]["subject"] == "48 hour sale"
+    assert "Everything 30% off." in email_inputs[0]["body"]
+    assert email_inputs[1] is None and list(errors) == ["does-not-exist"]
+
+
+def test_label_buffer_creates_label_and_batch_modifies_on_the_fake(backend, service):
+    ids = [backend.deliver("bob@example.com", f"Subject {i}", "Body")["id"] for i in range(3)]
+    errors = []
+    buffer = LabelMutationBuffer(flush_interval=3600, service_factory=lambda: service, on_error=lambda w, e: errors.append(w))
+    buffer.add(ids, remove_labels=["UNREAD"])
+    buffer.add(ids[0], add_labels=["assistant/respond"])
+    buffer.add("does-not-exist", remove_labels=["UNREAD"])
+
+    assert buffer.flush() == 3  # the unknown id is split out and reported
+    buffer.close()
+
+    label_id = {label["name"]: label["id"] for label in backend.list_labels()["labels"]}["assistant/respond"]
+    assert errors == ["message does-not-exist"]
+    assert label_id in backend.messages[ids[0]]["labelIds"]
+    assert all("UNREAD" not in backend.messages[mid]["labelIds"] for mid in ids)
+    assert backend.calls_by_method["gmail.users.labels.create"] == 1
+
+
+def test_quota_returns_429_with_retry_after():
+    backend = FakeGoogleBackend(gmail_units_per_second=4)
+    service = FakeGmailService(backend)
+    service.users().getProfile(userId="me").execute()  # 1 unit
+    service.users().history().list(userId="me", startHistoryId="1").execute()  # 2 units
+    with pytest.raises(HttpError) as excinfo:
+        service.users().history().list(userId="me", startHistoryId="1").execute()
+    assert classify_error(excinfo.value) == (True, 429, 1.0)
+    assert backend.stats["throttled"] == 1
+
+
+def test_load_gmail_smoke_run(tmp_path):
+    report_file = tmp_path / "report.json"
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT / "src"),
+        "LOAD_RATE": "30",
+        "LOAD_DURATION": "1",
+        "LOAD_POLL_INTERVAL": "0.2",
+        "LOAD_REPORT_FILE": str(report_file),
+        "GOOGLE_API_FAKE_SEED": "7",
+    }
+    result = subprocess.run(
+        [sys.executable, str(ROOT / "scripts" / "load_gmail.py")],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(report_file.read_text())
+    assert report["delivered"] > 0
+    assert report["ingested"] + report["pre_triage_ignored"] == report["delivered"]
+    assert report["fetch_errors"] == report["poll_errors"] == 0
@@ -0,0 +1,62 @@
+"""merge_busy / find_free_slots / working_hours."""
+
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from email_assistant.tools.gmail.free_slots import WorkingHours, find_free_slots, merge_busy, working_hours
+
+UTC = timezone.utc
+NINE_TO_FIVE = WorkingHours(frozenset(range(5)), time(9), time(17), ZoneInfo("UTC"))
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    # March 2026: the 2nd is a Monday, the 7th / 8th a weekend.
+    return datetime(2026, 3, day, hour, minute, tzinfo=UTC)
+
+
+def test_merge_busy_unions_overlapping_and_touching_intervals():
+    busy = [
+        (at(2, 11), at(2, 12)),
+        (at(2, 9), at(2, 10)),
+        (at(2, 10), at(2, 10, 30)),  # touches the 9-10 block
+        (at(2, 9, 30), at(2, 9, 45)),  # nested
+        (at(2, 13), at(2, 13)),  # empty: dropped
+    ]
+    assert merge_busy(busy) == [(at(2, 9), at(2, 10, 30)), (at(2, 11), at(2, 12))]
+
+
+def test_find_free_slots_skips_busy_time_and_aligns_starts():
+    busy = [(at(2, 9), at(2, 10, 5)), (at(2, 11), at(2, 16, 30))]
+    slots = find_free_slots(busy, at(2, 0), at(3, 0), timedelta(minutes=30), NINE_TO_FIVE, max_results=10)
+    assert slots == [
+        (at(2, 10, 15), at(2, 10, 45)),
+        (at(2, 16, 30), at(2, 17)),
+    ]
+
+
+def test_find_free_slots_spreads_over_gaps_and_skips_weekends():
+    slots = find_free_slots([], at(6, 0), at(10, 0), timedelta(hours=1), NINE_TO_FIVE, max_results=3)
+    # Friday 6th, then Monday 9th: the earliest slot of each gap comes first.
+    assert [start for start, _ in slots] == [at(6, 9), at(6, 10), at(9, 9)]
+
+
+def test_find_free_slots_respects_working_hours_time_zone():
+    berlin = WorkingHours(frozenset(range(5)), time(9), time(17), ZoneInfo("Europe/Berlin"))
+    slots = find_free_slots([], at(2, 0), at(2, 23), timedelta(hours=1), berlin, max_results=1)
+    assert slots == [(at(2, 8), at(2, 9))]  # 09:00 CET
+
+
+def test_working_hours_parses_preferences_text():
+    hours = working_hours("Working hours: Tue-Thu 9.30am to 5pm, Europe/Berlin")
+    assert hours.days == frozenset({1, 2, 3})
+    assert (hours.start, hours.end) == (time(9, 30), time(17))
+    assert hours.tz == ZoneInfo("Europe/Berlin")
+
+
+def test_working_hours_falls_back_to_environment(monkeypatch):
+    monkeypatch.setenv("CALENDAR_WORK_START", "08:00")
+    monkeypatch.setenv("CALENDAR_WORK_END", "16:00")
+    monkeypatch.setenv("CALENDAR_WORK_DAYS", "mon-wed")
+    monkeypatch.setenv("CALENDAR_TIMEZONE", "UTC")
+    hours = working_hours("")
+    assert hours == WorkingHours(frozenset({0, 1, 2}), time(8), time(16), ZoneInfo("UTC"))
@@ -0,0 +1,154 @@
+"""LabelMutationBuffer against a minimal in-memory Gmail stand-in: merging, batchModify, 400 split, requeue."""
+
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.labels import LabelMutationBuffer
+
+
+class _Request:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class _FakeGmail:
+    """Just enough of users().messages().batchModify and users().labels() for the buffer."""
+
+    def __init__(self, message_ids):
+        self.message_labels = {mid: {"UNREAD", "INBOX"} for mid in message_ids}
+        self.label_ids = {}
+        self.batch_calls = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return _Messages(self)
+
+    def labels(self):
+        return _Labels(self)
+
+
+class _Messages:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def batchModify(self, userId, body):
+        def run():
+            self.gmail.batch_calls += 1
+            if any(mid not in self.gmail.message_labels for mid in body["ids"]):
+                content = json.dumps({"error": {"code": 400, "message": "Invalid id"}}).encode("utf-8")
+                raise HttpError(httplib2.Response({"status": "400"}), content)
+            for mid in body["ids"]:
+                labels = self.gmail.message_labels[mid]
+                labels.difference_update(body.get("removeLabelIds", []))
+                labels.update(body.get("addLabelIds", []))
+            return {}
+
+        return _Request(run)
+
+
+class _Labels:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, userId):
+        return _Request(lambda: {"labels": [{"id": i, "name": n} for n, i in self.gmail.label_ids.items()]})
+
+    def create(self, userId, body):
+        def run():
+            label_id = f"Label_{len(self.gmail.label_ids) + 1}"
+            self.gmail.label_ids[body["name"]] = label_id
+            return {"id": label_id, "name": body["name"]}
+
+        return _Request(run)
+
+
+@pytest.fixture
+def gmail():
+    return _FakeGmail([f"m{i}" for i in range(7)])
+
+
+def _buffer(gmail, errors, **kwargs) -> LabelMutationBuffer:
+    kwargs.setdefault("service_factory", lambda: gmail)
+    return LabelMutationBuffer(flush_interval=3600, on_error=lambda what, e: errors.append(what), **kwargs)
+
+
+def test_flush_groups_messages_into_one_batch_modify(gmail):
+    errors = []
+    buffer = _buffer(gmail, errors)
+    ids = ["m0", "m1", "m2"]
+    buffer.add(ids, remove_labels=["UNREAD"])
+    buffer.add(ids[0], add_labels=["assistant/respond"])
+
+    assert buffer.flush() == 3
+    buffer.close()
+
+    assert buffer.calls == 2  # {-UNREAD} for two ids, {+respond, -UNREAD} for one
+    assert gmail.batch_calls == 2
+    assert gmail.label_ids["assistant/respond"] in gmail.message_labels["m0"]
+    assert all("UNREAD" not in gmail.message_labels[mid] for mid in ids)
+    assert errors == []
+
+
+def test_later_change_cancels_earlier_opposite_change(gmail):
+    buffer = _buffer(gmail, [])
+    buffer.add("m0", remove_labels=["UNREAD"])
+    buffer.add("m0", add_labels=["UNREAD", "STARRED"])
+    buffer.flush()
+    buffer.close()
+    assert {"UNREAD", "STARRED"} <= gmail.message_labels["m0"]
+
+
+def test_invalid_id_is_isolated_by_splitting_the_batch(gmail):
+    errors = []
+    buffer = _buffer(gmail, errors)
+    ids = [f"m{i}" for i in range(7)]
+    buffer.add(ids[:3] + ["does-not-exist"] + ids[3:], remove_labels=["UNREAD"])
+
+    assert buffer.flush() == 7
+    buffer.close()
+
+    assert errors == ["message does-not-exist"]
+    assert all("UNREAD" not in gmail.message_labels[mid] for mid in ids)
+    assert buffer.pending() == 0
+
+
+def test_failed_flush_is_requeued_then_dropped_after_max_attempts(gmail):
+    errors = []
+    healthy = [False]
+
+    def factory():
+        if not healthy[0]:
+            raise RuntimeError("auth down")
+        return gmail
+
+    buffer = _buffer(gmail, errors, service_factory=factory, max_attempts=3)
+    ids = ["m0", "m1"]
+    buffer.add(ids, remove_labels=["UNREAD"])
+
+    assert buffer.flush() == 0
+    assert buffer.pending() == 2
+    # A newer change for a requeued message is kept alongside the failed one.
+    buffer.add(ids[0], add_labels=["STARRED"])
+    assert buffer.flush() == 0
+    assert buffer.pending() == 2
+
+    healthy[0] = True
+    assert buffer.flush() == 2
+    assert "STARRED" in gmail.message_labels["m0"]
+    assert all("UNREAD" not in gmail.message_labels[mid] for mid in ids)
+
+    healthy[0] = False
+    buffer.add(ids, add_labels=["IMPORTANT"])
+    for _ in range(3):
+        buffer.flush()
+    assert buffer.pending() == 0
+    assert errors[-1] == "2 message(s), 2 dropped after 3 attempts"
+    buffer.close()
@@ -0,0 +1,45 @@
+"""SqliteLedger: pending() retry selection and prune() of the oldest finished rows."""
+
+import pytest
+
+from email_assistant.ingest import ledger as ledger_module
+from email_assistant.ingest.ledger import DONE, FAILED, INTERRUPTED, QUEUED, SqliteLedger
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    # One distinct timestamp per mark() call, so processing order is deterministic.
+    monkeypatch.setattr(ledger_module.time, "time", lambda: float(next(clock)))
+    ledger = SqliteLedger(tmp_path / "ledger.sqlite3")
+    yield ledger
+    ledger.close()
+
+
+def test_pending_returns_queued_and_retryable_failed_oldest_first(ledger):
+    ledger.mark("done", DONE)
+    ledger.mark("queued", QUEUED)
+    ledger.mark("interrupted", INTERRUPTED)
+    ledger.mark("failed-once", FAILED, "boom")
+    for _ in range(3):
+        ledger.mark("failed-often", FAILED, "boom")
+
+    assert ledger.pending(max_attempts=3) == ["queued", "failed-once"]
+    assert ledger.pending(max_attempts=4) == ["queued", "failed-once", "failed-often"]
+
+
+def test_mark_rejects_unknown_status(ledger):
+    with pytest.raises(ValueError):
+        ledger.mark("m1", "skipped")
+
+
+def test_prune_drops_oldest_finished_rows_and_keeps_queued(ledger):
+    ledger.mark("old-queued", QUEUED)
+    for i in range(5):
+        ledger.mark(f"m{i}", DONE)
+
+    # The 3 newest rows survive; older finished rows go, a queued row is never pruned.
+    assert ledger.prune(3) == 2
+    assert ledger.count() == 4
+    assert set(ledger.statuses(["old-queued", "m0", "m1", "m2", "m3", "m4"])) == {"old-queued", "m2", "m3", "m4"}
+    assert ledger.prune(3) == 0
@@ -0,0 +1,60 @@
+"""LLM response cache: key normalization, triage key without date / To:, cached_invoke hits and TTL."""
+
+import pytest
+
+from email_assistant import llm_cache
+from email_assistant.llm_cache import LLMResponseCache, cache_key, cached_invoke
+from email_assistant.nodes.triage import _triage_messages
+
+
+class _Runnable:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self.answer
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setattr(llm_cache, "_cache", LLMResponseCache(None))
+
+
+def _email(**fields) -> dict:
+    return {"from": "News <news@list.example>", "to": "a@example.com", "subject": "Weekly", "body": "Hello  all.", **fields}
+
+
+def test_key_ignores_whitespace_but_not_content():
+    a = cache_key("triage", [{"role": "user", "content": "Hello  all.\n"}], "gpt-4o")
+    assert a == cache_key("triage", [{"role": "user", "content": "Hello all."}], "gpt-4o")
+    assert a != cache_key("triage", [{"role": "user", "content": "Hello all!"}], "gpt-4o")
+    assert a != cache_key("triage", [{"role": "user", "content": "Hello all."}], "gpt-4o-mini")
+
+
+def test_triage_key_is_the_same_for_other_recipients_and_days(monkeypatch):
+    key = lambda email, instructions="": cache_key("triage", _triage_messages(email, instructions, for_cache_key=True), "m")
+    first = key(_email())
+    assert key(_email(to="b@example.com")) == first
+    assert key(_email(body="Something else.")) != first
+    assert key(_email(), instructions="Ignore all newsletters.") != first
+    # The prompt sent to the model still carries the recipient and today's date.
+    sent = _triage_messages(_email(), "")
+    assert "a@example.com" in sent[1].content and "Today's date is 2" in sent[0].content
+
+
+def test_cached_invoke_answers_repeats_from_the_cache(monkeypatch):
+    runnable = _Runnable({"classification": "ignore"})
+    messages = [{"role": "user", "content": "hi"}]
+    assert cached_invoke("triage", runnable, messages, model="m", key_messages=[{"role": "user", "content": "k"}]) == {
+        "classification": "ignore"
+    }
+    cached_invoke("triage", runnable, [{"role": "user", "content": "other"}], model="m", key_messages=[{"role": "user", "content": "k"}])
+    assert runnable.calls == 1
+    assert llm_cache.llm_cache_stats()["triage"]["memory_hits"] == 1
+
+    monkeypatch.setenv("LLM_CACHE_TTL_TRIAGE", "0")
+    cached_invoke("triage", runnable, messages, model="m")
+    assert runnable.calls == 2
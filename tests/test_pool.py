@@ -0,0 +1,61 @@
+"""KeyedWorkerPool: tasks with the same key run one at a time, in submit order."""
+
+import threading
+import time
+
+from email_assistant.ingest.pool import KeyedWorkerPool
+
+
+def test_same_key_runs_in_submit_order():
+    pool = KeyedWorkerPool(max_workers=4)
+    order: dict[str, list[int]] = {"a": [], "b": []}
+    running: dict[str, int] = {"a": 0, "b": 0}
+    overlap = []
+    lock = threading.Lock()
+
+    def task(key: str, n: int) -> None:
+        with lock:
+            running[key] += 1
+            if running[key] > 1:
+                overlap.append((key, n))
+        time.sleep(0.002)
+        with lock:
+            order[key].append(n)
+            running[key] -= 1
+
+    for n in range(20):
+        pool.submit("a", task, "a", n)
+        pool.submit("b", task, "b", n)
+    assert pool.join(timeout=10)
+    pool.shutdown()
+
+    assert order == {"a": list(range(20)), "b": list(range(20))}
+    assert overlap == []
+
+
+def test_different_keys_run_concurrently():
+    pool = KeyedWorkerPool(max_workers=2)
+    barrier = threading.Barrier(2, timeout=5)
+    pool.submit("a", barrier.wait)
+    pool.submit("b", barrier.wait)
+    assert pool.join(timeout=5)
+    pool.shutdown()
+    assert not barrier.broken
+
+
+def test_error_does_not_stop_later_tasks_for_the_key():
+    errors = []
+    pool = KeyedWorkerPool(max_workers=1, on_error=lambda key, e: errors.append((key, str(e))))
+    ran = []
+
+    def fail() -> None:
+        raise RuntimeError("boom")
+
+    pool.submit("a", fail)
+    pool.submit("a", ran.append, "after")
+    assert pool.join(timeout=5)
+    pool.shutdown()
+
+    assert errors == [("a", "boom")]
+    assert ran == ["after"]
+    assert pool.in_flight == 0
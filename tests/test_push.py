@@ -0,0 +1,73 @@
+"""PushReceiver / parse_push_payload: payload shapes, coalescing, token check, stop()."""
+
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from email_assistant.ingest.push import PushReceiver, parse_push_payload
+
+
+def _envelope(payload: dict) -> bytes:
+    data = base64.b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+    return json.dumps({"message": {"data": data, "messageId": "1"}, "subscription": "s"}).encode("utf-8")
+
+
+def test_parse_push_payload_accepts_envelope_and_bare_body():
+    assert parse_push_payload(_envelope({"emailAddress": "me@example.com", "historyId": 42})) == {
+        "historyId": "42",
+        "emailAddress": "me@example.com",
+    }
+    assert parse_push_payload(b'{"historyId": "7"}') == {"historyId": "7", "emailAddress": ""}
+    assert parse_push_payload(b"not json") is None
+    assert parse_push_payload(b'{"emailAddress": "me@example.com"}') is None
+
+
+@pytest.fixture
+def receiver():
+    receiver = PushReceiver(port=0, token="secret").start()
+    yield receiver
+    receiver.stop()
+
+
+def _post(receiver: PushReceiver, body: bytes, token: str = "secret") -> int:
+    host, port = receiver.address
+    request = urllib.request.Request(f"http://{host}:{port}{receiver.path}?token={token}", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_notifications_coalesce_to_the_newest_history_id(receiver):
+    assert _post(receiver, b'{"historyId": "10"}') == 204
+    assert _post(receiver, _envelope({"historyId": "12"})) == 204
+    assert _post(receiver, b'{"historyId": "11"}') == 204
+    assert receiver.wait(timeout=1) == "12"
+    assert receiver.wait(timeout=0.05) is None
+    assert receiver.received == 3
+
+
+def test_wrong_token_is_rejected(receiver):
+    assert _post(receiver, b'{"historyId": "10"}', token="nope") == 403
+    assert receiver.wait(timeout=0.05) is None
+
+
+def test_stop_releases_a_blocked_wait(receiver):
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(receiver.wait(timeout=30)))
+    waiter.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    receiver.stop()
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert time.monotonic() - started < 5
+    assert result == [None]
+    assert receiver.wait(timeout=30) is None  # returns at once after stop
+    receiver.stop()  # idempotent
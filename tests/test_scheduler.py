@@ -0,0 +1,79 @@
+"""PollScheduler: interval derived from the arrival rate, backoff on throttling."""
+
+import json
+import random
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from email_assistant.ingest import scheduler as scheduler_module
+from email_assistant.ingest.scheduler import PollScheduler, classify_error
+
+
+def http_error(status: int, reason: str, retry_after=None) -> HttpError:
+    headers = {"status": str(status), "content-type": "application/json"}
+    if retry_after is not None:
+        headers["retry-after"] = str(retry_after)
+    content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode("utf-8")
+    return HttpError(httplib2.Response(headers), content, uri="https://gmail.googleapis.com")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(scheduler_module.time, "time", lambda: now[0])
+    return now
+
+
+def _poll(scheduler: PollScheduler, clock: list, new_messages: int) -> float:
+    delay = scheduler.record_success(new_messages)
+    clock[0] += delay
+    return delay
+
+
+def test_first_interval_is_base_and_idle_polls_grow_to_max(clock):
+    scheduler = PollScheduler(base_interval=60, min_interval=10, max_interval=300)
+    delays = [_poll(scheduler, clock, 0) for _ in range(8)]
+    assert delays[0] == 60
+    assert delays == sorted(delays)
+    assert delays[-1] == 300
+
+
+def test_busy_inbox_converges_to_target_messages_per_poll(clock):
+    scheduler = PollScheduler(base_interval=60, min_interval=1, max_interval=300, target_per_poll=2)
+    _poll(scheduler, clock, 0)
+    for _ in range(40):
+        # Mail arrives at 12 per minute: deliver what arrived during the last delay.
+        _poll(scheduler, clock, round(scheduler.next_delay * 12 / 60))
+    assert scheduler.arrival_rate == pytest.approx(12, rel=0.15)
+    assert scheduler.next_delay == pytest.approx(10, rel=0.15)
+
+
+def test_interval_is_clamped_to_min(clock):
+    scheduler = PollScheduler(base_interval=60, min_interval=10, max_interval=300)
+    _poll(scheduler, clock, 0)
+    for _ in range(5):
+        _poll(scheduler, clock, 100)
+    assert scheduler.next_delay == 10
+
+
+def test_throttled_error_backs_off_and_honours_retry_after():
+    scheduler = PollScheduler(base_interval=60, min_interval=10, max_backoff=900, rng=random.Random(0))
+    delay = scheduler.record_error(http_error(429, "rateLimitExceeded", retry_after=120))
+    assert delay >= 120
+    assert scheduler.backing_off
+    assert scheduler.state()["consecutive_errors"] == 1
+    assert scheduler.record_error(ValueError("not an API error")) == scheduler.interval
+
+
+def test_classify_error_finds_wrapped_http_errors():
+    try:
+        try:
+            raise http_error(403, "userRateLimitExceeded")
+        except HttpError as e:
+            raise RuntimeError("history list failed") from e
+    except RuntimeError as wrapped:
+        assert classify_error(wrapped) == (True, 403, None)
+    assert classify_error(http_error(404, "notFound")) == (False, 404, None)
+    assert classify_error(ValueError("boom")) == (False, None, None)
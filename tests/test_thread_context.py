@@ -0,0 +1,61 @@
+"""ThreadContextCache: quoted-text stripping, summary folding, middle trimming, concurrent record()."""
+
+import threading
+
+import pytest
+
+from email_assistant import thread_context
+from email_assistant.thread_context import ThreadContextCache, strip_quoted
+
+
+@pytest.fixture(autouse=True)
+def extractive_summary(monkeypatch):
+    monkeypatch.setenv("THREAD_CONTEXT_SUMMARY", "extract")
+    monkeypatch.setenv("THREAD_CONTEXT", "1")
+    thread_context._local.clear()
+
+
+def _email(message_id: str, body: str, thread_id: str = "t1") -> dict:
+    return {"id": message_id, "gmail_thread_id": thread_id, "from": f"{message_id}@example.com", "body": body}
+
+
+def test_strip_quoted_drops_reply_history():
+    body = "Sounds good.\n\nOn Tue, 1 Oct 2026 at 10:00, Alice <a@x.com> wrote:\n> earlier text"
+    assert strip_quoted(body) == "Sounds good."
+
+
+def test_record_returns_earlier_turns_and_folds_old_ones():
+    cache = ThreadContextCache(max_turns=2)
+    assert cache.record("u", _email("m1", "first")) == ""
+    cache.record("u", _email("m2", "second"))
+    cache.record("u", _email("m3", "third"))
+    context = cache.record("u", _email("m4", "fourth"))
+    assert "Summary of earlier messages: - m1@example.com: first" in context
+    assert "m3@example.com: third" in context
+    # Re-running m3 shows only what came before it.
+    assert "third" not in cache.record("u", _email("m3", "third"))
+
+
+def test_summary_over_cap_keeps_head_and_tail():
+    text = "START " + "x" * 500 + " END"
+    clipped = thread_context._clip_middle(text, 100)
+    assert len(clipped) == 100
+    assert clipped.startswith("START") and clipped.endswith("END")
+
+
+def test_concurrent_records_keep_every_turn(monkeypatch):
+    cache = ThreadContextCache(max_turns=100)
+    original_get = cache.get
+
+    def slow_get(user_id, thread_id):
+        entry = original_get(user_id, thread_id)
+        threading.Event().wait(0.01)  # widen the read-modify-write window
+        return entry
+
+    monkeypatch.setattr(cache, "get", slow_get)
+    threads = [threading.Thread(target=cache.record, args=("u", _email(f"m{i}", f"body {i}"))) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(cache.get("u", "t1")["seen"]) == sorted(f"m{i}" for i in range(8))
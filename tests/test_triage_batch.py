@@ -0,0 +1,75 @@
+"""Batch triage: same instructions and thread context as the graph, per-email fallback, and the _triage_decision state key."""
+
+import pytest
+
+from email_assistant import llm_cache
+from email_assistant.llm_cache import LLMResponseCache
+from email_assistant.nodes import triage
+from email_assistant.nodes.input_router import input_router
+from email_assistant.thread_context import ThreadContextCache
+from email_assistant.triage_rules import TriageRules
+
+
+class _Runnable:
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append("\n".join(m.content for m in messages))
+        return self.answer
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setattr(llm_cache, "_cache", LLMResponseCache(None))
+
+
+def _email(i: int) -> dict:
+    return {"from": f"person{i}@example.com", "to": "me@example.com", "subject": f"Subject {i}", "body": f"Body {i}"}
+
+
+def test_batch_prompt_and_fallback_carry_instructions_and_thread_context(monkeypatch):
+    batch_llm = _Runnable({"results": [{"index": 0, "reasoning": "fyi", "classification": "notify"}]})
+    single_llm = _Runnable({"reasoning": "asks", "classification": "respond"})
+    monkeypatch.setattr(triage, "_structured_batch_llm", lambda: batch_llm)
+    monkeypatch.setattr(triage, "_structured_triage_llm", lambda: single_llm)
+
+    updates = triage.triage_batch(
+        [_email(0), _email(1)],
+        triage_instructions="Newsletters from person0 are notify.",
+        thread_contexts=["", "- boss@example.com: Can you review the draft?"],
+        rules=TriageRules([]),
+    )
+
+    assert [u["classification_decision"] for u in updates] == ["notify", "respond"]
+    assert "Newsletters from person0 are notify." in batch_llm.prompts[0]
+    assert "Can you review the draft?" in batch_llm.prompts[0]
+    # Email 1 had no valid batch item: its single-email fallback keeps instructions and thread context.
+    assert "Newsletters from person0 are notify." in single_llm.prompts[0]
+    assert "Can you review the draft?" in single_llm.prompts[0]
+
+
+def test_triage_decision_is_a_state_key_not_an_email_field(monkeypatch):
+    monkeypatch.setattr(triage, "_structured_triage_llm", lambda: pytest.fail("LLM called despite _triage_decision"))
+    routed = input_router({"email_input": {**_email(0), "_triage_decision": "respond"}, "_triage_decision": "notify"})
+    assert "_triage_decision" not in routed["email_input"]
+
+    update = triage.triage_router(
+        {"email_input": routed["email_input"], "_triage_decision": "notify"}, rules=TriageRules([])
+    )
+    assert update == {"classification_decision": "notify", "triage_rule": None}
+
+
+def test_peek_returns_what_record_would_without_recording():
+    cache = ThreadContextCache(None)
+    first = {**_email(0), "id": "m-peek-1", "gmail_thread_id": "t-peek", "_source": "gmail"}
+    reply = {**_email(1), "id": "m-peek-2", "gmail_thread_id": "t-peek", "_source": "gmail", "references": "<a@x>"}
+    assert cache.peek("u", first) == ""
+    assert cache.peek("u", reply) is None  # record() would seed this thread from Gmail first
+
+    cache.record("u", first)
+    context = cache.peek("u", reply)
+    assert "Body 0" in context
+    assert cache.peek("u", reply) == context == cache.record("u", reply)
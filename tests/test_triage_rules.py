@@ -0,0 +1,111 @@
+"""TriageRules.evaluate_email: condition kinds, rule precedence, no match; pre_triage on metadata with stored rules."""
+
+import pytest
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.ingest.pretriage import FETCH, IGNORE, pre_triage
+from email_assistant.triage_rules import DEFAULT_RULES, TriageRules, get_triage_rules, save_triage_rules, validate_rules
+
+
+def _email(**fields) -> dict:
+    return {"from": "Alice <alice@example.com>", "subject": "Hello", "body": "Just saying hi.", **fields}
+
+
+@pytest.fixture
+def rules():
+    return TriageRules(
+        [
+            {"id": "boss", "action": "respond", "senders": ["boss@corp.com"]},
+            {"id": "vendor", "action": "notify", "domains": ["vendor.io"]},
+            {"id": "invoice", "action": "notify", "patterns": [r"invoice #\d+"]},
+        ]
+        + DEFAULT_RULES
+    )
+
+
+def test_no_rule_fires_for_plain_mail(rules):
+    assert rules.evaluate_email(_email()) is None
+
+
+def test_sender_and_parent_domain_match(rules):
+    assert rules.evaluate_email(_email(**{"from": "The Boss <BOSS@corp.com>"})).rule_id == "boss"
+    match = rules.evaluate_email(_email(**{"from": "billing@eu.mail.vendor.io"}))
+    assert (match.action, match.rule_id, match.reason) == ("notify", "vendor", "domain vendor.io")
+
+
+def test_headers_and_labels_settle_bulk_mail(rules):
+    assert rules.evaluate_email(_email(headers={"List-Unsubscribe": "<mailto:x@y>"})).rule_id == "list-unsubscribe"
+    assert rules.evaluate_email(_email(headers={"Precedence": "Bulk"})).rule_id == "bulk-precedence"
+    assert rules.evaluate_email(_email(headers={"Auto-Submitted": "no"})) is None
+    assert rules.evaluate_email(_email(headers={"Auto-Submitted": "auto-replied"})).action == "ignore"
+    assert rules.evaluate_email(_email(label_ids=["CATEGORY_PROMOTIONS"])).rule_id == "bulk-category"
+
+
+def test_phrases_and_patterns_match_subject_and_body(rules):
+    assert rules.evaluate_email(_email(subject="Q4", body="Could you send the deck?")).rule_id == "explicit-request"
+    match = rules.evaluate_email(_email(subject="Invoice #1234 attached"))
+    assert (match.rule_id, match.reason) == ("invoice", "pattern 'Invoice #1234'")
+
+
+def test_earliest_rule_wins_when_several_fire(rules):
+    email = _email(**{"from": "boss@corp.com"}, headers={"List-Unsubscribe": "*"}, body="please send the report")
+    assert rules.evaluate_email(email).rule_id == "boss"
+    # A request on a mailing list still gets an answer: explicit-request precedes the bulk rules.
+    email = _email(headers={"List-Unsubscribe": "<mailto:x@y>"}, body="Can you send the slides by Friday?")
+    assert rules.evaluate_email(email).action == "respond"
+
+
+def test_overlapping_phrases_report_each_rule():
+    rules = TriageRules(
+        [
+            {"id": "long", "action": "respond", "phrases": ["send me the report"]},
+            {"id": "short", "action": "notify", "phrases": ["send me"]},
+        ]
+    )
+    assert rules.evaluate_email(_email(body="send me please")).rule_id == "short"
+    assert rules.evaluate_email(_email(body="send me the report now")).rule_id == "long"
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"action": "archive", "senders": ["a@b.c"]},
+        {"action": "ignore"},
+        {"action": "ignore", "patterns": ["("]},
+        "not a rule",
+    ],
+)
+def test_validate_rules_rejects_bad_rules(rule):
+    with pytest.raises(ValueError):
+        validate_rules([rule])
+
+
+def _metadata(snippet: str, **headers) -> dict:
+    return {"headers": {"From": "News <news@list.example>", "Subject": "Weekly", **headers}, "snippet": snippet, "label_ids": []}
+
+
+def test_pre_triage_settles_bulk_mail_from_a_complete_snippet():
+    rules = TriageRules(DEFAULT_RULES)
+    decision, reason = pre_triage(_metadata("This week&#39;s news.", **{"List-Unsubscribe": "<mailto:u@x>"}), allow=(), rules=rules)
+    assert (decision, reason) == (IGNORE, "rule list-unsubscribe: header List-Unsubscribe: <mailto:u@x>")
+    # A request in the (whole) body wins over the bulk header, as in the graph.
+    decision, _ = pre_triage(_metadata("Can you send the slides?", **{"List-Unsubscribe": "<mailto:u@x>"}), allow=(), rules=rules)
+    assert decision == FETCH
+
+
+def test_pre_triage_fetches_when_a_truncated_body_could_change_the_decision():
+    snippet = "Long newsletter text " * 10  # as long as a Gmail snippet: the rest of the body is unseen
+    metadata = _metadata(snippet, **{"List-Unsubscribe": "<mailto:u@x>"})
+    decision, reason = pre_triage(metadata, allow=(), rules=TriageRules(DEFAULT_RULES))
+    assert decision == FETCH and "needs the full body" in reason
+    # Without a text rule before the bulk rule, headers alone settle it.
+    decision, _ = pre_triage(metadata, allow=(), rules=TriageRules(DEFAULT_RULES[1:]))
+    assert decision == IGNORE
+
+
+def test_pre_triage_applies_the_users_stored_rules():
+    store = InMemoryStore()
+    save_triage_rules(store, "u1", [{"id": "newsletter-i-read", "action": "notify", "senders": ["news@list.example"]}])
+    metadata = _metadata("Hi.", **{"List-Unsubscribe": "<mailto:u@x>"})
+    assert pre_triage(metadata, allow=(), rules=get_triage_rules(store, "u1"))[0] == FETCH
+    assert pre_triage(metadata, allow=(), rules=get_triage_rules(store, "u2"))[0] == IGNORE